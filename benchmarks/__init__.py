@@ -0,0 +1,3 @@
+"""
+Benchmarks of the pipeline, run on synthetic inputs. See run.py.
+"""
@@ -0,0 +1,126 @@
+"""
+Measure the time Job adds to a run's Slurm jobs by polling.
+
+An array job and a job that depends on it are submitted to the local Slurm
+emulator in tests/bin, on a cluster small enough for the array's tasks to
+contend for CPUs, and awaited w/Job.wait_on_job_ids() at each polling
+interval. The ideal time is that of the tasks alone, run as fast as the
+cluster and the array's '%' limit allow:
+
+    python -m benchmarks.bench_job_scheduling --tasks 16 --cpus 4 \\
+        --polling-interval 0.5 --polling-interval 5
+"""
+
+import os
+from importlib.util import module_from_spec, spec_from_file_location
+from math import ceil
+from os.path import abspath, dirname, join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest.mock import patch
+
+import click
+
+from sequence_processing_pipeline.Job import Job
+
+EMULATOR_PATH = join(
+    dirname(dirname(abspath(__file__))), "tests", "bin", "slurm_emulator.py"
+)
+
+TASK_SCRIPT = """#!/bin/bash
+sleep {duration}
+"""
+
+
+def _load_emulator():
+    spec = spec_from_file_location("slurm_emulator", EMULATOR_PATH)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@click.command()
+@click.option("--tasks", type=int, default=16, show_default=True)
+@click.option("--cpus", type=int, default=4, show_default=True)
+@click.option("--array-limit", type=int, help="The array's '%' limit.")
+@click.option("--duration", type=float, default=1.0, show_default=True)
+@click.option(
+    "--polling-interval",
+    "polling_intervals",
+    type=float,
+    multiple=True,
+    default=[0.5, 2.0, 5.0],
+    show_default=True,
+)
+def main(tasks, cpus, array_limit, duration, polling_intervals):
+    emulator = _load_emulator()
+
+    with TemporaryDirectory() as tmp_dir:
+        bin_dir = emulator.install(
+            join(tmp_dir, "bin"),
+            join(tmp_dir, "state"),
+            nodes=1,
+            cpus_per_node=cpus,
+            scheduler_interval=0.05,
+        )
+
+        script_path = join(tmp_dir, "task.sh")
+        with open(script_path, "w") as f:
+            f.write(TASK_SCRIPT.format(duration=duration))
+
+        job = Job(tmp_dir, tmp_dir, "BenchJob", [], 1000)
+        array = f"1-{tasks}" + (f"%{array_limit}" if array_limit else "")
+
+        # the array's tasks run in waves, followed by the dependent job.
+        concurrency = min(cpus, array_limit or tasks)
+        ideal = (ceil(tasks / concurrency) + 1) * duration
+
+        click.echo(f"tasks: {tasks} cpus: {cpus} array: {array}")
+        click.echo(f"ideal: {ideal:.2f}s")
+
+        env = {"PATH": f"{bin_dir}:{os.environ['PATH']}"}
+
+        try:
+            for interval in polling_intervals:
+                polls = []
+                query_slurm = Job._query_slurm
+
+                def _counted(self, job_ids, polls=polls, query_slurm=query_slurm):
+                    polls.append(job_ids)
+                    return query_slurm(self, job_ids)
+
+                mocks = patch.multiple(
+                    Job,
+                    polling_interval_in_seconds=interval,
+                    submission_delay_in_seconds=0,
+                    _query_slurm=_counted,
+                )
+
+                with patch.dict(os.environ, env), mocks:
+                    start = perf_counter()
+                    array_id = job.submit_job(
+                        script_path,
+                        job_parameters=f"--array {array}",
+                        wait=False,
+                        exec_from=tmp_dir,
+                    )
+                    final_id = job.submit_job(
+                        script_path,
+                        job_parameters=f"--dependency afterok:{array_id}",
+                        wait=False,
+                        exec_from=tmp_dir,
+                    )
+                    job.wait_on_job_ids([array_id, final_id])
+                    elapsed = perf_counter() - start
+
+                click.echo(
+                    f"polling every {interval:g}s: {elapsed:.2f}s "
+                    + f"(+{elapsed - ideal:.2f}s, {len(polls)} polls)"
+                )
+        finally:
+            with patch.dict(os.environ, env):
+                job._system_call("scontrol shutdown")
+
+
+if __name__ == "__main__":
+    main()
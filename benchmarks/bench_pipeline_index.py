@@ -0,0 +1,102 @@
+"""
+Compare the per-project sample lookups performed by Pipeline() before and
+after the sample-sheet index was introduced.
+
+The legacy lookups round-trip the whole sample-sheet through JSON and apply
+a regex to every row on every call. The index is built once when a Pipeline
+is constructed. A synthetic, valid multi-project sample-sheet is generated
+so the comparison can be run anywhere metapool is installed:
+
+    python -m benchmarks.bench_pipeline_index --samples 1536 --projects 8
+"""
+
+import timeit
+from json import loads as json_loads
+from os.path import join
+from re import search
+from tempfile import TemporaryDirectory
+
+import click
+
+from benchmarks.synthetic import write_sample_sheet
+from sequence_processing_pipeline.Pipeline import Pipeline
+from sequence_processing_pipeline.SampleSheetCache import SampleSheetCache
+
+
+def legacy_lookup(sheet, project_name, column):
+    # the implementation used by Pipeline() prior to the index.
+    jsn = json_loads(sheet.to_json())
+
+    results = []
+
+    for sample in jsn["Data"]:
+        if sample["Sample_Project"] == project_name:
+            results.append(sample[column])
+            continue
+
+        m = search(r"^(.+)_(\d+)$", sample["Sample_Project"])
+        if m[1] == project_name:
+            results.append(sample[column])
+
+    return results
+
+
+def indexed_lookup(index, project_name, column):
+    if project_name in index:
+        return list(index[project_name][column])
+    return []
+
+
+@click.command()
+@click.option("--samples", type=int, default=1536, show_default=True)
+@click.option("--projects", type=int, default=8, show_default=True)
+@click.option("--repeats", type=int, default=5, show_default=True)
+def main(samples, projects, repeats):
+    with TemporaryDirectory() as tmp_dir:
+        sheet_path = join(tmp_dir, "sample_sheet.csv")
+        project_names = write_sample_sheet(sheet_path, samples, projects)
+
+        parsed = SampleSheetCache.get(sheet_path)
+        if not parsed.is_valid:
+            raise ValueError("generated sample-sheet is not valid")
+        sheet = parsed.sheet
+
+        # Workflow._compare_samples_against_qiita() queries sample-names and
+        # orig-names once per project, using the short project name.
+        queries = [search(r"^(.+)_(\d+)$", p)[1] for p in project_names]
+
+        def legacy():
+            for p in queries:
+                legacy_lookup(sheet, p, "Sample_Name")
+                legacy_lookup(sheet, p, "orig_name")
+
+        index = Pipeline._index_sample_sheet(sheet)
+
+        def indexed():
+            for p in queries:
+                indexed_lookup(index, p, "names")
+                indexed_lookup(index, p, "orig_names")
+
+        # confirm both implementations agree before timing them.
+        for p in queries:
+            assert legacy_lookup(sheet, p, "Sample_Name") == indexed_lookup(
+                index, p, "names"
+            )
+
+        t_build = min(
+            timeit.repeat(
+                lambda: Pipeline._index_sample_sheet(sheet), number=1, repeat=repeats
+            )
+        )
+        t_legacy = min(timeit.repeat(legacy, number=1, repeat=repeats))
+        t_indexed = min(timeit.repeat(indexed, number=1, repeat=repeats))
+
+        click.echo(f"samples: {samples} projects: {projects}")
+        click.echo(f"index construction (once): {t_build:.6f}s")
+        click.echo(f"legacy lookups:  {t_legacy:.6f}s")
+        click.echo(f"indexed lookups: {t_indexed:.6f}s")
+        click.echo(f"speedup: {t_legacy / max(t_indexed, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
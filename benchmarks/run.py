@@ -0,0 +1,595 @@
+"""
+Time the pipeline's data-heavy steps on a synthetic run.
+
+Inputs are generated deterministically from a seed (see synthetic.py), each
+scenario is timed over several repeats and the results are written as JSON
+w/the commit they were taken on, so that two commits can be compared:
+
+    python -m benchmarks.run run --scale small --output base.json
+    git checkout my-branch
+    python -m benchmarks.run run --scale small --output new.json
+    python -m benchmarks.run compare base.json new.json
+
+Run from the repository root w/src on PYTHONPATH (or the package installed).
+Scenarios whose dependencies (e.g. metapool or pgzip) aren't installed are
+reported as skipped.
+"""
+
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from functools import cached_property
+from importlib.util import module_from_spec, spec_from_file_location
+from json import dump, load
+from os import makedirs, stat
+from os.path import abspath, dirname, join
+from shutil import copytree, rmtree
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import click
+
+from benchmarks import synthetic
+
+REPO_ROOT = dirname(dirname(abspath(__file__)))
+
+INTEGRATE_SCRIPT = join(
+    REPO_ROOT,
+    "src",
+    "sequence_processing_pipeline",
+    "contrib",
+    "integrate-indices-np.py",
+)
+
+SCALES = {
+    "small": {
+        "samples": 96,
+        "projects": 4,
+        "reads": 50000,
+        "tellseq_reads": 50000,
+        "barcodes": 2000,
+    },
+    "medium": {
+        "samples": 384,
+        "projects": 8,
+        "reads": 2000000,
+        "tellseq_reads": 1000000,
+        "barcodes": 20000,
+    },
+    "large": {
+        "samples": 1536,
+        "projects": 16,
+        "reads": 10000000,
+        "tellseq_reads": 5000000,
+        "barcodes": 100000,
+    },
+}
+
+READ_LENGTH = 150
+
+# name => function(inputs, work_dir) returning the callable to time.
+SCENARIOS = {}
+
+
+class SkipScenario(Exception):
+    pass
+
+
+def scenario(name):
+    def decorator(setup):
+        SCENARIOS[name] = setup
+        return setup
+
+    return decorator
+
+
+def _requires(import_function):
+    # scenarios import the code they exercise lazily, so that a missing
+    # optional dependency only skips the scenarios that need it.
+    try:
+        return import_function()
+    except ImportError as e:
+        raise SkipScenario(str(e))
+
+
+class Inputs:
+    """
+    The synthetic inputs shared by the scenarios. Each input is generated
+    once, on first use.
+    """
+
+    def __init__(self, root, config, skew, seed):
+        """
+        :param root: The directory to write inputs to.
+        :param config: One of SCALES.
+        :param skew: The skew of sample sizes. See make_samples().
+        :param seed: The random seed.
+        """
+        self.root = root
+        makedirs(root, exist_ok=True)
+        self.config = config
+        self.skew = skew
+        self.seed = seed
+
+    @cached_property
+    def samples(self):
+        return synthetic.make_samples(
+            self.config["samples"],
+            self.config["projects"],
+            self.config["reads"],
+            skew=self.skew,
+            seed=self.seed,
+        )
+
+    @cached_property
+    def fastq_tree(self):
+        # laid out as ConvertJob's output.
+        path = join(self.root, "ConvertJob")
+        synthetic.write_fastq_tree(path, self.samples, READ_LENGTH, self.seed)
+        return path
+
+    @cached_property
+    def sample_sheet(self):
+        path = join(self.root, "sample_sheet.csv")
+        synthetic.write_sample_sheet(
+            path, self.config["samples"], self.config["projects"], self.seed
+        )
+        return path
+
+    @cached_property
+    def mux_stream(self):
+        path = join(self.root, "mux.fastq")
+        id_map = synthetic.write_mux_stream(path, self.samples, READ_LENGTH, self.seed)
+        return path, id_map
+
+    @cached_property
+    def tellseq_reads(self):
+        return synthetic.write_tellseq_reads(
+            join(self.root, "TellReadJob"),
+            self.config["tellseq_reads"],
+            self.config["barcodes"],
+            READ_LENGTH,
+            seed=self.seed,
+        )
+
+    @property
+    def sample_ids(self):
+        return [x.sample_id for x in self.samples]
+
+
+@scenario("demux")
+def demux_scenario(inputs, work_dir):
+    from sequence_processing_pipeline.Commands import demux
+
+    mux_path, id_map = inputs.mux_stream
+    out_d = join(work_dir, "demux")
+    manifest_path = join(work_dir, "manifest.tsv")
+
+    def run():
+        with open(mux_path, "r") as fp:
+            demux(id_map, fp, out_d, 0, 1, manifest_path)
+
+    return run
+
+
+@scenario("split_similar_size_bins")
+def split_scenario(inputs, work_dir):
+    from sequence_processing_pipeline.Commands import split_similar_size_bins
+
+    fastq_tree = inputs.fastq_tree
+    batch_prefix = join(work_dir, "hds-bench")
+
+    def run():
+        split_similar_size_bins(fastq_tree, 1, batch_prefix)
+
+    return run
+
+
+def _load_integrate():
+    spec = spec_from_file_location("integrate_indices_np", INTEGRATE_SCRIPT)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _integrate_scenario(inputs, work_dir, **options):
+    module = _requires(_load_integrate)
+    reads = inputs.tellseq_reads
+
+    def run():
+        module.integrate.callback(
+            r1_in=reads["R1"],
+            r2_in=reads["R2"],
+            i1_in=reads["I1"],
+            r1_out=join(work_dir, "R1.fastq.gz"),
+            r2_out=join(work_dir, "R2.fastq.gz"),
+            i1_out=None,
+            threads=1,
+            **options,
+        )
+
+    return run
+
+
+@scenario("integrate")
+def integrate_scenario(inputs, work_dir):
+    return _integrate_scenario(
+        inputs,
+        work_dir,
+        no_sort=False,
+        barcode_groups=join(work_dir, "groups.npz"),
+        bgzf=False,
+    )
+
+
+@scenario("integrate_bgzf")
+def integrate_bgzf_scenario(inputs, work_dir):
+    return _integrate_scenario(
+        inputs,
+        work_dir,
+        no_sort=False,
+        barcode_groups=join(work_dir, "groups.npz"),
+        bgzf=True,
+    )
+
+
+@scenario("integrate_no_sort")
+def integrate_no_sort_scenario(inputs, work_dir):
+    return _integrate_scenario(
+        inputs, work_dir, no_sort=True, barcode_groups=None, bgzf=False
+    )
+
+
+@scenario("seq_counts_aggregation")
+def seq_counts_scenario(inputs, work_dir):
+    def _import():
+        from sequence_processing_pipeline.FastqCounter import COUNTS_COLUMNS
+        from sequence_processing_pipeline.SampleSheetCache import SampleSheetCache
+        from sequence_processing_pipeline.SeqCountsJob import SeqCountsJob
+
+        return COUNTS_COLUMNS, SampleSheetCache, SeqCountsJob
+
+    counts_columns, sample_sheet_cache, seq_counts_job = _requires(_import)
+
+    paths = [
+        (join(inputs.fastq_tree, x.project, synthetic.fastq_file_name(x, o)), x)
+        for x in inputs.samples
+        for o in ("R1", "R2")
+    ]
+
+    files_to_count_path = join(work_dir, "files_to_count.txt")
+    with open(files_to_count_path, "w") as f:
+        f.write("\n".join(x for x, _ in paths) + "\n")
+
+    job = seq_counts_job(
+        inputs.fastq_tree,
+        work_dir,
+        "qiita",
+        1,
+        60,
+        "10",
+        [],
+        "bench",
+        1000,
+        files_to_count_path,
+        inputs.sample_sheet,
+    )
+
+    # the counts each array task would have written.
+    makedirs(job.counts_path, exist_ok=True)
+    for i in range(0, len(paths), 32):
+        with open(join(job.counts_path, f"counts-{i // 32 + 1}.tsv"), "w") as f:
+            f.write("\t".join(counts_columns) + "\n")
+            for path, sample in paths[i : i + 32]:
+                f.write(f"{path}\t{sample.reads}\t{sample.reads * READ_LENGTH}\n")
+
+    sample_sheet_cache.invalidate()
+
+    def run():
+        job._aggregate_counts(inputs.sample_sheet)
+
+    return run
+
+
+@scenario("job_audit")
+def audit_scenario(inputs, work_dir):
+    from sequence_processing_pipeline.FileInventory import FileInventory
+    from sequence_processing_pipeline.Job import Job
+
+    fastq_tree = inputs.fastq_tree
+    sample_ids = inputs.sample_ids
+
+    # audit ConvertJob's output in place.
+    job = Job(fastq_tree, dirname(fastq_tree), "ConvertJob", [], 1000)
+    job.suffix = "fastq.gz"
+
+    FileInventory.clear()
+
+    def run():
+        job.audit(sample_ids)
+
+    return run
+
+
+@scenario("nuqc_post_processing")
+def nuqc_scenario(inputs, work_dir):
+    def _import():
+        from sequence_processing_pipeline.Commands import write_demux_manifest
+        from sequence_processing_pipeline.NuQCJob import NuQCJob
+
+        return write_demux_manifest, NuQCJob
+
+    write_demux_manifest, nuqc_job = _requires(_import)
+
+    # the output of the filtering job: per-sample fastqs in each project
+    # directory, fastp reports and the manifests written by demux.
+    output_path = join(work_dir, "NuQCJob")
+    copytree(inputs.fastq_tree, output_path)
+
+    counts = {}
+    for sample in inputs.samples:
+        for orientation in ("R1", "R2"):
+            file_name = synthetic.fastq_file_name(sample, orientation)
+            counts[join(output_path, sample.project, file_name)] = [
+                sample.reads,
+                sample.reads * READ_LENGTH,
+            ]
+
+            report_name = file_name[: -len(".fastq.gz")]
+            for report_type in ("html", "json"):
+                report_dir = join(output_path, "fastp_reports_dir", report_type)
+                makedirs(report_dir, exist_ok=True)
+                with open(join(report_dir, f"{report_name}.{report_type}"), "w") as f:
+                    f.write("{}")
+
+    write_demux_manifest(
+        join(output_path, "logs", "demux_manifests", "1.tsv"), output_path, counts
+    )
+
+    # post-processing doesn't run fastp, minimap2 or samtools; any
+    # executable found in PATH satisfies the Job's check.
+    job = nuqc_job(
+        inputs.fastq_tree,
+        work_dir,
+        inputs.sample_sheet,
+        None,
+        "qiita",
+        1,
+        60,
+        "20",
+        "sh",
+        "sh",
+        "sh",
+        [],
+        "bench",
+        1000,
+        None,
+        "sh",
+        None,
+        "sh",
+        [],
+    )
+
+    def run():
+        job._post_process_completed_files()
+
+    return run
+
+
+def time_scenario(setup, inputs, work_dir, repeats):
+    """
+    Time a scenario.
+
+    Setup isn't timed. Scenarios may consume their inputs (e.g. by moving
+    files), so each repeat is set up in a new directory.
+
+    :param setup: A function registered w/@scenario.
+    :param inputs: An Inputs object.
+    :param work_dir: A directory for the scenario's output.
+    :param repeats: The number of times to run the scenario.
+    :return: A list of times, in seconds.
+    """
+    times = []
+
+    for i in range(repeats):
+        repeat_dir = join(work_dir, str(i))
+        makedirs(repeat_dir)
+        function = setup(inputs, repeat_dir)
+
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+
+        rmtree(repeat_dir)
+
+    return times
+
+
+def _git(*args):
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True
+        )
+    except OSError:
+        return None
+
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.option("--scale", type=click.Choice(list(SCALES)), default="small")
+@click.option("--seed", type=int, default=42, show_default=True)
+@click.option(
+    "--skew",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Sigma of the log-normal distribution of sample sizes.",
+)
+@click.option("--repeats", type=int, default=3, show_default=True)
+@click.option(
+    "--scenario",
+    "scenarios",
+    type=click.Choice(list(SCENARIOS)),
+    multiple=True,
+    help="The scenarios to run. Defaults to all of them.",
+)
+@click.option(
+    "--work-dir",
+    type=click.Path(file_okay=False),
+    help="Where to generate inputs. Defaults to a temporary directory.",
+)
+@click.option("--output", type=click.Path(dir_okay=False), required=True)
+def run(scale, seed, skew, repeats, scenarios, work_dir, output):
+    """Time scenarios and write the results to a JSON file."""
+    config = SCALES[scale]
+    scenarios = list(scenarios) or list(SCENARIOS)
+
+    results = {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "seed": seed,
+        "skew": skew,
+        "config": config,
+        "repeats": repeats,
+        "scenarios": {},
+    }
+
+    failed = False
+
+    with TemporaryDirectory(dir=work_dir) as tmp_dir:
+        inputs = Inputs(join(tmp_dir, "inputs"), config, skew, seed)
+
+        for name in scenarios:
+            click.echo(f"{name}: ", nl=False)
+            scenario_dir = join(tmp_dir, name)
+
+            try:
+                times = time_scenario(SCENARIOS[name], inputs, scenario_dir, repeats)
+            except SkipScenario as e:
+                results["scenarios"][name] = {"status": "skipped", "reason": str(e)}
+                click.echo(f"skipped ({e})")
+                continue
+            except Exception as e:
+                failed = True
+                results["scenarios"][name] = {
+                    "status": "error",
+                    "reason": f"{type(e).__name__}: {e}",
+                }
+                click.echo(f"error ({type(e).__name__}: {e})")
+                continue
+            finally:
+                rmtree(scenario_dir, ignore_errors=True)
+
+            results["scenarios"][name] = {
+                "status": "ok",
+                "times": times,
+                "min": min(times),
+                "median": median(times),
+            }
+            click.echo(f"min {min(times):.3f}s median {median(times):.3f}s")
+
+        results["input_bytes"] = _input_sizes(inputs)
+
+    with open(output, "w") as f:
+        dump(results, f, indent=2)
+
+    if failed:
+        sys.exit(1)
+
+
+def _input_sizes(inputs):
+    # the size of the inputs that were generated, for context.
+    sizes = {}
+
+    if "fastq_tree" in inputs.__dict__:
+        paths = [
+            join(inputs.fastq_tree, x.project, synthetic.fastq_file_name(x, o))
+            for x in inputs.samples
+            for o in ("R1", "R2")
+        ]
+        sizes["fastq_tree"] = sum(stat(x).st_size for x in paths)
+
+    if "mux_stream" in inputs.__dict__:
+        sizes["mux_stream"] = stat(inputs.mux_stream[0]).st_size
+
+    if "tellseq_reads" in inputs.__dict__:
+        sizes["tellseq_reads"] = sum(
+            stat(x).st_size for x in inputs.tellseq_reads.values()
+        )
+
+    return sizes
+
+
+@cli.command()
+@click.argument("base", type=click.Path(exists=True, dir_okay=False))
+@click.argument("new", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--threshold",
+    type=float,
+    default=0.1,
+    show_default=True,
+    help="Relative change in the minimum time reported as a change.",
+)
+@click.option("--fail-on-regression", is_flag=True, default=False)
+def compare(base, new, threshold, fail_on_regression):
+    """Compare the results of two runs."""
+    with open(base) as f:
+        base = load(f)
+    with open(new) as f:
+        new = load(f)
+
+    for key in ("scale", "seed", "skew", "config"):
+        if base.get(key) != new.get(key):
+            click.echo(
+                f"warning: {key} differs ({base.get(key)} vs {new.get(key)}); "
+                + "results aren't comparable",
+                err=True,
+            )
+
+    click.echo(f"base: {base['commit']}  new: {new['commit']}")
+    click.echo(f"{'scenario':<26}{'base':>10}{'new':>10}{'change':>10}")
+
+    regressions = []
+    names = list(base["scenarios"])
+    names += [x for x in new["scenarios"] if x not in names]
+
+    for name in names:
+        a = base["scenarios"].get(name, {})
+        b = new["scenarios"].get(name, {})
+
+        if a.get("status") != "ok" or b.get("status") != "ok":
+            statuses = f"{a.get('status', 'missing')} vs {b.get('status', 'missing')}"
+            click.echo(f"{name:<26}{statuses:>30}")
+            continue
+
+        change = b["min"] / a["min"] - 1 if a["min"] > 0 else 0.0
+
+        if change > threshold:
+            verdict = "slower"
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+
+        line = f"{name:<26}{a['min']:>9.3f}s{b['min']:>9.3f}s{change:>+10.1%}"
+        click.echo(f"{line}  {verdict}".rstrip())
+
+    if regressions and fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli()
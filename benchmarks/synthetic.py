@@ -0,0 +1,362 @@
+"""
+Deterministic synthetic inputs for the benchmarks.
+
+Every generator takes a seed; the same seed always produces the same reads,
+names and sizes, so timings taken on different commits are comparable.
+Samples follow the naming used by write_sample_sheet(), so the sample-sheet,
+per-sample fastq files, interleaved streams and reports generated for a
+scenario all describe the same run.
+"""
+
+import gzip
+import random
+from collections import namedtuple
+from os import makedirs
+from os.path import join
+
+import numpy as np
+
+# sample_id: the Sample_ID, used to name the sample's fastq files.
+# sample_name: the Sample_Name.
+# project: the Sample_Project.
+# number: the sample's position in the sample-sheet, starting at 1.
+# reads: the number of read-pairs sequenced for the sample.
+Sample = namedtuple(
+    "Sample", ["sample_id", "sample_name", "project", "number", "reads"]
+)
+
+INSTRUMENT = "LH00444:84:227CNHLT4"
+
+BASES = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+HEADER = """[Header],,,,,,,,,,,
+IEMFileVersion,4,,,,,,,,,,
+SheetType,standard_metag,,,,,,,,,,
+SheetVersion,90,,,,,,,,,,
+Investigator Name,Knight,,,,,,,,,,
+Experiment Name,RKL0042,,,,,,,,,,
+Date,2020-02-26,,,,,,,,,,
+Workflow,GenerateFASTQ,,,,,,,,,,
+Application,FASTQ Only,,,,,,,,,,
+Assay,Metagenomic,,,,,,,,,,
+Description,,,,,,,,,,,
+Chemistry,Default,,,,,,,,,,
+,,,,,,,,,,,
+[Reads],,,,,,,,,,,
+150,,,,,,,,,,,
+150,,,,,,,,,,,
+,,,,,,,,,,,
+[Settings],,,,,,,,,,,
+ReverseComplement,0,,,,,,,,,,
+,,,,,,,,,,,
+[Data],,,,,,,,,,,
+Lane,Sample_ID,Sample_Name,Sample_Plate,Sample_Well,I7_Index_ID,index,\
+I5_Index_ID,index2,Sample_Project,syndna_pool_number,Well_description
+"""
+
+ROWS = "ABCDEFGHIJKLMNOP"
+
+
+def project_names(project_count):
+    return [f"Project{i}_{10000 + i}" for i in range(project_count)]
+
+
+def _random_index(rng, length, seen):
+    while True:
+        idx = "".join(rng.choice("ACGT") for _ in range(length))
+        if idx not in seen:
+            seen.add(idx)
+            return idx
+
+
+def write_sample_sheet(path, sample_count, project_count, seed=42):
+    """
+    Write a valid metagenomic sample-sheet w/sample_count samples spread
+    evenly across project_count projects.
+    """
+    rng = random.Random(seed)
+    seen = set()
+    projects = project_names(project_count)
+
+    lines = [HEADER.rstrip("\n")]
+    for i in range(sample_count):
+        project = projects[i % project_count]
+        plate, well = divmod(i, 384)
+        well = f"{ROWS[well // 24]}{well % 24 + 1}"
+        sample_name = f"sample.{i}"
+        lines.append(
+            ",".join(
+                [
+                    "1",
+                    sample_name.replace(".", "_"),
+                    sample_name,
+                    f"{project}_P{plate + 1}",
+                    well,
+                    f"iTru7_{i}",
+                    _random_index(rng, 8, seen),
+                    f"iTru5_{i}",
+                    _random_index(rng, 8, seen),
+                    project,
+                    "",
+                    sample_name,
+                ]
+            )
+        )
+
+    lines.append(",,,,,,,,,,,")
+    lines.append("[Bioinformatics],,,,,,,,,,,")
+    lines.append(
+        "Sample_Project,QiitaID,BarcodesAreRC,ForwardAdapter,ReverseAdapter,"
+        "HumanFiltering,library_construction_protocol,"
+        "experiment_design_description,,,,"
+    )
+    for project in projects:
+        qiita_id = project.split("_")[-1]
+        lines.append(
+            f"{project},{qiita_id},False,AACC,GGTT,False,Nextera,Equipment,,,,"
+        )
+    lines.append(",,,,,,,,,,,")
+    lines.append("[Contact],,,,,,,,,,,")
+    lines.append("Email,Sample_Project,,,,,,,,,,")
+    lines.append(f"test@lol.com,{projects[0]},,,,,,,,,,")
+    lines.append(",,,,,,,,,,,")
+
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+    return projects
+
+
+def make_samples(sample_count, project_count, total_reads, skew=1.0, seed=42):
+    """
+    Describe the samples of a run.
+
+    Real runs are far from uniform: a few samples get most of the reads and
+    blanks get almost none. Each sample's share of total_reads is drawn from
+    a log-normal distribution whose sigma is skew; 0 splits the reads evenly.
+
+    :param sample_count: The number of samples.
+    :param project_count: The number of projects, assigned round-robin.
+    :param total_reads: The number of read-pairs across all samples.
+    :param skew: The sigma of the log-normal distribution of sample sizes.
+    :param seed: The random seed.
+    :return: A list of Samples.
+    """
+    rng = np.random.default_rng(seed)
+    projects = project_names(project_count)
+
+    if skew > 0:
+        weights = rng.lognormal(0, skew, sample_count)
+    else:
+        weights = np.ones(sample_count)
+
+    reads = rng.multinomial(total_reads, weights / weights.sum())
+
+    return [
+        Sample(f"sample_{i}", f"sample.{i}", projects[i % project_count], i + 1, n)
+        for i, n in enumerate(int(x) for x in reads)
+    ]
+
+
+def read_names(offset, count):
+    """
+    Return Illumina-style read names.
+    :param offset: The index of the first read in the run.
+    :param count: The number of names.
+    :return: A list of str.
+    """
+    names = []
+    for i in range(offset, offset + count):
+        tile, position = divmod(i, 10**6)
+        y, x = divmod(position, 10**3)
+        names.append(f"{INSTRUMENT}:7:{1101 + tile}:{x + 1000}:{y + 1000}")
+    return names
+
+
+def sequences(rng, count, length):
+    """
+    Return random nucleotide sequences.
+    :param rng: A numpy Generator.
+    :param count: The number of sequences.
+    :param length: The length of each sequence.
+    :return: A list of bytes.
+    """
+    codes = rng.integers(0, 4, size=(count, length), dtype=np.uint8)
+    return [row.tobytes() for row in BASES[codes]]
+
+
+def fastq_records(rng, names, length):
+    """
+    Return fastq records w/random sequences.
+    :param rng: A numpy Generator.
+    :param names: The sequence-id of each record, w/out the leading '@'.
+    :param length: The length of each sequence.
+    :return: A list of records, as bytes.
+    """
+    quality = b"F" * length
+
+    return [
+        b"@%s\n%s\n+\n%s\n" % (name.encode(), seq, quality)
+        for name, seq in zip(names, sequences(rng, len(names), length))
+    ]
+
+
+def fastq_file_name(sample, orientation):
+    return f"{sample.sample_id}_S{sample.number}_L001_{orientation}_001.fastq.gz"
+
+
+def write_fastq_tree(root, samples, read_length=150, seed=42):
+    """
+    Write gzipped per-sample fastq files, organized by project.
+
+    Files are named as bcl-convert names them, e.g.
+    <root>/<project>/sample_3_S4_L001_R1_001.fastq.gz.
+
+    :param root: The directory to write projects to.
+    :param samples: A list of Samples.
+    :param read_length: The length of each read.
+    :param seed: The random seed.
+    :return: A list of the paths written.
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    offset = 0
+
+    for sample in samples:
+        project_dir = join(root, sample.project)
+        makedirs(project_dir, exist_ok=True)
+        names = read_names(offset, sample.reads)
+        offset += sample.reads
+
+        for orientation, suffix in (("R1", " 1:N:0:1"), ("R2", " 2:N:0:1")):
+            path = join(project_dir, fastq_file_name(sample, orientation))
+            records = fastq_records(rng, [x + suffix for x in names], read_length)
+            with gzip.open(path, "wb", compresslevel=1) as f:
+                f.write(b"".join(records))
+            paths.append(path)
+
+    return paths
+
+
+def write_mux_stream(path, samples, read_length=150, seed=42):
+    """
+    Write an interleaved stream as NuQCJob's filtering pipeline emits it.
+
+    Each record's sequence-id is prefixed w/the index of its sample and
+    '::MUX::', and R1 and R2 records alternate.
+
+    :param path: The path to write the stream to.
+    :param samples: A list of Samples.
+    :param read_length: The length of each read.
+    :param seed: The random seed.
+    :return: The id_map demux() expects: a list of [index, R1 name, R2 name,
+    project].
+    """
+    rng = np.random.default_rng(seed)
+    id_map = []
+    offset = 0
+
+    with open(path, "wb") as f:
+        for i, sample in enumerate(samples, 1):
+            id_map.append(
+                [
+                    str(i),
+                    fastq_file_name(sample, "R1")[: -len(".fastq.gz")],
+                    fastq_file_name(sample, "R2")[: -len(".fastq.gz")],
+                    sample.project,
+                ]
+            )
+
+            names = read_names(offset, sample.reads)
+            offset += sample.reads
+
+            r1 = fastq_records(rng, [f"{i}::MUX::{x}/1" for x in names], read_length)
+            r2 = fastq_records(rng, [f"{i}::MUX::{x}/2" for x in names], read_length)
+            f.write(b"".join(a + b for a, b in zip(r1, r2)))
+
+    return id_map
+
+
+def write_tellseq_reads(
+    root, read_count, barcode_count, read_length=150, barcode_length=18, seed=42
+):
+    """
+    Write uncompressed R1, R2 and I1 fastq files as TellRead writes them.
+
+    Reads are assigned to barcodes at random, w/a skew similar to that of
+    linked-read libraries, and appear in sequencing order rather than
+    grouped by barcode.
+
+    :param root: The directory to write to.
+    :param read_count: The number of reads.
+    :param barcode_count: The number of distinct barcodes.
+    :param read_length: The length of each R1 and R2 read.
+    :param barcode_length: The length of each barcode.
+    :param seed: The random seed.
+    :return: A dict of 'R1', 'R2' and 'I1' => path.
+    """
+    rng = np.random.default_rng(seed)
+    makedirs(root, exist_ok=True)
+
+    barcodes = sequences(rng, barcode_count, barcode_length)
+    weights = rng.lognormal(0, 1, barcode_count)
+    assigned = rng.choice(barcode_count, size=read_count, p=weights / weights.sum())
+
+    names = read_names(0, read_count)
+    quality = b"F" * barcode_length
+    paths = {x: join(root, f"TellReadJob_{x}.fastq") for x in ("R1", "R2", "I1")}
+
+    for orientation in ("R1", "R2"):
+        with open(paths[orientation], "wb") as f:
+            f.write(b"".join(fastq_records(rng, names, read_length)))
+
+    with open(paths["I1"], "wb") as f:
+        f.write(
+            b"".join(
+                b"@%s\n%s\n+\n%s\n" % (name.encode(), barcodes[i], quality)
+                for name, i in zip(names, assigned)
+            )
+        )
+
+    return paths
+
+
+def write_demultiplex_stats(path, samples, read_length=150, seed=42):
+    """
+    Write a Demultiplex_Stats.csv as bcl-convert reports it.
+    :param path: The path to write the report to.
+    :param samples: A list of Samples.
+    :param read_length: The length of each read.
+    :param seed: The random seed.
+    :return: None
+    """
+    rng = random.Random(seed)
+    seen = set()
+
+    with open(path, "w") as f:
+        f.write(
+            "Lane,SampleID,Index,# Reads,# Perfect Index Reads,"
+            "# One Mismatch Index Reads,# of >= Q30 Bases (PF),"
+            "Mean Quality Score (PF)\n"
+        )
+        for sample in samples:
+            index = f"{_random_index(rng, 8, seen)}-{_random_index(rng, 8, seen)}"
+            perfect = int(sample.reads * rng.uniform(0.9, 1.0))
+            q30 = int(sample.reads * 2 * read_length * rng.uniform(0.85, 0.95))
+            f.write(
+                f"1,{sample.sample_id},{index},{sample.reads},{perfect},"
+                f"{sample.reads - perfect},{q30},{rng.uniform(35, 37):.2f}\n"
+            )
+
+
+def write_seq_counts(path, samples):
+    """
+    Write a SeqCounts.csv as SeqCountsJob reports it.
+    :param path: The path to write the report to.
+    :param samples: A list of Samples.
+    :return: None
+    """
+    with open(path, "w") as f:
+        f.write("Sample_ID,raw_reads_r1r2,Lane\n")
+        for sample in sorted(samples, key=lambda x: x.sample_id):
+            f.write(f"{sample.sample_id},{sample.reads * 2},1\n")
@@ -1,3 +1,4 @@
+import logging
 from collections import defaultdict
 from json import dumps
 from os import listdir, makedirs, walk
@@ -10,6 +11,7 @@ from sequence_processing_pipeline.FastQCJob import FastQCJob
 from sequence_processing_pipeline.GenPrepFileJob import GenPrepFileJob
 from sequence_processing_pipeline.MultiQCJob import MultiQCJob
 from sequence_processing_pipeline.NuQCJob import NuQCJob
+from sequence_processing_pipeline.Tracer import Tracer, span
 
 ASSAY_NAME_NONE = "Assay"
 ASSAY_NAME_AMPLICON = "Amplicon"
@@ -152,10 +154,27 @@ class Assay:
     def execute_pipeline(self):
         """
         Executes steps of pipeline in proper sequence.
+
+        The time spent in each step, Job and Slurm job is recorded in the
+        run's output directory. See Tracer.
         :return: None
         """
+        tracer = Tracer.activate(self.pipeline.output_path)
+
+        try:
+            with tracer.span("execute_pipeline", "workflow", workflow=self.what_am_i()):
+                self._execute_steps()
+        finally:
+            Tracer.deactivate()
+            try:
+                tracer.write_chrome_trace()
+            except OSError as e:
+                logging.warning(f"could not write {tracer.trace_path}: {e}")
+
+    def _execute_steps(self):
         # pre_check-ing the status of the workflow
-        self.pre_check()
+        with span("pre_check", "step"):
+            self.pre_check()
 
         # this is performed even in the event of a restart.
         self.generate_special_map()
@@ -169,14 +188,19 @@ class Assay:
             # converting raw data to fastq depends heavily on the instrument
             # used to generate the run_directory. Hence this method is
             # supplied by the instrument mixin.
-            self.convert_raw_to_fastq()
-            self.integrate_results()
-            self.generate_sequence_counts()
-            self.subsample_reads()
+            with span("convert_raw_to_fastq", "step"):
+                self.convert_raw_to_fastq()
+            with span("integrate_results", "step"):
+                self.integrate_results()
+            with span("generate_sequence_counts", "step"):
+                self.generate_sequence_counts()
+            with span("subsample_reads", "step"):
+                self.subsample_reads()
 
         self.update_status("QC-ing reads", 2, 9)
         if "NuQCJob" not in self.skip_steps:
-            self.qc_reads()
+            with span("qc_reads", "step"):
+                self.qc_reads()
 
         self.update_status("Generating reports", 3, 9)
         if "FastQCJob" not in self.skip_steps:
@@ -184,11 +208,13 @@ class Assay:
             # only because metagenomic runs currently require a failed-samples
             # report to be generated. This is not done for amplicon runs since
             # demultiplexing occurs downstream of SPP.
-            self.generate_reports()
+            with span("generate_reports", "step"):
+                self.generate_reports()
 
         self.update_status("Generating preps", 4, 9)
         if "GenPrepFileJob" not in self.skip_steps:
-            self.generate_prep_file()
+            with span("generate_prep_file", "step"):
+                self.generate_prep_file()
 
         # moved final component of genprepfilejob outside of object.
         # obtain the paths to the prep-files generated by GenPrepFileJob
@@ -231,7 +257,8 @@ class Assay:
         # could be imported into Workflows potentially, since it is a post-
         # processing step. All pairings of assay and instrument type need to
         # generate prep-info files in the same format.
-        self.overwrite_prep_files(prep_paths)
+        with span("overwrite_prep_files", "step"):
+            self.overwrite_prep_files(prep_paths)
 
         # for now, simply re-run any line below as if it was a new job, even
         # for a restart. functionality is idempotent, except for the
@@ -242,30 +269,36 @@ class Assay:
         # class, since they deal with fastq files and Qiita, and don't depend
         # on assay or instrument type.
         self.update_status("Generating sample information", 5, 9)
-        self.sifs = self.generate_sifs()
+        with span("generate_sifs", "step"):
+            self.sifs = self.generate_sifs()
 
         # post-processing step.
         self.update_status("Registering blanks in Qiita", 6, 9)
         if self.update:
-            self.update_blanks_in_qiita()
+            with span("update_blanks_in_qiita", "step"):
+                self.update_blanks_in_qiita()
 
         self.update_status("Loading preps into Qiita", 7, 9)
         if self.update:
-            self.update_prep_templates()
+            with span("update_prep_templates", "step"):
+                self.update_prep_templates()
 
         # before we load preps into Qiita we need to copy the fastq
         # files n times for n preps and correct the file-paths each
         # prep is pointing to.
-        self.load_preps_into_qiita()
+        with span("load_preps_into_qiita", "step"):
+            self.load_preps_into_qiita()
 
         # before we pack the results, we need to generate the human-readable
         # report of samples lost in each step. The tracking is being done
         # within fsr (FailedSamplesRecord), in conjuction with Job.audit.
         if hasattr(self, "fsr"):
-            self.fsr.generate_report()
+            with span("generate_failed_samples_report", "step"):
+                self.fsr.generate_report()
 
         self.update_status("Generating packaging commands", 8, 9)
-        self.generate_commands()
+        with span("generate_commands", "step"):
+            self.generate_commands()
 
         # store the warnings, if they exist so they are packed with the
         # final results
@@ -276,7 +309,8 @@ class Assay:
 
         self.update_status("Packaging results", 9, 9)
         if self.update:
-            self.execute_commands()
+            with span("execute_commands", "step"):
+                self.execute_commands()
 
 
 class Amplicon(Assay):
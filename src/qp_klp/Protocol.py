@@ -1,5 +1,7 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from glob import glob
-from os import makedirs, rename, walk
+from multiprocessing import get_context
+from os import makedirs, remove, rename, replace
 from os.path import basename, dirname, exists, join, split
 from re import match
 
@@ -10,17 +12,20 @@ from metapool.sample_sheet import (
     PROTOCOL_NAME_PACBIO_SMRT,
     PROTOCOL_NAME_TELLSEQ,
 )
-from qiita_client.util import system_call
 
 from sequence_processing_pipeline.ConvertJob import (
     ConvertJob,
     ConvertPacBioBam2FastqJob,
 )
+from sequence_processing_pipeline.CountCatalog import CountCatalog
+from sequence_processing_pipeline.FastqSubsampler import subsample_in_place
+from sequence_processing_pipeline.FileInventory import FileInventory
 from sequence_processing_pipeline.PipelineError import PipelineError
 from sequence_processing_pipeline.SeqCountsJob import SeqCountsJob
 from sequence_processing_pipeline.TellReadJob import TellReadJob
+from sequence_processing_pipeline.Tracer import span
 from sequence_processing_pipeline.TRIntegrateJob import TRIntegrateJob
-from sequence_processing_pipeline.util import determine_orientation
+from sequence_processing_pipeline.util import determine_orientation, group_mates
 
 PROTOCOL_NAME_NONE = "None"
 
@@ -37,6 +42,12 @@ class Protocol:
     # this value was selected by looking at all the successful NuQC/SPP jobs,
     # the max sequeces were: 712,497,596
     MAX_READS = 720000000
+    # subsampling is seeded so that the same reads are always selected.
+    SUBSAMPLE_SEED = 42
+    # the number of samples subsampled concurrently and the number of
+    # threads each uses to compress its output.
+    SUBSAMPLE_WORKERS = 4
+    SUBSAMPLE_THREADS = 4
 
     def subsample_reads(self):
         if self.assay_type == "Amplicon":
@@ -47,10 +58,14 @@ class Protocol:
             # this is a TellSeq run: SeqCounts.csv
             read_col = "raw_reads_r1r2"
             index_col = "Sample_ID"
+            # the sum of the records in each sample's R1 and R2 files.
+            counted_orientations = ("R1", "R2")
         elif "# Reads" in df.columns:
             # this is a Illumina: Demultiplex_Stats.csv
             read_col = "# Reads"
             index_col = "SampleID"
+            # the number of clusters, i.e. the records in each file.
+            counted_orientations = None
         else:
             raise ValueError(
                 "Not sure how to check for seq counts to subsample, "
@@ -58,34 +73,105 @@ class Protocol:
             )
         # df will keep any rows/samples with more than the self.MAX_READS
         df = df[df[read_col] > self.MAX_READS]
-        if df.shape[0]:
-            for _, row in df.iterrows():
-                sn = row[index_col]
-                # look for any sample (fwd/rev pairs) that have the sample_name
-                # as prefix of their filename
-                files = glob(f"{self.raw_fastq_files_path}/*/{sn}*.fastq.gz")
-                # for each file let's get their folder (dn) and filename (bn),
-                # then create a fullpath with with dn and bn where we are
-                # changing the filename from fastq.gz to full.gz; then
-                # subsample this full.gz to a new file with the correct
-                # fastq.gz via seqtk
+        if not df.shape[0]:
+            return
+
+        # look for any sample (fwd/rev pairs) that have the sample_name as
+        # prefix of their filename. the mates of each set of reads (R1, R2,
+        # I1, ...) are subsampled together so that they remain paired.
+        mates = []
+        seen = set()
+        for _, row in df.iterrows():
+            sn = row[index_col]
+            files = glob(f"{self.raw_fastq_files_path}/*/{sn}*.fastq.gz")
+            groups = [x for x in group_mates(files) if x[0] not in seen]
+            seen.update(x[0] for x in groups)
+            known = self._records_per_file(row[read_col], groups, counted_orientations)
+            mates += [(sn, row[read_col], x, known) for x in groups]
+
+        # the exact counts recorded by SeqCountsJob are preferred to the
+        # totals derived from the reports. files are only counted if
+        # neither is known. the reports' totals are only hints: they may
+        # undercount e.g. when reads were demultiplexed again.
+        catalog = CountCatalog(join(self.pipeline.output_path, CountCatalog.FILE_NAME))
+        cached = catalog.get_many([x[0] for _, _, x, _ in mates])
+
+        jobs = []
+        for sn, reads, files, known in mates:
+            exact = files[0] in cached
+            total = cached[files[0]]["records"] if exact else known
+            if total is not None and total <= self.MAX_READS:
+                # these files don't need to be rewritten.
+                continue
+            jobs.append((sn, reads, files, total, exact))
+
+        # each set of mates is read in a separate process, while the output
+        # is compressed w/a few threads per process. the subsampled reads
+        # replace the original files, which are kept as full.gz, or are
+        # restored if subsampling fails. the workers are spawned rather than
+        # forked, as the parent may hold threads and locks.
+        with ProcessPoolExecutor(
+            max_workers=self.SUBSAMPLE_WORKERS, mp_context=get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    subsample_in_place,
+                    files,
+                    self.MAX_READS,
+                    total=total,
+                    seed=self.SUBSAMPLE_SEED,
+                    threads=self.SUBSAMPLE_THREADS,
+                    # the selected records are rarely at the very end of a
+                    # file, so the remainder needn't be read if the total is
+                    # exact. files w/a total from the reports are read to
+                    # the end, so that an undercount raises an Error.
+                    early_stop=exact,
+                )
+                for _, _, files, total, exact in jobs
+            ]
+
+            for (sn, reads, files, _, _), future in zip(jobs, futures):
+                try:
+                    future.result()
+                except (OSError, ValueError) as e:
+                    raise ValueError(f"Error while subsampling {files}: {e}")
+
                 for f in files:
-                    dn = dirname(f)
-                    bn = basename(f)
-                    nbn = join(dn, bn.replace("fastq.gz", "full.gz"))
-                    cmd = f"mv {f} {nbn}"
-                    _, se, rv = system_call(cmd)
-                    if rv != 0 or se:
-                        raise ValueError(f"Error during mv: {cmd}. {se}")
-                    cmd = f"seqtk sample -s 42 {nbn} {self.MAX_READS} | gzip > {f}"
-                    _, se, rv = system_call(cmd)
-                    if rv != 0 or se:
-                        raise ValueError(f"Error during seqtk: {cmd}. {se}")
                     self.assay_warnings.append(
-                        f"{sn} ({bn}) had {row[read_col]} sequences, "
+                        f"{sn} ({basename(f)}) had {reads} sequences, "
                         f"subsampling to {self.MAX_READS}"
                     )
 
+    @staticmethod
+    def _records_per_file(reads, mates, counted_orientations):
+        """
+        Returns the number of records in each of a sample's files according
+        to the reports, if it can be determined.
+        :param reads: The number of reads reported for the sample.
+        :param mates: A list of the sample's sets of mate files.
+        :param counted_orientations: The orientations of the files whose
+        records were summed into reads, or None if reads is the number of
+        records in each file.
+        :return: The number of records or None.
+        """
+        if len(mates) != 1:
+            # the reads are spread across more than one set of files.
+            return None
+
+        if counted_orientations is None:
+            return int(reads)
+
+        counted = [
+            x
+            for x in mates[0]
+            if determine_orientation(basename(x)) in counted_orientations
+        ]
+
+        if not counted or reads % len(counted):
+            return None
+
+        return int(reads) // len(counted)
+
 
 class Illumina(Protocol):
     protocol_type = PROTOCOL_NAME_ILLUMINA
@@ -190,6 +276,10 @@ class Illumina(Protocol):
 class TellSeq(Protocol):
     protocol_type = PROTOCOL_NAME_TELLSEQ
     read_length = "short"
+    # the number of integrated files renamed concurrently and the plan they
+    # are renamed according to, saved next to the integrated directory.
+    POST_PROCESSING_WORKERS = 8
+    POST_PROCESSING_MANIFEST = "post_processing_manifest.tsv"
 
     def convert_raw_to_fastq(self):
         config = self.pipeline.get_software_configuration("tell-seq")
@@ -240,11 +330,11 @@ class TellSeq(Protocol):
 
         files_to_count_path = join(self.pipeline.output_path, "files_to_count.txt")
 
+        inventory = FileInventory.get(self.raw_fastq_files_path)
+
         with open(files_to_count_path, "w") as f:
-            for root, _, files in walk(self.raw_fastq_files_path):
-                for _file in files:
-                    if determine_orientation(_file) in ["R1", "R2"]:
-                        print(join(root, _file), file=f)
+            for entry in inventory.files(orientation=["R1", "R2"]):
+                print(entry.path, file=f)
 
         job = SeqCountsJob(
             self.pipeline.run_dir,
@@ -331,10 +421,8 @@ class TellSeq(Protocol):
         mapping = self._generate_mapping()
 
         # rename the files and move them into project directories.
-        for root, dirs, files in walk(self.raw_fastq_files_path):
-            for _file in files:
-                fastq_file = join(root, _file)
-                self._post_process_file(fastq_file, mapping, self.lane_number)
+        with span("TRIntegrateJob.post_processing", "job", samples=len(mapping)):
+            self._post_process_files(mapping, self.lane_number)
 
         # audit the results to determine which samples failed to convert
         # properly. Append these to the failed-samples report and also
@@ -368,7 +456,75 @@ class TellSeq(Protocol):
             count += 1
         return results
 
-    def _post_process_file(self, fastq_file, mapping, lane):
+    def _post_process_files(self, mapping, lane):
+        """
+        Renames and moves every integrated file into its project directory.
+
+        All of the renames are planned before any are made and the plan is
+        saved to a manifest. If the manifest already exists, e.g. because a
+        previous attempt was interrupted, it is reused as long as it still
+        accounts for every file waiting to be moved, and renames that were
+        already made are skipped. Otherwise the files are planned again. The
+        manifest is removed once every rename has been made.
+        :param mapping: The mapping returned by _generate_mapping().
+        :param lane: The lane number.
+        :return: None
+        """
+        manifest_path = join(
+            dirname(self.raw_fastq_files_path), self.POST_PROCESSING_MANIFEST
+        )
+
+        inventory = FileInventory.get(self.raw_fastq_files_path)
+        current = {x.path for x in inventory.files()}
+
+        moves = None
+
+        if exists(manifest_path):
+            df = pd.read_csv(manifest_path, sep="\t", dtype=str)
+            moves = list(zip(df["source"], df["destination"]))
+
+            # files already moved to their destinations aren't pending.
+            pending = current - {dst for _, dst in moves}
+
+            # the manifest is stale if it doesn't list a pending file or a
+            # file it lists is neither at its source nor its destination.
+            if not pending.issubset(src for src, _ in moves) or not all(
+                src in current or exists(dst) for src, dst in moves
+            ):
+                current = pending
+                moves = None
+
+        if moves is None:
+            moves = [
+                (x, self._post_process_target(x, mapping, lane))
+                for x in sorted(current)
+            ]
+            # write the manifest in its entirety or not at all.
+            pd.DataFrame(moves, columns=["source", "destination"]).to_csv(
+                manifest_path + ".partial", sep="\t", index=False
+            )
+            replace(manifest_path + ".partial", manifest_path)
+
+        # create each project directory once, before any file is moved.
+        for project_dir in sorted({dirname(x) for _, x in moves}):
+            makedirs(project_dir, exist_ok=True)
+
+        def _move(src, dst):
+            if exists(dst) and not exists(src):
+                # moved by a previous attempt.
+                return
+            # if there's an error renaming and moving the file, let it pass
+            # up to the user.
+            rename(src, dst)
+
+        with ThreadPoolExecutor(max_workers=self.POST_PROCESSING_WORKERS) as executor:
+            # consume the results so that any Error raised is propagated.
+            list(executor.map(lambda x: _move(*x), moves))
+
+        # every file was moved; a later call must plan from what it finds.
+        remove(manifest_path)
+
+    def _post_process_target(self, fastq_file, mapping, lane):
         # generate names of the form generated by bcl-convert/bcl2fastq:
         # <Sample_ID>_S#_L00#_<R# or I#>_001.fastq.gz
         # see:
@@ -401,16 +557,7 @@ class TellSeq(Protocol):
             read_type,
         )
 
-        # ensure that the project directory exists before we rename and move
-        # the file to that location.
-        makedirs(join(_dir, project_name), exist_ok=True)
-
-        # if there's an error renaming and moving the file, let it pass up to
-        # the user.
-        final_path = join(_dir, project_name, new_name)
-        rename(fastq_file, final_path)
-
-        return final_path
+        return join(_dir, project_name, new_name)
 
 
 class PacBio(Protocol):
@@ -459,16 +606,26 @@ class PacBio(Protocol):
         gz_files = glob(f"{self.raw_fastq_files_path}/*/*.fastq.gz")
         data, missing_files = [], []
 
+        # counts from 'fqtools count' are also recorded in the run's catalog
+        # so that other steps don't need to count these files again.
+        catalog = CountCatalog(join(self.pipeline.output_path, CountCatalog.FILE_NAME))
+        cached = catalog.get_many(gz_files)
+        counted = []
+
         for gzf in gz_files:
             cf = gzf.replace(".fastq.gz", ".counts.txt")
             sn = basename(cf).replace(
                 f"_S000_L00{self.lane_number}_R1_001.counts.txt", ""
             )
-            if not exists(cf):
+            if gzf in cached:
+                counts = str(cached[gzf]["records"])
+            elif not exists(cf):
                 missing_files.append(sn)
                 continue
-            with open(cf, "r") as fh:
-                counts = fh.read().strip()
+            else:
+                with open(cf, "r") as fh:
+                    counts = fh.read().strip()
+                counted.append((gzf, int(counts), None))
             data.append(
                 {"Sample_ID": sn, "raw_reads_r1r2": counts, "Lane": self.lane_number}
             )
@@ -476,6 +633,8 @@ class PacBio(Protocol):
         if missing_files:
             raise ValueError(f"Missing count files: {missing_files}")
 
+        catalog.put_many(counted)
+
         df = pd.DataFrame(data)
         self.reports_path = join(
             self.pipeline.output_path, "ConvertJob", "SeqCounts.csv"
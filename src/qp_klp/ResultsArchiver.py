@@ -0,0 +1,164 @@
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps, load
+from os import makedirs, remove, replace, stat, walk
+from os.path import exists, isdir, join, relpath
+
+import pgzip
+
+
+class ResultsArchiver:
+    """
+    Builds the gzipped tarballs packaged into final_results in-process.
+
+    Each archive is streamed through tarfile into a multi-threaded gzip
+    writer, independent archives are built concurrently, and archives whose
+    inputs have not changed since they were last built are skipped on
+    restart. The archives produced have the same names and member layout
+    as the ones produced by 'tar zcvf <name> <inputs>' run from output_path.
+
+    The inputs each archive was built from are recorded in
+    <output_path>/.archive-manifests, alongside the job directories the
+    archives are built from rather than in final_results. The directory is
+    expected to remain there for as long as the run may be restarted.
+    """
+
+    MANIFEST_DIR = ".archive-manifests"
+    RESULTS_DIR = "final_results"
+
+    def __init__(self, output_path, max_workers=1, compression_threads=1):
+        """
+        :param output_path: The root directory the archive inputs are
+        relative to and the archives are written to.
+        :param max_workers: The number of archives built concurrently.
+        :param compression_threads: The number of threads used to compress
+        each archive.
+        """
+        if not isdir(output_path):
+            raise ValueError(f"'{output_path}' is not a directory")
+
+        self.output_path = output_path
+        self.max_workers = max_workers
+        self.compression_threads = compression_threads
+        self.manifest_path = join(output_path, self.MANIFEST_DIR)
+
+    def _input_manifest(self, inputs):
+        """
+        Returns a sorted list of (relative path, size, mtime) for every file
+        found under inputs.
+        :param inputs: A list of paths relative to output_path.
+        :return: A list of lists.
+        """
+        results = []
+
+        for input in inputs:
+            full_path = join(self.output_path, input)
+            if isdir(full_path):
+                for root, dirs, files in walk(full_path):
+                    for some_file in files:
+                        fp = join(root, some_file)
+                        st = stat(fp)
+                        results.append(
+                            [relpath(fp, self.output_path), st.st_size, st.st_mtime_ns]
+                        )
+            elif exists(full_path):
+                st = stat(full_path)
+                results.append([input, st.st_size, st.st_mtime_ns])
+
+        results.sort()
+
+        return results
+
+    def _archive_exists(self, archive_name):
+        return exists(join(self.output_path, archive_name)) or exists(
+            join(self.output_path, self.RESULTS_DIR, archive_name)
+        )
+
+    def _read_manifest(self, archive_name):
+        manifest_fp = join(self.manifest_path, f"{archive_name}.json")
+
+        if not exists(manifest_fp):
+            return None
+
+        with open(manifest_fp, "r") as f:
+            return load(f)
+
+    def _write_manifest(self, archive_name, manifest):
+        makedirs(self.manifest_path, exist_ok=True)
+
+        manifest_fp = join(self.manifest_path, f"{archive_name}.json")
+        tmp_fp = f"{manifest_fp}.tmp"
+
+        with open(tmp_fp, "w") as f:
+            f.write(dumps(manifest))
+
+        replace(tmp_fp, manifest_fp)
+
+    def is_up_to_date(self, archive_name, inputs):
+        """
+        Returns True if archive_name was built from the current inputs.
+        :param archive_name: The file-name of the archive e.g. 'prep-files.tgz'
+        :param inputs: A list of paths relative to output_path.
+        :return: bool
+        """
+        if not self._archive_exists(archive_name):
+            return False
+
+        return self._read_manifest(archive_name) == self._input_manifest(inputs)
+
+    def build(self, archive_name, inputs):
+        """
+        Builds a single archive in output_path.
+        :param archive_name: The file-name of the archive e.g. 'prep-files.tgz'
+        :param inputs: A list of paths relative to output_path.
+        :return: True if the archive was (re)built, False if it was skipped.
+        """
+        manifest = self._input_manifest(inputs)
+
+        if (
+            self._archive_exists(archive_name)
+            and self._read_manifest(archive_name) == manifest
+        ):
+            return False
+
+        archive_fp = join(self.output_path, archive_name)
+        tmp_fp = f"{archive_fp}.partial"
+
+        try:
+            # stream mode ('w|') writes members sequentially w/out seeking,
+            # which is all the compressor supports.
+            gz = pgzip.open(tmp_fp, mode="wb", thread=self.compression_threads)
+            with gz, tarfile.open(fileobj=gz, mode="w|") as tar:
+                for input in inputs:
+                    tar.add(join(self.output_path, input), arcname=input)
+        except Exception:
+            if exists(tmp_fp):
+                remove(tmp_fp)
+            raise
+
+        # a stale copy from a previous run would otherwise collide with the
+        # new archive when it is moved into final_results.
+        stale_fp = join(self.output_path, self.RESULTS_DIR, archive_name)
+        if exists(stale_fp):
+            remove(stale_fp)
+
+        replace(tmp_fp, archive_fp)
+        self._write_manifest(archive_name, manifest)
+
+        return True
+
+    def build_all(self, archives):
+        """
+        Builds a set of independent archives concurrently.
+        :param archives: A dict of archive file-names to lists of inputs.
+        :return: A dict of archive file-names to True (built) or False
+        (skipped).
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                name: executor.submit(self.build, name, inputs)
+                for name, inputs in archives.items()
+            }
+
+            # result() re-raises any exception raised while building.
+            return {name: future.result() for name, future in futures.items()}
@@ -1,7 +1,7 @@
-from metapool import load_sample_sheet
 from metapool.sample_sheet import SAMPLE_SHEETS_BY_PROTOCOL as SSBP
 
 from sequence_processing_pipeline.Pipeline import Pipeline
+from sequence_processing_pipeline.SampleSheetCache import SampleSheetCache
 
 from .Assays import ASSAY_NAME_AMPLICON, METAOMIC_ASSAY_NAMES
 from .PacBioMetagenomicWorkflow import PacBioMetagenomicWorkflow
@@ -46,7 +46,8 @@ class WorkflowFactory:
             # SheetVersion will raise a ValueError() here, w/the message
             # "'{sheet}' doesn't appear to be a valid sample-sheet."
 
-            sheet = load_sample_sheet(kwargs["uif_path"])
+            parsed = SampleSheetCache.get(kwargs["uif_path"])
+            sheet = parsed.sheet
 
             # if we do not validate the sample-sheet now, it will be validated
             # downstream when we attempt to instantiate a Workflow(), which in
@@ -54,7 +55,7 @@ class WorkflowFactory:
             # and validate the sample-sheet on its own. This is an early
             # abort. Expect the user/caller to diagnose the sample-sheet in a
             # notebook or by other means.
-            if sheet.validate_and_scrub_sample_sheet():
+            if parsed.validate():
                 assay_type = sheet.Header["Assay"]
                 if assay_type not in METAOMIC_ASSAY_NAMES:
                     # NB: This Error is not likely to be raised unless an
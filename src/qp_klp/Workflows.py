@@ -1,7 +1,8 @@
 import logging
+import tarfile
 from glob import glob
 from json import dumps
-from os import environ, listdir, makedirs, walk
+from os import cpu_count, environ, listdir, makedirs, walk
 from os.path import exists, join, split
 from shutil import copyfile, rmtree
 from subprocess import PIPE, Popen
@@ -9,9 +10,17 @@ from subprocess import PIPE, Popen
 import pandas as pd
 from metapool.sample_sheet import PROTOCOL_NAME_PACBIO_SMRT
 
+from sequence_processing_pipeline.PipelineError import PipelineError
 from sequence_processing_pipeline.util import determine_orientation
 
 from .Assays import ASSAY_NAME_AMPLICON
+from .ResultsArchiver import ResultsArchiver
+
+try:
+    from os import sched_getaffinity
+except ImportError:
+    # not available on macOS.
+    sched_getaffinity = None
 
 
 class WorkflowError(Exception):
@@ -31,6 +40,7 @@ class Workflow:
 
         # initializing member variables known to be used in class and/or in
         # mixins.
+        self.archives = {}
         self.cmds_log_path = None
         self.cmds = None
         self.has_replicates = None
@@ -317,6 +327,10 @@ class Workflow:
             # do not add the command to the list unless at least one of
             # the inputs exists. It's okay for a command to go unprocessed.
             if confirmed_inputs:
+                if action == TAR_CMD:
+                    # archives are built in-process by execute_commands().
+                    self.archives[output] = confirmed_inputs
+
                 # convert to string form before using.
                 confirmed_inputs = " ".join(confirmed_inputs)
                 if order == "OUTPUT_FIRST":
@@ -340,6 +354,7 @@ class Workflow:
         results.sort()
 
         if len(results) > 0:
+            self.archives["sample-files.tgz"] = results
             return "tar zcvf sample-files.tgz" + " " + " ".join(results)
 
     def _process_fastp_report_dirs(self):
@@ -359,6 +374,7 @@ class Workflow:
 
         if report_dirs:
             report_dirs.sort()
+            self.archives["reports-NuQCJob.tgz"] = report_dirs
             return "tar zcvf reports-NuQCJob.tgz " + " ".join(report_dirs)
         else:
             # It is okay to return an empty list of commands if reports_dirs
@@ -376,6 +392,8 @@ class Workflow:
                 f.write(f"{cmd}\n")
 
     def generate_commands(self):
+        self.archives = {}
+
         cmds = self._helper_process_operations()
 
         result = self._process_fastp_report_dirs()
@@ -403,9 +421,55 @@ class Workflow:
 
         self._write_commands_to_output_path()
 
+    def _archive_cores(self):
+        """
+        Helper method for execute_commands().
+        :return: The number of cores to build archives w/: 'nprocs' from the
+        optional 'archive' configuration, or else every core this process is
+        allowed to run on, i.e. those allocated to the job.
+        """
+        try:
+            config = self.pipeline.get_software_configuration("archive")
+        except PipelineError:
+            config = {}
+
+        if "nprocs" in config:
+            return int(config["nprocs"])
+
+        if sched_getaffinity is not None:
+            return len(sched_getaffinity(0))
+
+        return cpu_count() or 1
+
     def execute_commands(self):
-        # execute the list of commands in order
+        # the tar commands recorded in cmds.log are performed in-process and
+        # concurrently. Archives whose inputs are unchanged since a previous
+        # attempt are not rebuilt.
+        archive_cmds = {
+            f"cd {self.pipeline.output_path}; tar zcvf {name} {' '.join(inputs)}"
+            for name, inputs in self.archives.items()
+        }
+
+        if self.archives:
+            # the cores are split between the archives built at once and
+            # the threads compressing each of them.
+            cores = self._archive_cores()
+            workers = max(1, min(len(self.archives), cores))
+            archiver = ResultsArchiver(
+                self.pipeline.output_path,
+                max_workers=workers,
+                compression_threads=max(1, cores // workers),
+            )
+            try:
+                archiver.build_all(self.archives)
+            except (OSError, tarfile.TarError) as e:
+                raise WorkflowError(f"could not create archives: {e}")
+
+        # execute the remaining list of commands in order
         for cmd in self.cmds:
+            if cmd in archive_cmds:
+                continue
+
             p = Popen(
                 cmd, universal_newlines=True, shell=True, stdout=PIPE, stderr=PIPE
             )
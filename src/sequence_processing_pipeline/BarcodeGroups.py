@@ -0,0 +1,180 @@
+import gzip
+from collections import namedtuple
+
+import numpy as np
+
+from sequence_processing_pipeline.FastqCounter import open_fastq
+
+# barcode: the barcode, as bytes.
+# count: the number of records w/the barcode.
+# start, stop: the range of the group's records in the sorted output.
+# r1_range, r2_range: the (start, stop) uncompressed byte offsets of the
+# group in the sorted R1 and R2 output.
+BarcodeGroup = namedtuple(
+    "BarcodeGroup", ["barcode", "count", "start", "stop", "r1_range", "r2_range"]
+)
+
+
+class BarcodeGroups:
+    """
+    Reads the barcode groups written by 'integrate-indices-np.py integrate
+    --barcode-groups'.
+
+    When integrate sorts records by barcode, the records sharing a barcode
+    are written consecutively. The groups file records where each group
+    begins, so that a group can be found w/out scanning the output.
+
+    If the output was written w/'--bgzf', the file also records the virtual
+    offset of each group and a group is read by decompressing only the
+    blocks that hold it. Groups can then be processed in parallel, e.g. by
+    splitting them w/shards().
+    """
+
+    def __init__(self, groups_path):
+        """
+        :param groups_path: Path to a .npz file written by integrate.
+        """
+        with np.load(groups_path) as data:
+            self.barcodes = data["barcodes"]
+            self.counts = data["counts"]
+            self.starts = data["starts"]
+            self.r1_offsets = data["r1_offsets"]
+            self.r2_offsets = data["r2_offsets"]
+            # only present for BGZF output.
+            self.r1_voffsets = data.get("r1_voffsets")
+            self.r2_voffsets = data.get("r2_voffsets")
+
+        if not (
+            len(self.barcodes)
+            == len(self.counts)
+            == len(self.starts)
+            == len(self.r1_offsets) - 1
+            == len(self.r2_offsets) - 1
+        ):
+            raise ValueError(f"'{groups_path}' is not a valid barcode groups file")
+
+        for voffsets in (self.r1_voffsets, self.r2_voffsets):
+            if voffsets is not None and len(voffsets) != len(self.r1_offsets):
+                raise ValueError(f"'{groups_path}' is not a valid barcode groups file")
+
+    @property
+    def is_bgzf(self):
+        return self.r1_voffsets is not None and self.r2_voffsets is not None
+
+    def __len__(self):
+        return len(self.barcodes)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._group(i)
+
+    def _group(self, i):
+        start = int(self.starts[i])
+        count = int(self.counts[i])
+        return BarcodeGroup(
+            bytes(self.barcodes[i]),
+            count,
+            start,
+            start + count,
+            (int(self.r1_offsets[i]), int(self.r1_offsets[i + 1])),
+            (int(self.r2_offsets[i]), int(self.r2_offsets[i + 1])),
+        )
+
+    def get(self, barcode):
+        """
+        Returns the group of records w/a barcode.
+        :param barcode: A barcode, as str or bytes.
+        :return: A BarcodeGroup or None if no records have the barcode.
+        """
+        if isinstance(barcode, str):
+            barcode = barcode.encode()
+
+        # barcodes are stored in sorted order.
+        i = int(np.searchsorted(self.barcodes, barcode))
+
+        if i < len(self) and self.barcodes[i] == barcode:
+            return self._group(i)
+
+        return None
+
+    def shards(self, count):
+        """
+        Splits the groups into contiguous ranges w/similar numbers of records.
+        :param count: The number of shards to create.
+        :return: A list of (first, last) group indices, where last is
+        exclusive. Empty shards are not returned.
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        total = int(self.counts.sum())
+        # the first group of each shard is the one holding its first record.
+        cuts = np.searchsorted(
+            self.starts, np.arange(1, count) * total / count, side="right"
+        )
+        bounds = np.unique(np.concatenate(([0], cuts, [len(self)])))
+
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def read_range(self, fastq_path, first, last, orientation="R1"):
+        """
+        Returns the records of a range of barcode groups from sorted output.
+        :param fastq_path: Path to the R1 or R2 output of integrate.
+        :param first: The index of the first group.
+        :param last: The index after the last group.
+        :param orientation: 'R1' or 'R2', matching fastq_path.
+        :return: The groups' records, as bytes.
+        """
+        if orientation not in ("R1", "R2"):
+            raise ValueError(f"'{orientation}' is not a valid orientation")
+
+        if not 0 <= first <= last <= len(self):
+            raise ValueError(f"({first}, {last}) is not a valid range of groups")
+
+        if orientation == "R1":
+            offsets, voffsets = self.r1_offsets, self.r1_voffsets
+        else:
+            offsets, voffsets = self.r2_offsets, self.r2_voffsets
+
+        length = int(offsets[last]) - int(offsets[first])
+
+        if length == 0:
+            return b""
+
+        if voffsets is not None:
+            voffset = int(voffsets[first])
+
+            # a virtual offset is the position of a block in the compressed
+            # file and the position of the group within that block.
+            with open(fastq_path, "rb") as raw:
+                raw.seek(voffset >> 16)
+                with gzip.GzipFile(fileobj=raw) as f:
+                    f.read(voffset & 0xFFFF)
+                    return f.read(length)
+
+        # seeking within a gzipped file decompresses everything before the
+        # offset, but nothing after the group is read.
+        with open_fastq(fastq_path) as f:
+            f.seek(int(offsets[first]))
+            return f.read(length)
+
+    def read_group(self, fastq_path, barcode, orientation="R1"):
+        """
+        Returns the records of a barcode group from the sorted output.
+        :param fastq_path: Path to the R1 or R2 output of integrate.
+        :param barcode: A barcode, as str or bytes.
+        :param orientation: 'R1' or 'R2', matching fastq_path.
+        :return: The group's records, as bytes.
+        """
+        if orientation not in ("R1", "R2"):
+            raise ValueError(f"'{orientation}' is not a valid orientation")
+
+        if isinstance(barcode, str):
+            barcode = barcode.encode()
+
+        i = int(np.searchsorted(self.barcodes, barcode))
+
+        if i == len(self) or self.barcodes[i] != barcode:
+            return b""
+
+        return self.read_range(fastq_path, i, i + 1, orientation)
@@ -1,14 +1,19 @@
 import glob
 import gzip
+import logging
 import os
 
 import click
 
-from sequence_processing_pipeline.util import determine_orientation, iter_paired_files
+from sequence_processing_pipeline.util import determine_orientation, pair_files
 
 
 def split_similar_size_bins(
-    data_location_path, max_file_list_size_in_gb, batch_prefix, allow_fwd_only=False
+    data_location_path,
+    max_file_list_size_in_gb,
+    batch_prefix,
+    allow_fwd_only=False,
+    strict=True,
 ):
     """Partitions input fastqs to coarse bins
 
@@ -16,6 +21,8 @@ def split_similar_size_bins(
     :param max_file_list_size_in_gb: Upper threshold for file-size.
     :param batch_prefix: Path + file-name prefix for output-files.
     :param allow_fwd_only: ignore rev match, helpful for long reads.
+    :param strict: raise an Error if any R1 or R2 file lacks a mate. If
+    False, files w/out a mate are logged and left out of the bins.
     :return: The number of output-files created, size of largest bin.
     """
     # to prevent issues w/filenames like the ones below from being mistaken
@@ -65,7 +72,15 @@ def split_similar_size_bins(
 
             fp.write("%s\t%s\n" % (a, output_base))
     else:
-        for a, b in iter_paired_files(fastq_paths):
+        paired = pair_files(fastq_paths)
+        unpaired = sorted(paired.unpaired_r1 + paired.unpaired_r2)
+
+        if unpaired:
+            if strict:
+                raise ValueError(f"Files are not paired: {', '.join(unpaired)}")
+            logging.warning(f"skipping unpaired files: {', '.join(unpaired)}")
+
+        for a, b in paired.pairs:
             r1_size = os.stat(a).st_size
             r2_size = os.stat(b).st_size
 
@@ -105,7 +120,57 @@ def split_similar_size_bins(
     return split_offset, max_bucket_size
 
 
-def demux_cmd(id_map_fp, fp_fp, out_d, task, maxtask):
+# the columns of a demux manifest. path is relative to the output directory.
+DEMUX_MANIFEST_COLUMNS = ["path", "records", "bases", "bytes"]
+
+
+def write_demux_manifest(manifest_path, out_d, counts):
+    """Write the number of records, bases and bytes written to each file
+
+    :param manifest_path: Path to the TSV manifest to create.
+    :param out_d: The demux output directory.
+    :param counts: A dict of file path => [records, bases].
+    :return: None
+    """
+    # there are as many demux tasks as cpus; the directory may be created
+    # concurrently.
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+
+    with open(manifest_path, "w") as f:
+        f.write("\t".join(DEMUX_MANIFEST_COLUMNS) + "\n")
+        for fp, (records, bases) in sorted(counts.items()):
+            # files are closed, so this is their final compressed size.
+            size = os.stat(fp).st_size
+            rel_path = os.path.relpath(fp, out_d)
+            f.write(f"{rel_path}\t{records}\t{bases}\t{size}\n")
+
+
+def read_demux_manifests(manifest_paths):
+    """Merge demux manifests
+
+    :param manifest_paths: A list of paths to manifests.
+    :return: A dict of relative path => {'records', 'bases', 'bytes'}.
+    """
+    results = {}
+
+    for manifest_path in manifest_paths:
+        with open(manifest_path, "r") as f:
+            header = f.readline().rstrip("\n").split("\t")
+            if header != DEMUX_MANIFEST_COLUMNS:
+                raise ValueError(f"'{manifest_path}' is not a demux manifest")
+
+            for line in f:
+                rel_path, records, bases, size = line.rstrip("\n").split("\t")
+                results[rel_path] = {
+                    "records": int(records),
+                    "bases": int(bases),
+                    "bytes": int(size),
+                }
+
+    return results
+
+
+def demux_cmd(id_map_fp, fp_fp, out_d, task, maxtask, manifest_path=None):
     with open(id_map_fp, "r") as f:
         id_map = f.readlines()
         id_map = [line.strip().split("\t") for line in id_map]
@@ -113,11 +178,15 @@ def demux_cmd(id_map_fp, fp_fp, out_d, task, maxtask):
     # fp needs to be an open file handle.
     # ensure task and maxtask are proper ints when coming from cmd-line.
     with open(fp_fp, "r") as fp:
-        demux(id_map, fp, out_d, int(task), int(maxtask))
+        demux(id_map, fp, out_d, int(task), int(maxtask), manifest_path)
+
 
+def demux(id_map, fp, out_d, task, maxtask, manifest_path=None):
+    """Split infile data based in provided map
 
-def demux(id_map, fp, out_d, task, maxtask):
-    """Split infile data based in provided map"""
+    :param manifest_path: Optional path to write a manifest of the records,
+    bases and bytes written to each output file.
+    """
     delimiter = "::MUX::"
     mode = "wt"
     ext = ".fastq.gz"
@@ -125,6 +194,8 @@ def demux(id_map, fp, out_d, task, maxtask):
     rec = "@"
 
     openfps = {}
+    # idx => orientation => [records, bases]
+    counts = {}
 
     for offset, (idx, r1, r2, outbase) in enumerate(id_map):
         if offset % maxtask == task:
@@ -146,6 +217,7 @@ def demux(id_map, fp, out_d, task, maxtask):
             current_fp_r2 = gzip.open(fullname_r2, mode)
             current_fp = {"1": current_fp_r1, "2": current_fp_r2}
             openfps[idx] = current_fp
+            counts[idx] = {"1": [0, 0], "2": [0, 0]}
 
     # setup a parser
     seq_id = iter(fp)
@@ -192,10 +264,25 @@ def demux(id_map, fp, out_d, task, maxtask):
         current_fp[orientation].write(d)
         current_fp[orientation].write(q)
 
+        current_counts = counts[fname_encoded][orientation]
+        current_counts[0] += 1
+        current_counts[1] += len(s.rstrip("\n"))
+
     for d in openfps.values():
         for f in d.values():
             f.close()
 
+    if manifest_path is not None:
+        write_demux_manifest(
+            manifest_path,
+            out_d,
+            {
+                openfps[idx][o].name: counts[idx][o]
+                for idx in openfps
+                for o in openfps[idx]
+            },
+        )
+
 
 @click.group()
 def cli():
@@ -208,7 +295,8 @@ def cli():
 @click.option("--output", type=click.Path(exists=True), required=True)
 @click.option("--task", type=int, required=True)
 @click.option("--maxtask", type=int, required=True)
-def demux_just_fwd(id_map, infile, output, task, maxtask):
+@click.option("--manifest", type=click.Path(), required=False)
+def demux_just_fwd(id_map, infile, output, task, maxtask, manifest):
     with open(id_map, "r") as f:
         id_map = f.readlines()
         id_map = [line.strip().split("\t") for line in id_map]
@@ -216,11 +304,15 @@ def demux_just_fwd(id_map, infile, output, task, maxtask):
     # fp needs to be an open file handle.
     # ensure task and maxtask are proper ints when coming from cmd-line.
     with open(infile, "r") as fp:
-        demux_just_fwd_processing(id_map, fp, output, int(task), int(maxtask))
+        demux_just_fwd_processing(id_map, fp, output, int(task), int(maxtask), manifest)
+
 
+def demux_just_fwd_processing(id_map, fp, out_d, task, maxtask, manifest_path=None):
+    """Split infile data based in provided map
 
-def demux_just_fwd_processing(id_map, fp, out_d, task, maxtask):
-    """Split infile data based in provided map"""
+    :param manifest_path: Optional path to write a manifest of the records,
+    bases and bytes written to each output file.
+    """
     delimiter = "::MUX::"
     mode = "wt"
     ext = ".fastq.gz"
@@ -228,6 +320,8 @@ def demux_just_fwd_processing(id_map, fp, out_d, task, maxtask):
     rec = "@"
 
     openfps = {}
+    # idx => orientation => [records, bases]
+    counts = {}
 
     for offset, (idx, r1, outbase) in enumerate(id_map):
         if offset % maxtask == task:
@@ -247,6 +341,7 @@ def demux_just_fwd_processing(id_map, fp, out_d, task, maxtask):
             current_fp_r1 = gzip.open(fullname_r1, mode)
             current_fp = {"1": current_fp_r1}
             openfps[idx] = current_fp
+            counts[idx] = {"1": [0, 0]}
 
     # setup a parser
     seq_id = iter(fp)
@@ -277,6 +372,21 @@ def demux_just_fwd_processing(id_map, fp, out_d, task, maxtask):
         current_fp[orientation].write(d)
         current_fp[orientation].write(q)
 
+        current_counts = counts[fname_encoded][orientation]
+        current_counts[0] += 1
+        current_counts[1] += len(s.rstrip("\n"))
+
     for d in openfps.values():
         for f in d.values():
             f.close()
+
+    if manifest_path is not None:
+        write_demux_manifest(
+            manifest_path,
+            out_d,
+            {
+                openfps[idx][o].name: counts[idx][o]
+                for idx in openfps
+                for o in openfps[idx]
+            },
+        )
@@ -0,0 +1,182 @@
+import sqlite3
+from contextlib import closing
+from json import dumps, loads
+from os import stat
+from os.path import abspath
+
+from sequence_processing_pipeline.FastqCounter import count_fastq
+
+
+class CountCatalog:
+    """
+    A persistent catalog of the number of records and bases in fastq files.
+
+    Entries are keyed on a file's absolute path and are only returned while
+    the file's size, modification time and inode are unchanged, so that a
+    file that is rewritten (e.g. subsampled) is counted again. The catalog
+    is a SQLite database, normally kept in a run's output directory so that
+    restarted runs don't count the same files again.
+
+    SQLite locking is unreliable on some network filesystems; the catalog
+    should be written from a single process (e.g. the Job that submits the
+    array job), while array tasks only count and report their results.
+    """
+
+    # the name of the catalog within a run's output directory.
+    FILE_NAME = "seq_counts.sqlite"
+
+    def __init__(self, db_path, timeout=60):
+        """
+        :param db_path: Path to the SQLite database. Created if needed.
+        :param timeout: Seconds to wait for a lock held by another process.
+        """
+        self.db_path = db_path
+        self.timeout = timeout
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+
+        if not self._initialized:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS counts ("
+                    "path TEXT PRIMARY KEY, "
+                    "size INTEGER NOT NULL, "
+                    "mtime_ns INTEGER NOT NULL, "
+                    "inode INTEGER NOT NULL, "
+                    "records INTEGER NOT NULL, "
+                    "bases INTEGER, "
+                    "histogram TEXT)"
+                )
+            self._initialized = True
+
+        return conn
+
+    @staticmethod
+    def fingerprint(file_path):
+        """
+        Returns the values that identify the current contents of a file.
+        :param file_path: Path to a file.
+        :return: A tuple of (size, mtime_ns, inode).
+        """
+        st = stat(file_path)
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def get_many(self, file_paths):
+        """
+        Returns the catalogued counts for the files that haven't changed.
+        :param file_paths: A list of paths to files.
+        :return: A dict of path => {'records', 'bases', 'histogram'}.
+        Missing, modified and uncatalogued files are not included.
+        """
+        fingerprints = {}
+
+        for fp in file_paths:
+            try:
+                fingerprints[fp] = (abspath(fp), self.fingerprint(fp))
+            except FileNotFoundError:
+                continue
+
+        results = {}
+
+        if not fingerprints:
+            return results
+
+        with closing(self._connect()) as conn:
+            for fp, (key, fingerprint) in fingerprints.items():
+                row = conn.execute(
+                    "SELECT size, mtime_ns, inode, records, bases, histogram "
+                    "FROM counts WHERE path = ?",
+                    (key,),
+                ).fetchone()
+
+                if row is None or tuple(row[:3]) != fingerprint:
+                    continue
+
+                results[fp] = {
+                    "records": row[3],
+                    "bases": row[4],
+                    "histogram": None if row[5] is None else loads(row[5]),
+                }
+
+        return results
+
+    def get(self, file_path):
+        """
+        Returns the catalogued counts for a file if it hasn't changed.
+        :param file_path: Path to a file.
+        :return: A dict of 'records', 'bases' and 'histogram' or None.
+        """
+        return self.get_many([file_path]).get(file_path)
+
+    def put_many(self, entries):
+        """
+        Adds or replaces the counts for a list of files.
+        :param entries: A list of (path, records, bases) or (path, records,
+        bases, histogram) tuples. bases and histogram may be None. Entries
+        for files that no longer exist are ignored.
+        :return: None
+        """
+        rows = []
+
+        for entry in entries:
+            fp, records, bases = entry[:3]
+            histogram = entry[3] if len(entry) > 3 else None
+
+            try:
+                fingerprint = self.fingerprint(fp)
+            except FileNotFoundError:
+                continue
+
+            rows.append(
+                (
+                    abspath(fp),
+                    *fingerprint,
+                    records,
+                    bases,
+                    None if histogram is None else dumps(histogram),
+                )
+            )
+
+        if not rows:
+            return
+
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO counts "
+                "(path, size, mtime_ns, inode, records, bases, histogram) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def put(self, file_path, records, bases=None, histogram=None):
+        """
+        Adds or replaces the counts for a file.
+        :param file_path: Path to a file.
+        :param records: The number of records in the file.
+        :param bases: (Optional) The number of bases in the file.
+        :param histogram: (Optional) A JSON-serializable read-length
+        histogram.
+        :return: None
+        """
+        self.put_many([(file_path, records, bases, histogram)])
+
+    def count(self, file_path, threads=1):
+        """
+        Returns the counts for a fastq file, counting it only if needed.
+        :param file_path: Path to a fastq file.
+        :param threads: The number of threads to decompress with.
+        :return: A dict of 'records', 'bases' and 'histogram'.
+        """
+        entry = self.get(file_path)
+
+        if entry is None:
+            before = self.fingerprint(file_path)
+            records, bases = count_fastq(file_path, threads=threads)
+            # don't catalog counts for a file that changed while counting.
+            if self.fingerprint(file_path) == before:
+                self.put(file_path, records, bases)
+            entry = {"records": records, "bases": bases, "histogram": None}
+
+        return entry
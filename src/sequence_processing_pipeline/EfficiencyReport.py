@@ -0,0 +1,247 @@
+from collections import Counter
+
+import pandas as pd
+
+from sequence_processing_pipeline.util import parse_slurm_duration, parse_slurm_memory
+
+
+class EfficiencyReport:
+    """
+    Summarizes the resources Slurm accounted to each task of a job.
+
+    For each array task (or the job itself, if it isn't an array job) the
+    report holds the elapsed time, CPU time and peak memory sacct reported,
+    along w/the CPU efficiency (CPU time / (elapsed time * allocated CPUs))
+    and the fraction of the requested memory that was used. Tasks that ran
+    much longer than the median task are flagged as stragglers.
+
+    Reports are used to right-size the resources Jobs request.
+    """
+
+    # the fields requested from sacct, in order.
+    SACCT_FIELDS = [
+        "JobID",
+        "State",
+        "Elapsed",
+        "TotalCPU",
+        "AllocCPUS",
+        "MaxRSS",
+        "ReqMem",
+        "NodeList",
+    ]
+
+    COLUMNS = [
+        "task_id",
+        "array_index",
+        "state",
+        "node_list",
+        "elapsed_seconds",
+        "cpu_seconds",
+        "alloc_cpus",
+        "cpu_efficiency",
+        "max_rss_bytes",
+        "req_mem_bytes",
+        "memory_used",
+        "memory_headroom",
+        "straggler",
+    ]
+
+    # tasks running this many times longer than the median task and at
+    # least MIN_STRAGGLER_SECONDS longer are stragglers.
+    STRAGGLER_FACTOR = 1.5
+    MIN_STRAGGLER_SECONDS = 60
+
+    def __init__(self, job_id, tasks):
+        """
+        :param job_id: The Slurm job-id.
+        :param tasks: A DataFrame w/the columns in COLUMNS.
+        """
+        self.job_id = job_id
+        self.tasks = tasks
+
+    @classmethod
+    def sacct_command(cls, job_id):
+        """
+        Returns the sacct command-line that from_sacct() parses.
+        :param job_id: A Slurm job-id.
+        :return: A command-line.
+        """
+        fields = ",".join(cls.SACCT_FIELDS)
+        return f"sacct -j {job_id} --parsable2 --noheader --format {fields}"
+
+    @classmethod
+    def from_sacct(cls, job_id, output):
+        """
+        Creates a report from the output of sacct_command().
+        :param job_id: The Slurm job-id.
+        :param output: sacct's stdout.
+        :return: An EfficiencyReport.
+        """
+        tasks = {}
+        peak_rss = {}
+
+        for line in output.splitlines():
+            fields = line.split("|")
+
+            if len(fields) != len(cls.SACCT_FIELDS):
+                continue
+
+            row = dict(zip(cls.SACCT_FIELDS, fields))
+            task_id, _, step = row["JobID"].partition(".")
+
+            # steps (e.g. '1234_1.batch') report the memory used. their CPU
+            # time is already included in their task's.
+            if step:
+                rss = parse_slurm_memory(row["MaxRSS"])
+                if rss is not None:
+                    peak_rss[task_id] = max(peak_rss.get(task_id, 0), rss)
+                continue
+
+            tasks[task_id] = row
+
+        rows = []
+
+        for task_id, row in tasks.items():
+            _, _, index = task_id.partition("_")
+            alloc_cpus = int(row["AllocCPUS"] or 0)
+            elapsed = parse_slurm_duration(row["Elapsed"])
+            cpu = parse_slurm_duration(row["TotalCPU"])
+            rss = peak_rss.get(task_id, parse_slurm_memory(row["MaxRSS"]))
+
+            # older versions of Slurm suffix ReqMem w/'c' when memory was
+            # requested per CPU.
+            req_mem = parse_slurm_memory(row["ReqMem"])
+            if req_mem is not None and row["ReqMem"].endswith("c"):
+                req_mem *= alloc_cpus
+
+            rows.append(
+                {
+                    "task_id": task_id,
+                    "array_index": int(index) if index.isdigit() else None,
+                    "state": row["State"].split()[0] if row["State"] else "",
+                    "node_list": row["NodeList"],
+                    "elapsed_seconds": elapsed,
+                    "cpu_seconds": cpu,
+                    "alloc_cpus": alloc_cpus,
+                    "max_rss_bytes": rss,
+                    "req_mem_bytes": req_mem,
+                }
+            )
+
+        df = pd.DataFrame(rows, columns=cls.COLUMNS)
+
+        for column in (
+            "array_index",
+            "elapsed_seconds",
+            "cpu_seconds",
+            "alloc_cpus",
+            "max_rss_bytes",
+            "req_mem_bytes",
+        ):
+            df[column] = pd.to_numeric(df[column])
+
+        if not df.empty:
+            df = df.sort_values(["array_index", "task_id"], na_position="first")
+            df = df.reset_index(drop=True)
+
+        df["cpu_efficiency"] = df["cpu_seconds"] / (
+            df["elapsed_seconds"] * df["alloc_cpus"]
+        ).where(lambda x: x > 0)
+        df["memory_used"] = df["max_rss_bytes"] / df["req_mem_bytes"].where(
+            lambda x: x > 0
+        )
+        df["memory_headroom"] = 1 - df["memory_used"]
+
+        median = df["elapsed_seconds"].median()
+        df["straggler"] = (df["elapsed_seconds"] > cls.STRAGGLER_FACTOR * median) & (
+            df["elapsed_seconds"] - median > cls.MIN_STRAGGLER_SECONDS
+        )
+
+        return cls(job_id, df)
+
+    @property
+    def stragglers(self):
+        """
+        Returns the tasks that ran much longer than the median task.
+        :return: A DataFrame.
+        """
+        return self.tasks[self.tasks["straggler"]]
+
+    def usage(self):
+        """
+        Returns the job's total resource usage.
+        :return: A dict of cpu_seconds (summed over all tasks),
+        max_rss_bytes (the largest of any task) and max_task_seconds (the
+        longest task's elapsed time). Unknown values are None.
+        """
+
+        def _value(x):
+            return None if pd.isna(x) else float(x)
+
+        return {
+            "cpu_seconds": _value(self.tasks["cpu_seconds"].sum(min_count=1)),
+            "max_rss_bytes": _value(self.tasks["max_rss_bytes"].max()),
+            "max_task_seconds": _value(self.tasks["elapsed_seconds"].max()),
+        }
+
+    def write_csv(self, output_path):
+        """
+        Writes one row per task to a CSV file.
+        :param output_path: The path to the CSV file.
+        :return: None
+        """
+        self.tasks.to_csv(output_path, index=False)
+
+    def summary(self):
+        """
+        Returns a human-readable summary of the report.
+        :return: A str.
+        """
+        df = self.tasks
+
+        if df.empty:
+            return f"job {self.job_id}: sacct reported no tasks"
+
+        states = Counter(df["state"])
+        states = ", ".join(f"{k}: {v}" for k, v in sorted(states.items()))
+
+        elapsed = df["elapsed_seconds"]
+        efficiency = df["cpu_efficiency"]
+        memory = df["memory_used"]
+
+        lines = [
+            f"job {self.job_id}: {len(df)} task(s) ({states})",
+            f"elapsed: median {_duration(elapsed.median())}, "
+            + f"max {_duration(elapsed.max())}",
+            f"CPU efficiency: mean {_percent(efficiency.mean())}, "
+            + f"min {_percent(efficiency.min())}",
+            f"memory used: max {_percent(memory.max())} of requested, "
+            + f"median {_percent(memory.median())}",
+        ]
+
+        stragglers = self.stragglers
+        if not stragglers.empty:
+            lines.append(f"{len(stragglers)} straggler(s):")
+            for _, task in stragglers.iterrows():
+                lines.append(
+                    f"  {task['task_id']} on {task['node_list']}: "
+                    f"{_duration(task['elapsed_seconds'])}"
+                )
+
+        return "\n".join(lines)
+
+
+def _duration(seconds):
+    if pd.isna(seconds):
+        return "n/a"
+
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def _percent(fraction):
+    if pd.isna(fraction):
+        return "n/a"
+
+    return f"{fraction:.0%}"
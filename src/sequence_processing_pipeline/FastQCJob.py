@@ -8,12 +8,15 @@ from re import sub
 
 from jinja2 import Environment
 
+from sequence_processing_pipeline.FileInventory import FileInventory
 from sequence_processing_pipeline.Job import Job, KISSLoader
 from sequence_processing_pipeline.PipelineError import JobFailedError, PipelineError
 from sequence_processing_pipeline.util import determine_orientation
 
 
 class FastQCJob(Job):
+    collect_efficiency_report = True
+
     def __init__(
         self,
         run_dir,
@@ -115,23 +118,32 @@ class FastQCJob(Job):
 
     def _find_projects(self, path_to_run_id_data_fastq_dir, is_raw_input):
         results = []
+
+        # scan the entire directory once, rather than once per project.
+        inventory = FileInventory.get(path_to_run_id_data_fastq_dir)
+
         for directory in listdir(path_to_run_id_data_fastq_dir):
             project_dir = join(path_to_run_id_data_fastq_dir, directory)
-            files = self._find_files(project_dir)
 
             # extract only fastq files from the list and remove all files
             # in 'zero_files' sub-folder.
             files = [
-                x for x in files if x.endswith(".fastq.gz") and "zero_files" not in x
+                x
+                for x in inventory.files(under=project_dir, suffix=".fastq.gz")
+                if "zero_files" not in x.path
             ]
 
             # remove fastq files in the only-adapter-filtered
             # folder from consideration if they are present.
-            files = [x for x in files if "only-adapter-filtered" not in x]
+            files = [x for x in files if "only-adapter-filtered" not in x.path]
 
             r1_only, r2_only, i1_only, i2_only = [], [], [], []
-            for f in files:
-                o = determine_orientation(f)
+            for entry in files:
+                f = entry.path
+                # orientation is determined from the file-name when the
+                # inventory is built. Fall back to the full path to match
+                # legacy behavior when the file-name has no orientation.
+                o = entry.orientation or determine_orientation(f)
                 if o == "R1":
                     r1_only.append(f)
                 elif o == "R2":
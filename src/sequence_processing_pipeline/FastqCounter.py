@@ -0,0 +1,195 @@
+import heapq
+import sys
+from os import makedirs, replace, stat
+from os.path import basename, dirname
+
+import click
+import numpy as np
+import pgzip
+
+# the columns of a counts file.
+COUNTS_COLUMNS = ["path", "seq_counts", "base_pairs"]
+
+GZIP_MAGIC = b"\x1f\x8b"
+NEWLINE = ord("\n")
+
+
+def open_fastq(fastq_path, threads=1):
+    """Open a fastq file for reading in binary mode
+
+    :param fastq_path: Path to a fastq file. May be gzipped.
+    :param threads: The number of threads to decompress with.
+    :return: A file object.
+    """
+    with open(fastq_path, "rb") as f:
+        is_gzipped = f.read(2) == GZIP_MAGIC
+
+    if is_gzipped:
+        # pgzip inflates blocks in parallel when the file was written by
+        # pgzip (e.g. integrate-indices-np.py) and falls back to a single
+        # thread otherwise.
+        return pgzip.open(fastq_path, "rb", thread=threads)
+
+    return open(fastq_path, "rb")
+
+
+def count_fastq(fastq_path, threads=1, chunk_size=2**24):
+    """Count the records and bases in a fastq file
+
+    Equivalent to 'seqtk size' for four-line fastq records. The file is read
+    in large chunks and newlines are located w/numpy rather than parsing the
+    file line by line.
+
+    :param fastq_path: Path to a fastq file. May be gzipped.
+    :param threads: The number of threads to decompress with.
+    :param chunk_size: The number of bytes to scan at a time.
+    :return: The number of records and the number of bases.
+    """
+    bases = 0
+    # the number of lines completed so far.
+    line_count = 0
+    # the offset of the first byte of the current line.
+    line_start = 0
+    offset = 0
+
+    with open_fastq(fastq_path, threads) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+
+            ends = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == NEWLINE)
+
+            if len(ends):
+                ends += offset
+                starts = np.empty_like(ends)
+                starts[0] = line_start
+                starts[1:] = ends[:-1] + 1
+
+                # sequences are the second line of every record. find the
+                # first sequence line in this chunk and take every fourth.
+                first = (1 - line_count) % 4
+                bases += int((ends[first::4] - starts[first::4]).sum())
+
+                line_count += len(ends)
+                line_start = int(ends[-1]) + 1
+
+            offset += len(chunk)
+
+    # the last line may not end in a newline.
+    if offset > line_start:
+        if line_count % 4 == 1:
+            bases += offset - line_start
+        line_count += 1
+
+    if line_count % 4 != 0:
+        raise ValueError(f"'{fastq_path}' contains a truncated record")
+
+    return line_count // 4, bases
+
+
+def pack_by_size(file_paths, bin_count):
+    """Partition files into bins of similar total size
+
+    Files are assigned largest first to the bin w/the smallest total size.
+    Files that don't exist are treated as empty.
+
+    :param file_paths: A list of paths to files.
+    :param bin_count: The number of bins to create.
+    :return: A list of lists of paths. Empty bins are not returned.
+    """
+    sizes = []
+
+    for fp in file_paths:
+        try:
+            sizes.append((stat(fp).st_size, fp))
+        except FileNotFoundError:
+            sizes.append((0, fp))
+
+    # sort by size, largest first. break ties by path for reproducibility.
+    sizes.sort(key=lambda x: (-x[0], x[1]))
+
+    # (total size, number of files, bin index). the number of files breaks
+    # ties so that files of unknown size are still spread across bins.
+    heap = [(0, 0, i) for i in range(max(1, bin_count))]
+    bins = [[] for _ in heap]
+
+    for size, fp in sizes:
+        total, count, i = heapq.heappop(heap)
+        bins[i].append(fp)
+        heapq.heappush(heap, (total + size, count + 1, i))
+
+    return [sorted(x) for x in bins if x]
+
+
+def write_counts(file_paths, output_path, threads=1):
+    """Count the records and bases in a list of files and write a TSV
+
+    :param file_paths: A list of paths to fastq files.
+    :param output_path: Path to the TSV file to create.
+    :param threads: The number of threads to decompress with.
+    :return: None
+    """
+    makedirs(dirname(output_path) or ".", exist_ok=True)
+
+    # write to a temporary file so that a partial result is never mistaken
+    # for a complete one.
+    tmp_path = output_path + ".partial"
+
+    with open(tmp_path, "w") as f:
+        f.write("\t".join(COUNTS_COLUMNS) + "\n")
+        for fp in file_paths:
+            seq_counts, base_pairs = count_fastq(fp, threads=threads)
+            f.write(f"{fp}\t{seq_counts}\t{base_pairs}\n")
+
+    replace(tmp_path, output_path)
+
+
+def iter_counts(counts_paths):
+    """Iterate over the results in count files written by write_counts()
+
+    :param counts_paths: A list of paths to count files.
+    :return: A generator of (path, seq_counts, base_pairs) tuples.
+    """
+    for counts_path in counts_paths:
+        with open(counts_path, "r") as f:
+            header = f.readline().rstrip("\n").split("\t")
+            if header != COUNTS_COLUMNS:
+                raise ValueError(f"'{counts_path}' is not a counts file")
+
+            for line in f:
+                fp, seq_counts, base_pairs = line.rstrip("\n").split("\t")
+                yield fp, int(seq_counts), int(base_pairs)
+
+
+def read_counts(counts_paths):
+    """Merge count files written by write_counts()
+
+    :param counts_paths: A list of paths to count files.
+    :return: A dict of file name => {'seq_counts', 'base_pairs'}.
+    """
+    return {
+        basename(fp): {"seq_counts": seq_counts, "base_pairs": base_pairs}
+        for fp, seq_counts, base_pairs in iter_counts(counts_paths)
+    }
+
+
+@click.command()
+@click.option("--file-list", type=click.Path(exists=True), required=True)
+@click.option("--output", type=click.Path(), required=True)
+@click.option("--threads", type=int, default=1)
+def count_seqs(file_list, output, threads):
+    with open(file_list, "r") as f:
+        file_paths = [x.strip() for x in f]
+        file_paths = [x for x in file_paths if x != ""]
+
+    try:
+        write_counts(file_paths, output, threads=threads)
+    except (OSError, ValueError) as e:
+        # SeqCountsJob.parse_logs() reports lines w/this prefix.
+        print(f"[E::count_seqs] {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    count_seqs()
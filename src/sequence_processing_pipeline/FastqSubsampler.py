@@ -0,0 +1,211 @@
+from contextlib import ExitStack
+from itertools import islice
+from os import remove, replace
+
+import numpy as np
+import pgzip
+
+from sequence_processing_pipeline.FastqCounter import count_fastq, open_fastq
+
+# the number of records selected from and written at a time.
+BLOCK_SIZE = 2**16
+
+# numpy's hypergeometric sampler requires populations smaller than this.
+MAX_HYPERGEOMETRIC = 10**9
+
+
+def select_records(total, target, seed, block_size=BLOCK_SIZE):
+    """Select records uniformly at random, w/out replacement
+
+    The records are considered in consecutive blocks. The number of records
+    selected from each block is drawn from the hypergeometric distribution,
+    conditioned on the records that remain and the number that are still to
+    be selected, and then that many records are chosen from the block. Only
+    one block is held in memory at a time and the same seed always selects
+    the same records.
+
+    When the records that remain exceed what numpy's hypergeometric sampler
+    supports, the number selected from the block is approximated w/the
+    binomial distribution. Exactly target records are still selected.
+
+    :param total: The number of records to select from.
+    :param target: The number of records to select.
+    :param seed: The seed for the random number generator.
+    :param block_size: The number of records in each block.
+    :return: A generator of (block length, selected) tuples, where selected
+    is a sorted array of the offsets of the selected records in the block.
+    """
+    rng = np.random.default_rng(seed)
+    remaining = total
+    quota = min(target, total)
+
+    while remaining > 0:
+        n = min(block_size, remaining)
+        rest = remaining - n
+
+        if quota == 0:
+            selected = 0
+        elif rest == 0:
+            selected = quota
+        elif quota < MAX_HYPERGEOMETRIC and remaining - quota < MAX_HYPERGEOMETRIC:
+            selected = rng.hypergeometric(quota, remaining - quota, n)
+        else:
+            selected = rng.binomial(n, quota / remaining)
+
+        # never select more than the block holds or fewer than the records
+        # that remain after this block require.
+        selected = int(min(max(selected, quota - rest), n, quota))
+
+        if selected == n:
+            yield n, np.arange(n)
+        elif selected == 0:
+            yield n, np.empty(0, dtype=np.int64)
+        else:
+            yield n, np.sort(rng.choice(n, selected, replace=False))
+
+        quota -= selected
+        remaining = rest
+
+
+def _read_id(header):
+    # the read's name w/out the '@', any comment or a '/1' or '/2' suffix.
+    read_id = header.split(maxsplit=1)[0][1:]
+    if read_id[-2:] in (b"/1", b"/2"):
+        read_id = read_id[:-2]
+    return read_id
+
+
+def subsample_files(
+    input_paths,
+    output_paths,
+    target,
+    total=None,
+    seed=42,
+    threads=1,
+    compresslevel=6,
+    early_stop=False,
+):
+    """Select the same records from each of a set of mate files
+
+    The input files (e.g. R1, R2 and I1) are read in lockstep and the
+    records selected by select_records() are written to each of the output
+    files, which are gzipped w/pgzip. The output for a given seed does not
+    depend on the number of threads.
+
+    If early_stop is True, the inputs are not read past the last selected
+    record. This avoids reading the tail of each file, but the inputs are
+    then not checked for records beyond total, so total must be known to be
+    correct.
+
+    :param input_paths: A list of paths to fastq files w/the same reads in
+    the same order. May be gzipped.
+    :param output_paths: A list of paths to the gzipped fastq files to
+    create, one for each input file.
+    :param target: The number of records to keep.
+    :param total: (Optional) The number of records in each input file. If
+    not given, the first input file is counted.
+    :param seed: The seed for the random number generator.
+    :param threads: The number of threads to compress each output w/.
+    :param compresslevel: The gzip compression level.
+    :param early_stop: Stop reading once the last record is selected.
+    :return: The number of records written to each output file.
+    """
+    if len(input_paths) != len(output_paths):
+        raise ValueError("There must be an output path for each input path")
+
+    if total is None:
+        total, _ = count_fastq(input_paths[0], threads=threads)
+
+    tmp_paths = [x + ".partial" for x in output_paths]
+    quota = min(target, total)
+    written = 0
+
+    try:
+        with ExitStack() as stack:
+            inputs = [stack.enter_context(open_fastq(x, threads)) for x in input_paths]
+            # a fixed mtime keeps the output identical from run to run.
+            outputs = [
+                stack.enter_context(
+                    pgzip.PgzipFile(
+                        x,
+                        "wb",
+                        compresslevel=compresslevel,
+                        mtime=0,
+                        thread=threads,
+                    )
+                )
+                for x in tmp_paths
+            ]
+
+            for n, selected in select_records(total, target, seed):
+                if early_stop and written == quota:
+                    break
+
+                blocks = [list(islice(f, 4 * n)) for f in inputs]
+
+                for lines, fp in zip(blocks, input_paths):
+                    if len(lines) != 4 * n:
+                        raise ValueError(f"'{fp}' contains fewer than {total} records")
+
+                for offset in selected:
+                    ids = {_read_id(lines[4 * offset]) for lines in blocks}
+                    if len(ids) > 1:
+                        raise ValueError(
+                            f"Mates are out of order in {input_paths}: {sorted(ids)}"
+                        )
+
+                for lines, output in zip(blocks, outputs):
+                    output.write(
+                        b"".join(
+                            line
+                            for offset in selected
+                            for line in lines[4 * offset : 4 * offset + 4]
+                        )
+                    )
+
+                written += len(selected)
+
+            if not early_stop:
+                for f, fp in zip(inputs, input_paths):
+                    if f.read(1):
+                        raise ValueError(f"'{fp}' contains more than {total} records")
+    except BaseException:
+        for x in tmp_paths:
+            try:
+                remove(x)
+            except FileNotFoundError:
+                pass
+        raise
+
+    for tmp_path, fp in zip(tmp_paths, output_paths):
+        replace(tmp_path, fp)
+
+    return written
+
+
+def subsample_in_place(paths, target, **kwargs):
+    """Replace a set of mate files w/a subsample of their records
+
+    Each file is first renamed from fastq.gz to full.gz and the subsample
+    is written in its place. If subsampling fails, the original files are
+    restored.
+
+    :param paths: A list of paths to gzipped fastq files w/the same reads in
+    the same order.
+    :param target: The number of records to keep.
+    :param kwargs: Passed to subsample_files().
+    :return: The number of records written to each file.
+    """
+    full_paths = [x.replace("fastq.gz", "full.gz") for x in paths]
+    renamed = []
+
+    try:
+        for fp, full_path in zip(paths, full_paths):
+            replace(fp, full_path)
+            renamed.append((fp, full_path))
+
+        return subsample_files(full_paths, paths, target, **kwargs)
+    except BaseException:
+        for fp, full_path in renamed:
+            replace(full_path, fp)
+        raise
@@ -0,0 +1,282 @@
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from os import scandir, sep, stat
+from os.path import abspath
+from threading import Lock
+from time import time_ns
+
+from sequence_processing_pipeline.util import determine_orientation
+
+
+class FileEntry:
+    """
+    A file found in a FileInventory.
+
+    The file is not stat()ed when its directory is listed. Its size and
+    mtime are read from the filesystem the first time either is requested
+    and kept for the lifetime of the entry.
+    """
+
+    __slots__ = ("path", "root", "name", "orientation", "_stat")
+
+    def __init__(self, path, root, name, orientation):
+        """
+        :param path: Full path to the file.
+        :param root: Full path to the directory containing the file.
+        :param name: The file's name.
+        :param orientation: 'R1', 'R2', 'I1', 'I2' or None.
+        """
+        self.path = path
+        self.root = root
+        self.name = name
+        self.orientation = orientation
+        self._stat = None
+
+    def __repr__(self):
+        return f"FileEntry({self.path!r})"
+
+    def _get_stat(self):
+        if self._stat is None:
+            self._stat = stat(self.path)
+        return self._stat
+
+    @property
+    def size(self):
+        return self._get_stat().st_size
+
+    @property
+    def mtime_ns(self):
+        return self._get_stat().st_mtime_ns
+
+
+# a directory's cached listing.
+_Listing = namedtuple("_Listing", ["mtime_ns", "files", "subdirs"])
+
+
+class FileInventory:
+    """
+    A cached inventory of the files and directories found under a root.
+
+    The tree is traversed with scandir(), one directory per task, across a
+    small pool of threads. Each directory's listing is cached along w/its
+    modification time. On refresh, every directory is stat()ed but only the
+    directories whose modification time changed (i.e. had entries added,
+    removed or renamed) are listed again.
+
+    Listing a directory does not stat() the files in it. A file's size and
+    mtime are read the first time they are requested and are not updated
+    afterwards, even if the file is rewritten in place. Callers that need
+    current values for files that may still be growing or be rewritten
+    should stat() them directly.
+
+    At most MAX_INVENTORIES shared inventories are kept; the least recently
+    requested is dropped when another root is requested.
+    """
+
+    # directories modified this recently are always listed again, as a
+    # change within the filesystem's timestamp resolution could otherwise
+    # go unnoticed.
+    SETTLE_TIME_NS = 2 * 10**9
+
+    MAX_INVENTORIES = 16
+
+    _inventories = OrderedDict()
+    _inventories_lock = Lock()
+
+    def __init__(self, root, max_workers=8):
+        """
+        :param root: The directory to inventory.
+        :param max_workers: The number of directories listed concurrently.
+        """
+        self.root = root.rstrip(sep) or sep
+        self.max_workers = max_workers
+        self._listings = {}
+        self._lock = Lock()
+
+    @classmethod
+    def get(cls, root):
+        """
+        Returns the shared, refreshed inventory for root.
+        :param root: The directory to inventory.
+        :return: A FileInventory.
+        """
+        key = abspath(root)
+
+        with cls._inventories_lock:
+            if key in cls._inventories:
+                cls._inventories.move_to_end(key)
+            else:
+                cls._inventories[key] = cls(root)
+                while len(cls._inventories) > cls.MAX_INVENTORIES:
+                    cls._inventories.popitem(last=False)
+            inventory = cls._inventories[key]
+
+        inventory.refresh()
+
+        return inventory
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes all shared inventories.
+        :return: None
+        """
+        with cls._inventories_lock:
+            cls._inventories.clear()
+
+    def _list_directory(self, dir_path):
+        """
+        Returns the current listing for dir_path, reusing the cached listing
+        if the directory has not been modified.
+        """
+        try:
+            mtime = stat(dir_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        cached = self._listings.get(dir_path)
+
+        if (
+            cached is not None
+            and cached.mtime_ns == mtime
+            and time_ns() - mtime > self.SETTLE_TIME_NS
+        ):
+            return cached
+
+        files = []
+        subdirs = []
+
+        try:
+            with scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            # like os.walk(), do not descend into symlinked
+                            # directories.
+                            if not entry.is_symlink():
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            files.append(
+                                FileEntry(
+                                    entry.path,
+                                    dir_path,
+                                    entry.name,
+                                    determine_orientation(entry.name),
+                                )
+                            )
+                    except FileNotFoundError:
+                        # removed while the directory was being listed.
+                        continue
+        except FileNotFoundError:
+            return None
+
+        return _Listing(mtime, tuple(files), tuple(subdirs))
+
+    def refresh(self):
+        """
+        Brings the inventory up to date w/the filesystem.
+        :return: None
+        """
+        listings = {}
+
+        with self._lock:
+            frontier = [self.root]
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while frontier:
+                    results = executor.map(self._list_directory, frontier)
+                    next_frontier = []
+                    for dir_path, listing in zip(frontier, results):
+                        if listing is None:
+                            continue
+                        listings[dir_path] = listing
+                        next_frontier.extend(listing.subdirs)
+                    frontier = next_frontier
+
+            # directories that no longer exist are dropped.
+            self._listings = listings
+
+    @staticmethod
+    def _in_dirs(dir_path, dir_names):
+        # True if any component of dir_path is in dir_names.
+        return any(x in dir_names for x in dir_path.split(sep))
+
+    def files(
+        self,
+        under=None,
+        suffix=None,
+        orientation=None,
+        exclude_dirs=None,
+        include_dirs=None,
+    ):
+        """
+        Returns the files in the inventory, sorted by path.
+        :param under: Optional path to a directory below root.
+        :param suffix: Optional suffix or tuple of suffixes file-names must
+        end with.
+        :param orientation: Optional orientation or list of orientations.
+        :param exclude_dirs: Optional list of directory names. Files nested
+        at any depth below a directory w/one of these names are excluded.
+        :param include_dirs: Optional list of directory names. Only files
+        nested at any depth below a directory w/one of these names are
+        included.
+        :return: A list of FileEntry.
+        """
+        if isinstance(orientation, str):
+            orientation = [orientation]
+
+        if under is not None:
+            under = abspath(under).rstrip(sep)
+            prefix = under + sep
+
+        results = []
+
+        for dir_path, listing in self._listings.items():
+            if under is not None:
+                full_path = abspath(dir_path)
+                if full_path != under and not full_path.startswith(prefix):
+                    continue
+
+            if exclude_dirs and self._in_dirs(dir_path, exclude_dirs):
+                continue
+
+            if include_dirs and not self._in_dirs(dir_path, include_dirs):
+                continue
+
+            for entry in listing.files:
+                if suffix is not None and not entry.name.endswith(suffix):
+                    continue
+                if orientation is not None and entry.orientation not in orientation:
+                    continue
+                results.append(entry)
+
+        results.sort(key=lambda x: x.path)
+
+        return results
+
+    def directories(self, name=None):
+        """
+        Returns the directories in the inventory, sorted by path.
+        :param name: Optional directory name to match.
+        :return: A list of paths.
+        """
+        results = [
+            x
+            for x in self._listings
+            if name is None or x.rstrip(sep).split(sep)[-1] == name
+        ]
+
+        return sorted(results)
+
+    def subdirectories(self, dir_path):
+        """
+        Returns the immediate subdirectories of a directory in the inventory.
+        :param dir_path: A directory in the inventory.
+        :return: A sorted list of paths.
+        """
+        listing = self._listings.get(dir_path.rstrip(sep) or sep)
+
+        if listing is None:
+            return []
+
+        return sorted(listing.subdirs)
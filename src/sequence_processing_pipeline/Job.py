@@ -2,21 +2,31 @@ import logging
 import pathlib
 import re
 from collections import Counter
+from functools import wraps
 from glob import glob
 from inspect import stack
 from itertools import zip_longest
-from os import makedirs, walk
+from os import makedirs, stat, walk
 from os.path import basename, exists, getmtime, join, split
 from subprocess import PIPE, Popen
-from time import sleep
+from time import sleep, time
 
 from jinja2 import BaseLoader, TemplateNotFound
 
+from sequence_processing_pipeline.EfficiencyReport import EfficiencyReport
+from sequence_processing_pipeline.FileInventory import FileInventory
 from sequence_processing_pipeline.PipelineError import (
     ExecFailedError,
     JobFailedError,
     PipelineError,
 )
+from sequence_processing_pipeline.Tracer import Tracer, annotate, span
+
+# an array requested w/sbatch's --array or -a, on the command-line or in a
+# job script's #SBATCH lines.
+ARRAY_REGEX = re.compile(
+    r"(?:^|\s)(?:--array[= ]\s*|-a\s*)(\d[\d,\-:%]*)", re.MULTILINE
+)
 
 
 # taken from https://jinja.palletsprojects.com/en/3.0.x/api/#jinja2.BaseLoader
@@ -37,6 +47,38 @@ class KISSLoader(BaseLoader):
         return source, path, lambda: mtime == getmtime(path)
 
 
+def traced(category, measure_bytes=False):
+    """
+    Records each call of a Job method as a span w/the active Tracer.
+
+    :param category: The kind of span, e.g. 'job' or 'slurm'.
+    :param measure_bytes: Record the bytes under the Job's output_path after
+    the call.
+    :return: A decorator.
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if Tracer.active() is None:
+                return method(self, *args, **kwargs)
+
+            name = f"{self.job_name}.{method.__name__}"
+
+            with span(name, category, job=type(self).__name__) as attributes:
+                result = method(self, *args, **kwargs)
+
+                if measure_bytes:
+                    attributes["bytes_out"] = self._bytes_under(self.output_path)
+
+                return result
+
+        wrapper.is_traced = True
+        return wrapper
+
+    return decorator
+
+
 class Job:
     slurm_status_terminated = [
         "BOOT_FAIL",
@@ -77,6 +119,24 @@ class Job:
 
     polling_interval_in_seconds = 60
     squeue_retry_in_seconds = 10
+    # the time given to Slurm to register a new job before it's polled.
+    submission_delay_in_seconds = 10
+
+    # write a per-task EfficiencyReport after each job submitted w/
+    # submit_job() finishes. Jobs that run large arrays enable it so that
+    # each task's CPU efficiency and memory headroom can be used to
+    # right-size the resources they request.
+    collect_efficiency_report = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # record every Job's run() and audit() as spans, w/out each Job
+        # needing to do so.
+        for name, measure_bytes in (("run", True), ("audit", False)):
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "is_traced", False):
+                setattr(cls, name, traced("job", measure_bytes)(method))
 
     def __init__(
         self,
@@ -123,6 +183,9 @@ class Job:
 
         self.audit_folders = None
 
+        # the EfficiencyReport of the last job submitted, if collected.
+        self.efficiency_report = None
+
         # For each executable in the list, get its filename and use _which()
         # to see if it can be found. Directly pass an optional list of modules
         # to load before-hand, so that the binary can be found.
@@ -161,10 +224,25 @@ class Job:
         with open(join(self.output_path, "job_completed"), "w") as f:
             f.write("job_completed")
 
+        # post-processing is the work done between these two markers.
+        self._job_completed_at = time()
+
     def mark_post_processing_completed(self):
         with open(join(self.output_path, "post_processing_completed"), "w") as f:
             f.write("post_processing_completed")
 
+        tracer = Tracer.active()
+        start = getattr(self, "_job_completed_at", None)
+
+        if tracer is not None and start is not None:
+            tracer.record(
+                f"{self.job_name}.post_processing",
+                "job",
+                start,
+                time(),
+                job=type(self).__name__,
+            )
+
     def parse_logs(self):
         # by default, look for anything to parse in the logs directory.
         log_path = join(self.output_path, "logs")
@@ -215,10 +293,25 @@ class Job:
             raise PipelineError("file '%s' does not exist." % file_path)
 
     def _find_files(self, search_path):
-        lst = []
+        return [x.path for x in FileInventory.get(search_path).files()]
+
+    def _bytes_under(self, search_path):
+        # the total size of the files under search_path, for tracing. Files
+        # are stat()ed directly rather than through FileInventory, as a
+        # restarted job rewrites its outputs in place under the same names.
+        if not exists(search_path):
+            return None
+
+        total = 0
         for root, dirs, files in walk(search_path):
-            lst += [join(root, x) for x in files]
-        return lst
+            for some_file in files:
+                try:
+                    total += stat(join(root, some_file)).st_size
+                except FileNotFoundError:
+                    # removed while the directory was being walked.
+                    continue
+
+        return total
 
     def _directory_check(self, directory_path, create=False):
         if exists(directory_path):
@@ -319,6 +412,85 @@ class Job:
 
         return jobs
 
+    def _query_sacct(self, job_id):
+        """
+        Returns the resources Slurm accounted to a job and its array tasks.
+        :param job_id: A Slurm job-id.
+        :return: An EfficiencyReport or None if sacct is unavailable.
+        """
+        try:
+            result = self._system_call(EfficiencyReport.sacct_command(job_id))
+        except ExecFailedError as e:
+            logging.warning(f"sacct could not report on job {job_id}: {e}")
+            return None
+
+        return EfficiencyReport.from_sacct(job_id, result["stdout"])
+
+    def _report_efficiency(self, job_id):
+        """
+        Records the resources used by a finished job.
+
+        sacct is queried once. The job's totals are added to the active
+        Tracer's span and, if collect_efficiency_report is True, a CSV of
+        every task's efficiency is written next to the job's logs and a
+        summary (including any stragglers) is logged.
+
+        :param job_id: A Slurm job-id.
+        :return: An EfficiencyReport or None if sacct is unavailable.
+        """
+        report = self._query_sacct(job_id)
+
+        if report is None:
+            return None
+
+        annotate(**report.usage())
+
+        if self.collect_efficiency_report:
+            report_path = join(
+                self.output_path, f"{self.job_name}_{job_id}_efficiency.csv"
+            )
+            try:
+                report.write_csv(report_path)
+            except OSError as e:
+                # the job itself succeeded; only its report is lost.
+                logging.warning(f"could not write '{report_path}': {e}")
+                report_path = "not saved"
+
+            logging.info(
+                f"{self.job_name} efficiency ({report_path}):\n{report.summary()}"
+            )
+
+        return report
+
+    @staticmethod
+    def _array_size(job_parameters, script_path):
+        """
+        Returns the number of tasks in an array job.
+        :param job_parameters: The parameters passed to sbatch.
+        :param script_path: The path to the job script.
+        :return: The number of tasks or None if the job isn't an array.
+        """
+        m = ARRAY_REGEX.search(job_parameters or "")
+
+        if m is None and exists(script_path):
+            with open(script_path, "r") as f:
+                directives = [x for x in f if x.startswith("#SBATCH")]
+            m = ARRAY_REGEX.search("".join(x[7:] for x in directives))
+
+        if m is None:
+            return None
+
+        # e.g. '1-10%4' or '0,2,4-8:2'. the %4 only limits concurrency.
+        size = 0
+        for part in m.group(1).split("%")[0].split(","):
+            bounds, _, step = part.partition(":")
+            first, _, last = bounds.partition("-")
+            if first:
+                size += (int(last or first) - int(first)) // int(step or 1) + 1
+
+        return size
+
+    @traced("slurm")
     def wait_on_job_ids(self, job_ids, callback=None):
         """
         Wait for the given job-ids to finish running before returning.
@@ -335,6 +507,7 @@ class Job:
 
         # ensure all ids are strings to ensure proper working w/join().
         job_ids = [str(x) for x in job_ids]
+        annotate(job_ids=job_ids)
 
         while True:
             # Because query_slurm only returns state on the job-ids we specify,
@@ -360,6 +533,7 @@ class Job:
 
         return jobs
 
+    @traced("slurm")
     def submit_job(
         self,
         script_path,
@@ -410,8 +584,12 @@ class Job:
         if job_id.startswith("/"):
             job_id = basename(job_id)
 
+        annotate(
+            job_id=job_id, array_size=self._array_size(job_parameters, script_path)
+        )
+
         # Just to give some time for everything to be set up properly
-        sleep(10)
+        sleep(self.submission_delay_in_seconds)
 
         if wait is False:
             # return job_id since that is the only information for this new
@@ -425,6 +603,9 @@ class Job:
         # to the user.
         results = self.wait_on_job_ids([job_id], callback=callback)
 
+        if self.collect_efficiency_report or Tracer.active() is not None:
+            self.efficiency_report = self._report_efficiency(job_id)
+
         if job_id in results:
             # job is a non-array job
             job_result = {"job_id": job_id, "job_state": results[job_id]}
@@ -504,38 +685,56 @@ class Job:
     # expected. Since the list of expected ids is very small, we'll
     # perform an exact comparison.
 
+    @traced("job")
     def audit(self, sample_ids):
         """
         Audit the results of a run.
         :param sample_ids: A list of sample-ids that require results.
         :return: A list of sample-ids that were not found.
         """
-        files_found = []
-
         if self.suffix is None:
             raise PipelineError("Audit() method called on base Job object.")
 
-        for root, dirs, files in walk(self.output_path):
-            if "zero_files" in root:
+        files_found = self._audit_file_names()
+
+        # the trailing underscore is important as it can be assumed that all
+        # fastq.gz files will begin with sample_id followed by an '_', and
+        # then one or more additional parameters separated by underscores.
+        # Hence, a sample-id is found if any prefix of a file-name ending
+        # just before an underscore is a known sample-id. Index each
+        # file-name by these prefixes in a single pass rather than testing
+        # every sample-id against every file.
+        expected = set(sample_ids)
+        found = set()
+        for file_name in files_found:
+            pos = file_name.find("_")
+            while pos != -1:
+                prefix = file_name[:pos]
+                if prefix in expected:
+                    found.add(prefix)
+                pos = file_name.find("_", pos + 1)
+
+        return sorted(found ^ expected)
+
+    def _audit_file_names(self):
+        """
+        Returns the set of file-names audit() considers as results.
+        :return: A set of file-names ending in self.suffix.
+        """
+        files_found = set()
+
+        inventory = FileInventory.get(self.output_path)
+
+        for entry in inventory.files(suffix=self.suffix):
+            if "zero_files" in entry.root:
                 continue
             if self.audit_folders is not None:
                 # let's check that any of the audit_folders is in root
-                if not [f for f in self.audit_folders if f in root]:
+                if not [f for f in self.audit_folders if f in entry.root]:
                     continue
-            files_found += [join(root, x) for x in files if x.endswith(self.suffix)]
-
-        found = []
-        for sample_id in sample_ids:
-            for found_file in files_found:
-                # the trailing underscore is important as it can be assumed
-                # that all fastq.gz files will begin with sample_id followed
-                # by an '_', and then one or more additional parameters
-                # separated by underscores. This substring is unlikely to be
-                if basename(found_file).startswith("%s_" % sample_id):
-                    found.append(sample_id)
-                    break
+            files_found.add(entry.name)
 
-        return sorted(list(set(found) ^ set(sample_ids)))
+        return files_found
 
     def _toggle_force_job_fail(self):
         if self.force_job_fail is True:
@@ -555,17 +754,16 @@ class Job:
 
         # given a nested directory containing fastq.gz files from any part
         # of the SPP, get a list of paths to just the fastq files.
-        for root, dirs, files in walk(path_to_fastq_dir):
-            for file_name in files:
-                if file_name.endswith(".fastq.gz"):
-                    if not file_name.startswith("Undetermined"):
-                        # do not include the Undetermined files found in
-                        # ConvertJob, because they do not contain a project
-                        # name in their path, by definition.
-                        # don't record the full_path w/filename, as we're
-                        # not interested in the files themselves, just their
-                        # basedirs().
-                        tmp.append(root)
+        inventory = FileInventory.get(path_to_fastq_dir)
+        for entry in inventory.files(suffix=".fastq.gz"):
+            if not entry.name.startswith("Undetermined"):
+                # do not include the Undetermined files found in
+                # ConvertJob, because they do not contain a project
+                # name in their path, by definition.
+                # don't record the full_path w/filename, as we're
+                # not interested in the files themselves, just their
+                # basedirs().
+                tmp.append(entry.root)
 
         # break up the path into a set of unique directory names. at least
         # some of these will be of the form PROJECT-NAME_QIITA-ID. Flatten
@@ -2,14 +2,14 @@ import logging
 from functools import partial
 from json import dumps
 from os import listdir, makedirs
-from os.path import basename, exists, join, sep, split
+from os.path import basename, exists, join
 from re import sub
 
 from jinja2 import Environment
 
+from sequence_processing_pipeline.FileInventory import FileInventory
 from sequence_processing_pipeline.Job import Job, KISSLoader
 from sequence_processing_pipeline.PipelineError import JobFailedError, PipelineError
-from sequence_processing_pipeline.util import determine_orientation
 
 
 class MultiQCJob(Job):
@@ -81,41 +81,25 @@ class MultiQCJob(Job):
         projects = []
 
         for fastq_files_path in find_paths:
+            # scan each path once, rather than once per project.
+            inventory = FileInventory.get(fastq_files_path)
+
             for directory in listdir(fastq_files_path):
                 # confirm that this directory has data we want to show to
-                # multiqc.
-
-                # generate a list of all files in this directory.
-                files = self._find_files(join(fastq_files_path, directory))
-
-                # filter out all files that aren't fastq.gz files.
-                files = [x for x in files if x.endswith(".fastq.gz")]
-
-                for _file in files:
-                    # split path into a list of folder names and the filename.
-                    # filter out the contents of any folders that we don't
-                    # want included in the report.
-                    file_path, file_name = split(_file)
-
-                    ignore_this_file = [
-                        x
-                        for x in file_path.split(sep)
-                        if x in ["zero_files", "only-adapter-filtered"]
-                    ]
-
-                    if ignore_this_file:
-                        # if one or more of the folders are present in _file's
-                        # path, then do not consider this file.
-                        continue
-
-                    # lastly, only consider folders that contain at least one
-                    # R1 file.
-                    if determine_orientation(file_name) != "R1":
-                        continue
-
-                    # according to legacy behavior, if _file has met the above
-                    # criteria, then add the value of directory as a project
-                    # name.
+                # multiqc. Consider only fastq.gz files that are not in any
+                # folders we don't want included in the report and only
+                # consider folders that contain at least one R1 file.
+                files = inventory.files(
+                    under=join(fastq_files_path, directory),
+                    suffix=".fastq.gz",
+                    orientation="R1",
+                    exclude_dirs=["zero_files", "only-adapter-filtered"],
+                )
+
+                if files:
+                    # according to legacy behavior, if a file has met the
+                    # above criteria, then add the value of directory as a
+                    # project name.
                     projects.append(directory)
 
         if projects:
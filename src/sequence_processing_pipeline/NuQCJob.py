@@ -1,23 +1,33 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from glob import glob
 from os import makedirs, rename, stat
-from os.path import abspath, basename, dirname, exists, join, split
+from os.path import abspath, basename, dirname, exists, join
 from shutil import move
 from sys import executable
 
 from jinja2 import Environment
-from metapool import load_sample_sheet
 
-from sequence_processing_pipeline.Commands import split_similar_size_bins
+from sequence_processing_pipeline.Commands import (
+    read_demux_manifests,
+    split_similar_size_bins,
+)
 from sequence_processing_pipeline.Job import Job, KISSLoader
 from sequence_processing_pipeline.Pipeline import Pipeline
 from sequence_processing_pipeline.PipelineError import JobFailedError, PipelineError
-from sequence_processing_pipeline.util import FILES_REGEX, iter_paired_files
+from sequence_processing_pipeline.SampleSheetCache import SampleSheetCache
+from sequence_processing_pipeline.util import FILES_REGEX, pair_files
 
 logging.basicConfig(level=logging.DEBUG)
 
 
 class NuQCJob(Job):
+    collect_efficiency_report = True
+
+    # the number of output files moved concurrently during post-processing.
+    MAX_MOVE_WORKERS = 8
+
     def __init__(
         self,
         fastq_root_dir,
@@ -131,6 +141,7 @@ class NuQCJob(Job):
 
         self.batch_prefix = f"hds-{self.qiita_job_id}"
         self.minimum_bytes = 3100
+        self.demux_counts = {}
         self.fastq_regex = FILES_REGEX[files_regex]["fastq"]
         self.interleave_fastq_regex = FILES_REGEX[files_regex]["interleave_fastq"]
         self.html_regex = FILES_REGEX[files_regex]["html"]
@@ -162,34 +173,82 @@ class NuQCJob(Job):
             if not isinstance(project["HumanFiltering"], bool):
                 raise ValueError("needs_adapter_trimming must be boolean.")
 
+    def _load_demux_counts(self):
+        """
+        Merges the manifests written by each demux task.
+        :return: A dict of path relative to output_path => {'records',
+        'bases', 'bytes'} for every file demux wrote.
+        """
+        manifest_paths = glob(join(self.output_path, "logs", "demux_manifests", "*"))
+        return read_demux_manifests(sorted(manifest_paths))
+
+    @staticmethod
+    def _is_empty(fastq_path, minimum_bytes, demux_counts=None):
+        """
+        Returns True if a fastq file has no reads or is below threshold.
+        :param fastq_path: Path to a fastq file.
+        :param minimum_bytes: Files of this size or smaller are empty.
+        :param demux_counts: Optional dict of file-name => {'records',
+        'bases', 'bytes'} as written by demux. If the file is found, it is
+        not stat()ed.
+        :return: bool
+        """
+        if demux_counts:
+            # files are renamed once moved into their project.
+            file_name = basename(fastq_path).replace(".trimmed.fastq.gz", ".fastq.gz")
+            counts = demux_counts.get(file_name)
+            if counts is not None:
+                return counts["records"] == 0 or counts["bytes"] <= minimum_bytes
+
+        return stat(fastq_path).st_size <= minimum_bytes
+
     def _filter_empty_fastq_files(
-        self, filtered_directory, empty_files_directory, minimum_bytes
+        self,
+        filtered_directory,
+        empty_files_directory,
+        minimum_bytes,
+        strict=True,
+        demux_counts=None,
     ):
         """
         Filters out and moves fastq files that are below threshold.
         :param filtered_directory:
         :param empty_files_directory:
         :param minimum_bytes:
+        :param strict: raise an Error if any R1 or R2 file lacks a mate. If
+        False, files w/out a mate are moved along w/the empty files.
+        :param demux_counts: Optional dict of file-name => {'records',
+        'bases', 'bytes'} as written by demux for this project.
         :return:
         """
         empty_list = []
 
         files = glob(join(filtered_directory, f"*.{self.suffix}"))
 
+        is_empty = partial(
+            self._is_empty, minimum_bytes=minimum_bytes, demux_counts=demux_counts
+        )
+
         if self.read_length == "long":
             for r1 in files:
                 full_path = join(filtered_directory, r1)
-                if stat(full_path).st_size <= minimum_bytes:
+                if is_empty(full_path):
                     logging.debug(f"moving {full_path} to empty list.")
                     empty_list.append(full_path)
         else:
-            for r1, r2 in iter_paired_files(files):
+            paired = pair_files(files)
+            unpaired = sorted(paired.unpaired_r1 + paired.unpaired_r2)
+
+            if unpaired:
+                if strict:
+                    raise ValueError(f"Files are not paired: {', '.join(unpaired)}")
+                logging.warning(f"moving unpaired files: {', '.join(unpaired)}")
+                empty_list.extend(unpaired)
+
+            for r1, r2 in paired.pairs:
                 full_path = join(filtered_directory, r1)
                 full_path_reverse = join(filtered_directory, r2)
-                if (
-                    stat(full_path).st_size <= minimum_bytes
-                    or stat(full_path_reverse).st_size <= minimum_bytes
-                ):
+                if is_empty(full_path) or is_empty(full_path_reverse):
                     logging.debug(
                         f"moving {full_path} and {full_path_reverse} to empty list."
                     )
@@ -204,56 +263,150 @@ class NuQCJob(Job):
             logging.debug(f"moving {item}")
             move(item, empty_files_directory)
 
-    def _move_helper(self, completed_files, regex, samples_in_project, dst):
-        files_to_move = []
+    @staticmethod
+    def _plan_moves(completed_files, regex, destinations, strict=True):
+        """
+        Classifies files by the sample-id in their name.
+        :param completed_files: A list of paths to files.
+        :param regex: A compiled regex whose first group is the sample-id.
+        :param destinations: A dict of sample-id => destination directory.
+        :param strict: If True, files that don't match regex raise an Error.
+        Otherwise they are ignored.
+        :return: A list of (path, destination directory) tuples.
+        """
+        moves = []
+
         for fp in completed_files:
             file_name = basename(fp)
             substr = regex.search(file_name)
             if substr is None:
-                raise ValueError(f"{file_name} does not follow naming pattern.")
-            else:
-                # check if found substring is a member of this
-                # project. Note sample-name != sample-id
-                if substr[1] in samples_in_project:
-                    if fp.endswith(".fastq.gz"):
-                        # legacy QC'ed files were always denoted with
-                        # 'trimmed' to distinguish them from raw files.
-                        renamed_fp = fp.replace(".fastq.gz", ".trimmed.fastq.gz")
-                        rename(fp, renamed_fp)
-                        # move file into destination w/new filename
-                        files_to_move.append(renamed_fp)
-                    else:
-                        # move file into destination folder w/no namechange.
-                        files_to_move.append(fp)
-
-        for fp in files_to_move:
+                if strict:
+                    raise ValueError(f"{file_name} does not follow naming pattern.")
+                continue
+
+            # check if found substring is a member of a project.
+            # Note sample-name != sample-id
+            dst = destinations.get(substr[1])
+            if dst is not None:
+                moves.append((fp, dst))
+
+        return moves
+
+    def _execute_moves(self, moves, rename_fastqs=True):
+        """
+        Moves files into their destination directories concurrently.
+        :param moves: A list of (path, destination directory) tuples.
+        :param rename_fastqs: If True, rename '.fastq.gz' files to
+        '.trimmed.fastq.gz' before moving them.
+        :return: None
+        """
+
+        def _move(fp, dst):
+            if rename_fastqs and fp.endswith(".fastq.gz"):
+                # legacy QC'ed files were always denoted with
+                # 'trimmed' to distinguish them from raw files.
+                renamed_fp = fp.replace(".fastq.gz", ".trimmed.fastq.gz")
+                rename(fp, renamed_fp)
+                fp = renamed_fp
+
+            # move file into destination folder.
             move(fp, dst)
 
-    def _move_trimmed_files(self, project_name, output_path):
+        with ThreadPoolExecutor(max_workers=self.MAX_MOVE_WORKERS) as executor:
+            # consume the results so that any Error raised is propagated.
+            list(executor.map(lambda x: _move(*x), moves))
+
+    def _route_completed_files(self):
         """
-        Given output_path, move all fastqs to a new subdir named project_name.
-        :param project_name: The name of the new folder to be created.
-        :param output_path: The path to scan for fastq files.
+        Moves the output of all projects into their legacy locations at once.
+
+        Every output file is classified exactly once and all moves are then
+        performed concurrently:
+            <project>/*.fastq.gz => <project>/filtered_sequences or
+                                    <project>/trimmed_sequences
+            fastp_reports_dir/html => <project>/fastp_reports_dir/html
+            fastp_reports_dir/json => <project>/fastp_reports_dir/json
+            only-adapter-filtered => only-adapter-filtered/<project>
+        Files shared across projects are routed to the first project listing
+        their sample-id.
         :return: None
         """
+        # if the 'only-adapter-filtered' directory exists, move the files
+        # into a unique location so that files from multiple projects
+        # don't overwrite each other.
+        trimmed_only_path = join(self.output_path, "only-adapter-filtered")
+        old_html_path = join(self.output_path, "fastp_reports_dir", "html")
+        old_json_path = join(self.output_path, "fastp_reports_dir", "json")
+
+        samples_by_project = {}
+        for sample_id, project_name in self.sample_ids:
+            samples_by_project.setdefault(project_name, []).append(sample_id)
+
+        html_dsts = {}
+        json_dsts = {}
+        trimmed_only_dsts = {}
+        moves = []
 
-        if exists(output_path):
-            pattern = f"{output_path}/*.fastq.gz"
+        for project in self.project_data:
+            project_name = project["Sample_Project"]
+            source_dir = join(self.output_path, project_name)
+            samples_in_project = samples_by_project.get(project_name, [])
 
-            # this directory shouldn't already exist.
-            makedirs(join(output_path, project_name), exist_ok=False)
+            if project["HumanFiltering"] is True:
+                filtered_directory = join(source_dir, "filtered_sequences")
+            else:
+                filtered_directory = join(source_dir, "trimmed_sequences")
 
-            sample_ids = [x[0] for x in self.sample_ids if x[1] == project_name]
+            new_html_path = join(source_dir, "fastp_reports_dir", "html")
+            new_json_path = join(source_dir, "fastp_reports_dir", "json")
 
-            for trimmed_file in list(glob(pattern)):
-                file_name = split(trimmed_file)[1]
-                substr = self.interleave_fastq_regex.search(file_name)
-                if substr is not None:
-                    # only move the sample_ids in this project.
-                    if substr[1] in sample_ids:
-                        move(trimmed_file, join(output_path, project_name))
-        else:
-            raise ValueError(f"'{output_path}' does not exist")
+            # create the properly named directories to move files to in
+            # in order to preserve legacy behavior.
+            makedirs(filtered_directory, exist_ok=True)
+            makedirs(new_html_path, exist_ok=True)
+            makedirs(new_json_path, exist_ok=True)
+
+            if exists(trimmed_only_path):
+                # this directory shouldn't already exist.
+                new_trimmed_path = join(trimmed_only_path, project_name)
+                makedirs(new_trimmed_path, exist_ok=False)
+            else:
+                new_trimmed_path = None
+
+            for sample_id in samples_in_project:
+                html_dsts.setdefault(sample_id, new_html_path)
+                json_dsts.setdefault(sample_id, new_json_path)
+                if new_trimmed_path is not None:
+                    trimmed_only_dsts.setdefault(sample_id, new_trimmed_path)
+
+            # Tissue_1_Mag_Hom_DNASe_RIBO_S16_L001_R2_001.fastq.gz
+            # Nislux_SLC_Trizol_DNASe_S7_L001_R2_001.fastq.gz
+            moves += self._plan_moves(
+                glob(f"{source_dir}/*.fastq.gz"),
+                self.fastq_regex,
+                {x: filtered_directory for x in samples_in_project},
+            )
+
+        # Tissue_1_Super_Trizol_S19_L001_R1_001.html
+        moves += self._plan_moves(
+            glob(f"{old_html_path}/*.html"), self.html_regex, html_dsts
+        )
+
+        # Tissue_1_Super_Trizol_S19_L001_R1_001.json
+        moves += self._plan_moves(
+            glob(f"{old_json_path}/*.json"), self.json_regex, json_dsts
+        )
+
+        self._execute_moves(moves)
+
+        if trimmed_only_dsts:
+            trimmed_only_moves = self._plan_moves(
+                glob(f"{trimmed_only_path}/*.fastq.gz"),
+                self.interleave_fastq_regex,
+                trimmed_only_dsts,
+                strict=False,
+            )
+            self._execute_moves(trimmed_only_moves, rename_fastqs=False)
 
     def run(self, callback=None):
         # now a single job-script will be created to process all projects at
@@ -315,85 +468,44 @@ class NuQCJob(Job):
 
         logging.debug(f"NuQCJob {job_id} completed")
 
+        self._post_process_completed_files()
+
+        self.mark_post_processing_completed()
+
+    def _post_process_completed_files(self):
+        """
+        Routes the job's output to each project and sets aside empty files.
+        :return: None
+        """
+        # the records, bases and bytes demux wrote to each file.
+        self.demux_counts = self._load_demux_counts()
+
+        self._route_completed_files()
+
         for project in self.project_data:
             project_name = project["Sample_Project"]
-            needs_human_filtering = project["HumanFiltering"]
             source_dir = join(self.output_path, project_name)
-            pattern = f"{source_dir}/*.fastq.gz"
-            completed_files = list(glob(pattern))
 
-            # if the 'only-adapter-filtered' directory exists, move the files
-            # into a unique location so that files from multiple projects
-            # don't overwrite each other.
-            trimmed_only_path = join(self.output_path, "only-adapter-filtered")
-
-            if exists(trimmed_only_path):
-                self._move_trimmed_files(project_name, trimmed_only_path)
-
-            if needs_human_filtering is True:
+            if project["HumanFiltering"] is True:
                 filtered_directory = join(source_dir, "filtered_sequences")
             else:
                 filtered_directory = join(source_dir, "trimmed_sequences")
 
-            # create the properly named directory to move files to in
-            # in order to preserve legacy behavior.
-            makedirs(filtered_directory, exist_ok=True)
-
-            # get the list of sample-names in this project.
-            samples_in_project = [x[0] for x in self.sample_ids if x[1] == project_name]
-
-            # Tissue_1_Mag_Hom_DNASe_RIBO_S16_L001_R2_001.fastq.gz
-            # Nislux_SLC_Trizol_DNASe_S7_L001_R2_001.fastq.gz
-            self._move_helper(
-                completed_files,
-                self.fastq_regex,
-                samples_in_project,
-                filtered_directory,
-            )
-
-            # once fastq.gz files have been moved into the right project,
-            # we now need to consider the html and json fastp_reports
-            # files.
-            old_html_path = join(self.output_path, "fastp_reports_dir", "html")
-            old_json_path = join(self.output_path, "fastp_reports_dir", "json")
-
-            new_html_path = join(source_dir, "fastp_reports_dir", "html")
-            new_json_path = join(source_dir, "fastp_reports_dir", "json")
-
-            makedirs(new_html_path, exist_ok=True)
-            makedirs(new_json_path, exist_ok=True)
-
-            # move all html files underneath the subdirectory for this project.
-            pattern = f"{old_html_path}/*.html"
-            completed_htmls = list(glob(pattern))
-            self._move_helper(
-                completed_htmls,
-                # Tissue_1_Super_Trizol_S19_L001_R1_001.html
-                self.html_regex,
-                samples_in_project,
-                new_html_path,
-            )
-
-            # move all json files underneath the subdirectory for this project.
-            pattern = f"{old_json_path}/*.json"
-            completed_jsons = list(glob(pattern))
-            self._move_helper(
-                completed_jsons,
-                # Tissue_1_Super_Trizol_S19_L001_R1_001.json
-                self.json_regex,
-                samples_in_project,
-                new_json_path,
-            )
-
             # now that files are separated by project as per legacy
             # operation, continue normal processing.
             empty_files_directory = join(source_dir, "zero_files")
+            project_counts = {
+                basename(k): v
+                for k, v in self.demux_counts.items()
+                if dirname(k) == project_name
+            }
             self._filter_empty_fastq_files(
-                filtered_directory, empty_files_directory, self.minimum_bytes
+                filtered_directory,
+                empty_files_directory,
+                self.minimum_bytes,
+                demux_counts=project_counts,
             )
 
-        self.mark_post_processing_completed()
-
     def _confirm_job_completed(self):
         # since NuQCJob processes across all projects in a run, there isn't
         # a need to iterate by project_name and job_id.
@@ -405,9 +517,10 @@ class NuQCJob(Job):
         return False
 
     def _process_sample_sheet(self):
-        sheet = load_sample_sheet(self.sample_sheet_path)
+        parsed = SampleSheetCache.get(self.sample_sheet_path)
+        sheet = parsed.sheet
 
-        if not sheet.validate_and_scrub_sample_sheet():
+        if not parsed.validate():
             s = "Sample sheet %s is not valid." % self.sample_sheet_path
             raise PipelineError(s)
 
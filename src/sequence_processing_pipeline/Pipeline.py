@@ -1,11 +1,11 @@
 import logging
 from collections import defaultdict
+from copy import deepcopy
 from datetime import datetime
 from glob import glob
 from json import load as json_load
-from json import loads as json_loads
 from json.decoder import JSONDecodeError
-from os import listdir, makedirs, walk
+from os import listdir, makedirs
 from os.path import basename, exists, isdir, join
 from re import findall, search
 from xml.etree import ElementTree as ET
@@ -30,6 +30,9 @@ from metapool.prep import PREP_MF_COLUMNS
 
 from sequence_processing_pipeline.Job import Job
 from sequence_processing_pipeline.PipelineError import PipelineError
+from sequence_processing_pipeline.ProfileRegistry import ProfileRegistry
+from sequence_processing_pipeline.RunDirectoryIndex import RunDirectoryIndex
+from sequence_processing_pipeline.SampleSheetCache import SampleSheetCache
 
 logging.basicConfig(format="%(asctime)s - %(message)s", level=logging.INFO)
 
@@ -319,6 +322,8 @@ class Pipeline:
         self.qiita_job_id = qiita_job_id
         self.pipeline = []
         self.assay_type = None
+        self.sample_index = None
+        self._project_info = {}
 
         # this method will catch a run directory as well as its products
         # directory, which also has the same name. Hence, return the
@@ -332,15 +337,28 @@ class Pipeline:
         else:
             self.search_paths = self.configuration["search_paths"]
 
-        for search_path in self.search_paths:
-            logging.debug(f"Searching {search_path} for {self.run_id}")
-            for entry in listdir(search_path):
-                some_path = join(search_path, entry)
-                # ensure some_path never ends in '/'
-                some_path = some_path.rstrip("/")
-                if isdir(some_path) and some_path.endswith(self.run_id):
-                    logging.debug(f"Found {some_path}")
-                    results.append(some_path)
+        # an optional persistent index avoids listing every search path
+        # on each instantiation. Fall back to a full scan if the index
+        # cannot be used or does not locate the run.
+        if "run_dir_index_path" in self.configuration:
+            index_path = self.configuration["run_dir_index_path"]
+            try:
+                index = RunDirectoryIndex(index_path)
+                results = index.find(self.run_id, self.search_paths)
+            except OSError as e:
+                logging.warning(f"run-directory index unavailable: {e}")
+                results = []
+
+        if not results:
+            for search_path in self.search_paths:
+                logging.debug(f"Searching {search_path} for {self.run_id}")
+                for entry in listdir(search_path):
+                    some_path = join(search_path, entry)
+                    # ensure some_path never ends in '/'
+                    some_path = some_path.rstrip("/")
+                    if isdir(some_path) and some_path.endswith(self.run_id):
+                        logging.debug(f"Found {some_path}")
+                        results.append(some_path)
 
         if results:
             results.sort(key=lambda s: len(s))
@@ -383,6 +401,7 @@ class Pipeline:
 
             # assume user_input_file_path references a sample-sheet.
             self.sample_sheet = self._validate_sample_sheet(input_file_path)
+            self.sample_index = self._index_sample_sheet(self.sample_sheet)
             self.mapping_file = None
 
         if self.assay_type is None:
@@ -458,73 +477,12 @@ class Pipeline:
         # from self.sample_sheet (or self.mapping_file).
         instr_type = InstrumentUtils.get_instrument_type(self.run_dir)
 
-        # open the configuration profiles directory as specified by
-        # profiles_path in the configuration.json file. parse each json into
-        # a nested dictionary keyed by (instrument-type, assay-type) as
-        # specified by the values inside each json.
-        profile_dir = self.configuration["profiles_path"]
-
-        if not exists(profile_dir):
-            raise ValueError(f"'{profile_dir}' doesn't exist")
-
-        # profiles directory can be arbitrarily nested to help organize
-        # profiles; profiles can also be named arbitrarily. Non-JSON files
-        # such as notes can be in the directory as well. The only assertion
-        # is that all JSON files found will be of the profile format, discussed
-        # below.
-        profile_paths = []
-        for root, dirs, files in walk(profile_dir):
-            for some_file in files:
-                some_path = join(root, some_file)
-                if some_path.endswith(".json"):
-                    profile_paths.append(some_path)
-
-        # There must be at least one valid profile for the Pipeline to
-        # continue operation.
-        if not profile_paths:
-            raise ValueError(f"'{profile_dir}' doesn't contain profile files")
-
-        profiles = []
-
-        for profile_path in profile_paths:
-            with open(profile_path, "r") as f:
-                # open each profile and perform minimum validation on its
-                # contents.
-                contents = json_load(f)
-
-                # all files must contain a root element 'profile'. This helps
-                # to identify it as a profile, rather than another type of
-                # JSON file.
-                if "profile" not in contents:
-                    raise ValueError(
-                        f"'profile' is not an attribute in '{profile_path}'"
-                    )
-
-                # the 'profile' attribute must have a dictionary as its value.
-                # all profiles must contain 'instrument_type' and 'assay_type',
-                if "instrument_type" not in contents["profile"]:
-                    raise ValueError(
-                        "'instrument_type' is not an attribute "
-                        f"in '{profile_path}'.profile"
-                    )
-
-                if "assay_type" not in contents["profile"]:
-                    raise ValueError(
-                        "'assay_type' is not an attribute      "
-                        f"in '{profile_path}'.profile"
-                    )
-
-                profiles.append(contents)
-
-        selected_profile = None
+        # profiles are parsed, validated and indexed by (instrument-type,
+        # assay-type) once per profiles directory and shared across Pipelines.
+        # Only profiles modified since the last call are parsed again.
+        registry = ProfileRegistry.get(self.configuration["profiles_path"])
 
-        for profile in profiles:
-            i_type = profile["profile"]["instrument_type"]
-            a_type = profile["profile"]["assay_type"]
-
-            if i_type == instr_type and a_type == self.assay_type:
-                selected_profile = profile
-                break
+        selected_profile = registry.find(instr_type, self.assay_type)
 
         if selected_profile is None:
             raise ValueError(
@@ -533,7 +491,8 @@ class Pipeline:
                 " an administrator"
             )
 
-        self.config_profile = selected_profile
+        # the registry's copy is shared; give each Pipeline its own.
+        self.config_profile = deepcopy(selected_profile)
 
     def _directory_check(self, directory_path, create=False):
         if exists(directory_path):
@@ -581,10 +540,13 @@ class Pipeline:
                  PipelineError() on all failures. Warning messages are
                  appended to self.warnings.
         """
-        # validate the sample-sheet using metapool package.
-        sheet = load_sample_sheet(sample_sheet_path)
+        # validate the sample-sheet using metapool package. The parsed and
+        # scrubbed sheet is shared w/the Jobs that read the same file.
+        parsed = SampleSheetCache.get(sample_sheet_path)
+        sheet = parsed.sheet
 
-        msgs = sheet.quiet_validate_and_scrub_sample_sheet()
+        # copy the cached messages as additional ones may be appended below.
+        msgs = list(parsed.messages)
 
         if any([isinstance(m, ErrorMessage) for m in msgs]):
             # msgs will contain both ErrorMessages and WarningMessages.
@@ -805,20 +767,57 @@ class Pipeline:
 
         return paths
 
-    def get_sample_ids(self):
+    @staticmethod
+    def _index_sample_sheet(sheet):
+        """
+        Index the sample-ids, sample-names and orig-names in a sample-sheet.
+        :param sheet: A validated sample-sheet.
+        :return: A dict of project-names to dicts of lists, in sheet order.
+
+        Each sample is indexed under both its fully-qualified project name
+        (e.g. 'StudyB_11661') and its project name w/out the Qiita ID (e.g.
+        'StudyB'). The None key holds all samples in the sheet.
+        """
+        index = defaultdict(lambda: {"ids": [], "names": [], "orig_names": []})
+
+        for sample in sheet.samples:
+            project_name = sample["Sample_Project"]
+            keys = [None, project_name]
+
+            # exact matching is required for cases where one project name
+            # in a sheet is a superset of another project in the same sheet.
+            m = search(r"^(.+)_(\d+)$", project_name)
+            if m:
+                keys.append(m[1])
+
+            for key in keys:
+                index[key]["ids"].append(sample["Sample_ID"])
+                index[key]["names"].append(sample["Sample_Name"])
+                index[key]["orig_names"].append(sample.get("orig_name"))
+
+        return dict(index)
+
+    def _get_from_sample_index(self, project_name, field):
+        if project_name in self.sample_index:
+            return list(self.sample_index[project_name][field])
+
+        return []
+
+    def get_sample_ids(self, project_name=None):
         """
         Returns list of sample-ids sourced from sample-sheet or pre-prep file
+        :param project_name: If None, return all sample-ids.
         :return: list of sample-ids
         """
 
         # test for self.mapping_file, since self.sample_sheet will be
         # defined in both cases.
         if self.pipeline_type == Pipeline.AMPLICON_PTYPE:
-            results = list(self.mapping_file.sample_name)
-        else:
-            results = [x.Sample_ID for x in self.sample_sheet.samples]
+            # pre-prep files do not distinguish between sample-ids and
+            # sample-names.
+            return self._get_sample_names_from_mapping_file(project_name)
 
-        return results
+        return self._get_from_sample_index(project_name, "ids")
 
     def get_sample_names(self, project_name=None):
         """
@@ -834,60 +833,13 @@ class Pipeline:
             return self._get_sample_names_from_sample_sheet(project_name)
 
     def _get_sample_names_from_sample_sheet(self, project_name):
-        if project_name is None:
-            return [x.Sample_Name for x in self.sample_sheet.samples]
-        else:
-            # Since the project-name is stored in an internal variable
-            # in a third-party library, convert the data structure to
-            # JSON using the exposed method and obtain from the result.
-            jsn = json_loads(self.sample_sheet.to_json())
-
-            results = []
-
-            for sample in jsn["Data"]:
-                # handle case where project_name includes an appended qiita-id.
-                if sample["Sample_Project"] == project_name:
-                    results.append(sample["Sample_Name"])
-                    continue
-
-                # handle case where project_name does not include a qiita-id.
-                # exact matching is required for cases where one project name
-                # in a sheet is a superset of another project in the same
-                # sheet.
-                m = search(r"^(.+)_(\d+)$", sample["Sample_Project"])
-                if m[1] == project_name:
-                    results.append(sample["Sample_Name"])
-
-            return results
+        # project_name may or may not include an appended qiita-id.
+        return self._get_from_sample_index(project_name, "names")
 
     def get_orig_names_from_sheet(self, project_name):
-        if project_name is None:
-            results = [x.orig_name for x in self.sample_sheet.samples]
-            # eliminate inavoidable duplicates and sort.
-            return sorted(set(results))
-        else:
-            # Since the project-name is stored in an internal variable
-            # in a third-party library, convert the data structure to
-            # JSON using the exposed method and obtain from the result.
-            jsn = json_loads(self.sample_sheet.to_json())
-
-            results = []
-
-            for sample in jsn["Data"]:
-                # handle case where project_name includes an appended qiita-id.
-                if sample["Sample_Project"] == project_name:
-                    results.append(sample["orig_name"])
-                    continue
-
-                # handle case where project_name does not include a qiita-id.
-                # exact matching is required for cases where one project name
-                # in a sheet is a superset of another project in the same
-                # sheet.
-                m = search(r"^(.+)_(\d+)$", sample["Sample_Project"])
-                if m[1] == project_name:
-                    results.append(sample["orig_name"])
-
-            return sorted(set(results))
+        results = self._get_from_sample_index(project_name, "orig_names")
+        # eliminate inavoidable duplicates and sort.
+        return sorted(set(results))
 
     def _get_sample_names_from_mapping_file(self, project_name):
         if project_name is None:
@@ -918,6 +870,14 @@ class Pipeline:
             return proj_info[PROJECT_SHORT_NAME_KEY], proj_info[QIITA_ID_KEY]
 
     def get_project_info(self, short_names=False):
+        # project info is fixed once the pipeline is constructed. Return
+        # copies so callers cannot modify the cached results.
+        if short_names not in self._project_info:
+            self._project_info[short_names] = self._get_project_info(short_names)
+
+        return [dict(x) for x in self._project_info[short_names]]
+
+    def _get_project_info(self, short_names):
         results = []
 
         if self.pipeline_type == Pipeline.AMPLICON_PTYPE:
@@ -0,0 +1,154 @@
+from json import load as json_load
+from os import stat, walk
+from os.path import abspath, exists, join
+from threading import Lock
+
+
+class ProfileRegistry:
+    """
+    An index of the configuration profiles found under a profiles directory.
+
+    Profiles are parsed and validated once and indexed by their
+    (instrument_type, assay_type) pair. On each refresh only the profiles
+    whose modification time or size changed are parsed again. Registries
+    are shared per directory so that long-running processes (e.g. the Qiita
+    plugin or a test suite) reuse them across Pipelines.
+    """
+
+    _registries = {}
+    _registries_lock = Lock()
+
+    def __init__(self, profiles_path):
+        """
+        :param profiles_path: Path to a directory of JSON profiles.
+        """
+        self.profiles_path = profiles_path
+        # profile path => ((mtime, size), parsed contents)
+        self._parsed = {}
+        self.profiles = {}
+        self._lock = Lock()
+
+    @classmethod
+    def get(cls, profiles_path):
+        """
+        Returns the shared, up-to-date registry for profiles_path.
+        :param profiles_path: Path to a directory of JSON profiles.
+        :return: A ProfileRegistry.
+        """
+        key = abspath(profiles_path)
+
+        with cls._registries_lock:
+            if key not in cls._registries:
+                cls._registries[key] = cls(profiles_path)
+            registry = cls._registries[key]
+
+        registry.refresh()
+
+        return registry
+
+    @classmethod
+    def clear(cls):
+        """
+        Removes all shared registries.
+        :return: None
+        """
+        with cls._registries_lock:
+            cls._registries.clear()
+
+    @staticmethod
+    def _load_profile(profile_path):
+        with open(profile_path, "r") as f:
+            # open each profile and perform minimum validation on its
+            # contents.
+            contents = json_load(f)
+
+        # all files must contain a root element 'profile'. This helps
+        # to identify it as a profile, rather than another type of
+        # JSON file.
+        if "profile" not in contents:
+            raise ValueError(f"'profile' is not an attribute in '{profile_path}'")
+
+        # the 'profile' attribute must have a dictionary as its value.
+        # all profiles must contain 'instrument_type' and 'assay_type',
+        if "instrument_type" not in contents["profile"]:
+            raise ValueError(
+                f"'instrument_type' is not an attribute in '{profile_path}'.profile"
+            )
+
+        if "assay_type" not in contents["profile"]:
+            raise ValueError(
+                f"'assay_type' is not an attribute      in '{profile_path}'.profile"
+            )
+
+        return contents
+
+    def refresh(self):
+        """
+        Re-indexes the profiles directory, parsing new and modified profiles.
+        :return: None
+        """
+        profile_dir = self.profiles_path
+
+        if not exists(profile_dir):
+            raise ValueError(f"'{profile_dir}' doesn't exist")
+
+        # profiles directory can be arbitrarily nested to help organize
+        # profiles; profiles can also be named arbitrarily. Non-JSON files
+        # such as notes can be in the directory as well. The only assertion
+        # is that all JSON files found will be of the profile format.
+        profile_paths = []
+        for root, dirs, files in walk(profile_dir):
+            for some_file in files:
+                some_path = join(root, some_file)
+                if some_path.endswith(".json"):
+                    profile_paths.append(some_path)
+
+        # There must be at least one valid profile for the Pipeline to
+        # continue operation.
+        if not profile_paths:
+            raise ValueError(f"'{profile_dir}' doesn't contain profile files")
+
+        with self._lock:
+            parsed = {}
+            profiles = {}
+
+            for profile_path in profile_paths:
+                st = stat(profile_path)
+                signature = (st.st_mtime_ns, st.st_size)
+
+                if (
+                    profile_path in self._parsed
+                    and self._parsed[profile_path][0] == signature
+                ):
+                    contents = self._parsed[profile_path][1]
+                else:
+                    # invalid profiles are never cached, so the error will be
+                    # raised again until the profile is fixed or removed.
+                    contents = self._load_profile(profile_path)
+
+                parsed[profile_path] = (signature, contents)
+
+                key = (
+                    contents["profile"]["instrument_type"],
+                    contents["profile"]["assay_type"],
+                )
+
+                if key in profiles:
+                    raise ValueError(
+                        f"'{profile_path}' and '{profiles[key][0]}' both define "
+                        f"a profile for {key}"
+                    )
+
+                profiles[key] = (profile_path, contents)
+
+            self._parsed = parsed
+            self.profiles = {k: v[1] for k, v in profiles.items()}
+
+    def find(self, instrument_type, assay_type):
+        """
+        Returns the profile matching instrument_type and assay_type.
+        :param instrument_type: e.g. 'NovaSeq 6000'
+        :param assay_type: e.g. 'Metagenomic'
+        :return: The profile as a dict or None if no profile matches.
+        """
+        return self.profiles.get((instrument_type, assay_type))
@@ -0,0 +1,123 @@
+import logging
+from json import dump, load
+from json.decoder import JSONDecodeError
+from os import listdir, remove, replace, stat
+from os.path import dirname, exists, isdir, join
+from tempfile import NamedTemporaryFile
+
+
+class RunDirectoryIndex:
+    """
+    A persistent index of the run-directories found in a set of search paths.
+
+    For each search path the index stores the path's modification time and
+    the names of its entries, split into directories and everything else. A
+    search path is only listed again when its modification time changes,
+    which happens whenever an entry is added, removed or renamed. Only the
+    names not already in the index are then checked w/isdir(); names that
+    have disappeared are dropped.
+    """
+
+    def __init__(self, index_path):
+        """
+        :param index_path: Path to the JSON file storing the index.
+        """
+        self.index_path = index_path
+        self.entries = self._load()
+        self.modified = False
+
+    def _load(self):
+        if not exists(self.index_path):
+            return {}
+
+        try:
+            with open(self.index_path, "r") as f:
+                entries = load(f)
+        except (OSError, JSONDecodeError) as e:
+            # an unreadable index is rebuilt rather than treated as fatal.
+            logging.warning(f"ignoring run-directory index {self.index_path}: {e}")
+            return {}
+
+        if not isinstance(entries, dict):
+            return {}
+
+        return entries
+
+    def save(self):
+        """
+        Atomically writes the index to disk if it was modified.
+        :return: None
+        """
+        if not self.modified:
+            return
+
+        # write to a temporary file in the same directory and rename it, so
+        # concurrent readers never see a partially written index.
+        with NamedTemporaryFile(
+            "w", dir=dirname(self.index_path) or ".", delete=False, suffix=".tmp"
+        ) as f:
+            dump(self.entries, f)
+            tmp_path = f.name
+
+        try:
+            replace(tmp_path, self.index_path)
+        except OSError:
+            remove(tmp_path)
+            raise
+
+        self.modified = False
+
+    def _get_directories(self, search_path):
+        mtime = stat(search_path).st_mtime_ns
+
+        entry = self.entries.get(search_path)
+
+        if entry is None or entry["mtime_ns"] != mtime:
+            logging.debug(f"Indexing {search_path}")
+
+            if entry is None:
+                entry = {"directories": [], "other": []}
+
+            dirs = set(entry["directories"])
+            other = set(entry.get("other", []))
+            names = set(listdir(search_path))
+
+            for name in names - dirs - other:
+                if isdir(join(search_path, name)):
+                    dirs.add(name)
+                else:
+                    other.add(name)
+
+            entry = {
+                "mtime_ns": mtime,
+                "directories": sorted(dirs & names),
+                "other": sorted(other & names),
+            }
+            self.entries[search_path] = entry
+            self.modified = True
+
+        return entry["directories"]
+
+    def find(self, run_id, search_paths):
+        """
+        Returns every directory in search_paths whose path ends w/run_id.
+        :param run_id: A run-id e.g. '211021_A00000_0000_SAMPLE'.
+        :param search_paths: A list of directories to search.
+        :return: A list of paths, shortest first.
+        """
+        results = []
+
+        for search_path in search_paths:
+            for entry in self._get_directories(search_path):
+                # ensure some_path never ends in '/'
+                some_path = join(search_path, entry).rstrip("/")
+                # confirm a match still exists in case the directory was
+                # modified within the filesystem's timestamp resolution.
+                if some_path.endswith(run_id) and isdir(some_path):
+                    results.append(some_path)
+
+        self.save()
+
+        results.sort(key=lambda s: len(s))
+
+        return results
@@ -0,0 +1,108 @@
+from hashlib import sha256
+from os.path import abspath
+from threading import Lock
+from types import MappingProxyType
+
+from metapool import load_sample_sheet
+from metapool.plate import ErrorMessage
+
+
+class ParsedSampleSheet:
+    """
+    A sample-sheet that has been loaded, validated and scrubbed once.
+
+    The underlying metapool sheet is shared by every caller that requests
+    the same file and must be treated as read-only. The pre-built indexes
+    are immutable mappings of column names to values, one per sample.
+    """
+
+    def __init__(self, path, digest, sheet, messages):
+        self.path = path
+        self.digest = digest
+        self.sheet = sheet
+        self.messages = tuple(messages)
+        self.is_valid = not any(isinstance(m, ErrorMessage) for m in messages)
+
+        samples = []
+        by_id = {}
+        by_project = {}
+        by_barcode_id = {}
+
+        for sample in sheet.samples:
+            row = MappingProxyType(dict(sample.items()))
+            samples.append(row)
+            by_id[row["Sample_ID"]] = row
+            by_project.setdefault(row["Sample_Project"], []).append(row)
+            # barcode_id is only defined for TellSeq sample-sheets.
+            if row.get("barcode_id"):
+                by_barcode_id[row["barcode_id"]] = row
+
+        self.samples = tuple(samples)
+        self.samples_by_id = MappingProxyType(by_id)
+        self.samples_by_project = MappingProxyType(
+            {k: tuple(v) for k, v in by_project.items()}
+        )
+        self.samples_by_barcode_id = MappingProxyType(by_barcode_id)
+
+    def validate(self, echo_msgs=True):
+        """
+        Equivalent to metapool's validate_and_scrub_sample_sheet().
+        :param echo_msgs: If True, echo validation messages to the console.
+        :return: True if the sample-sheet is valid, False otherwise.
+        """
+        if echo_msgs:
+            for msg in self.messages:
+                msg.echo()
+
+        return self.is_valid
+
+
+class SampleSheetCache:
+    """
+    Process-wide cache of parsed sample-sheets.
+
+    Entries are keyed by absolute path and validated against a hash of the
+    file's contents on every lookup, so a sample-sheet that is rewritten
+    (e.g. when Pipeline() overwrites the lane number) is reloaded.
+    """
+
+    _entries = {}
+    _lock = Lock()
+
+    @classmethod
+    def get(cls, sample_sheet_path):
+        """
+        Returns a ParsedSampleSheet for sample_sheet_path.
+        :param sample_sheet_path: Path to a sample-sheet.
+        :return: A ParsedSampleSheet.
+        """
+        path = abspath(sample_sheet_path)
+
+        with open(path, "rb") as f:
+            digest = sha256(f.read()).hexdigest()
+
+        with cls._lock:
+            entry = cls._entries.get(path)
+            if entry is not None and entry.digest == digest:
+                return entry
+
+            sheet = load_sample_sheet(path)
+            messages = sheet.quiet_validate_and_scrub_sample_sheet()
+            entry = ParsedSampleSheet(path, digest, sheet, messages)
+            cls._entries[path] = entry
+
+        return entry
+
+    @classmethod
+    def invalidate(cls, sample_sheet_path=None):
+        """
+        Removes one or all entries from the cache.
+        :param sample_sheet_path: Path to a sample-sheet. If None, all
+        entries are removed.
+        :return: None
+        """
+        with cls._lock:
+            if sample_sheet_path is None:
+                cls._entries.clear()
+            else:
+                cls._entries.pop(abspath(sample_sheet_path), None)
@@ -1,22 +1,27 @@
 import logging
 from collections import defaultdict
 from glob import glob
-from os import walk
-from os.path import join, split
+from math import ceil
+from os import makedirs, remove
+from os.path import basename, join
 
 import pandas as pd
 from jinja2 import Environment
-from metapool import load_sample_sheet
 
 from sequence_processing_pipeline.util import determine_orientation
 
+from .CountCatalog import CountCatalog
+from .FastqCounter import iter_counts, pack_by_size
 from .Job import Job, KISSLoader
 from .PipelineError import JobFailedError
+from .SampleSheetCache import SampleSheetCache
 
 logging.basicConfig(level=logging.DEBUG)
 
 
 class SeqCountsJob(Job):
+    collect_efficiency_report = True
+
     def __init__(
         self,
         run_dir,
@@ -31,6 +36,7 @@ class SeqCountsJob(Job):
         files_to_count_path,
         sample_sheet_path,
         cores_per_task=4,
+        files_per_task=32,
     ):
         """
         ConvertJob provides a convenient way to run bcl-convert or bcl2fastq
@@ -47,6 +53,8 @@ class SeqCountsJob(Job):
         :param files_to_count_path: A path to a list of file-paths to count.
         :param sample_sheet_path: A path to the sample-sheet.
         :param cores_per_task: (Optional) # of CPU cores per node to request.
+        :param files_per_task: (Optional) Average # of files counted by each
+        array task.
         """
         super().__init__(
             run_dir,
@@ -75,11 +83,33 @@ class SeqCountsJob(Job):
             lines = f.readlines()
             lines = [x.strip() for x in lines]
             lines = [x for x in lines if x != ""]
+            self.files_to_count = lines
             self.file_count = len(lines)
 
+        # files are packed into batches of similar total size, rather than
+        # submitting one array task per file.
+        self.task_count = min(
+            max(1, ceil(self.file_count / files_per_task)), self.max_array_length
+        )
+        self.batches_path = join(self.output_path, "batches")
+        self.counts_path = join(self.output_path, "counts")
+
+        # files counted previously (e.g. before a restart) are not counted
+        # again.
+        self.catalog = CountCatalog(join(output_path, CountCatalog.FILE_NAME))
+        self.cached_counts = {}
+
     def run(self, callback=None):
         job_script_path = self._generate_job_script()
-        params = ["--parsable", f"-J {self.job_name}", f"--array 1-{self.file_count}"]
+
+        if self.task_count == 0:
+            logging.debug("SeqCountsJob: all files were previously counted")
+            self.mark_job_completed()
+            self._aggregate_counts(self.sample_sheet_path)
+            self.mark_post_processing_completed()
+            return
+
+        params = ["--parsable", f"-J {self.job_name}", f"--array 1-{self.task_count}"]
         try:
             self.job_info = self.submit_job(
                 job_script_path,
@@ -109,7 +139,24 @@ class SeqCountsJob(Job):
         job_script_path = join(self.output_path, "seq_counts.sbatch")
         template = self.jinja_env.get_template("seq_counts.sbatch")
 
-        #  got to make files_to_count.txt and put it in the output directory
+        self.cached_counts = self.catalog.get_many(self.files_to_count)
+        to_count = [x for x in self.files_to_count if x not in self.cached_counts]
+
+        batches = pack_by_size(to_count, self.task_count) if to_count else []
+
+        # there may be fewer batches than requested when there are few files
+        # left to count, or none at all.
+        self.task_count = len(batches)
+
+        makedirs(self.batches_path, exist_ok=True)
+
+        # results from a previous submission are superseded by the catalog.
+        for counts_file in glob(join(self.counts_path, "*.tsv")):
+            remove(counts_file)
+
+        for i, batch in enumerate(batches, 1):
+            with open(join(self.batches_path, f"batch-{i}"), "w") as f:
+                f.write("\n".join(batch) + "\n")
 
         with open(job_script_path, mode="w", encoding="utf-8") as f:
             f.write(
@@ -121,8 +168,9 @@ class SeqCountsJob(Job):
                         "node_count": self.node_count,
                         "cores_per_task": self.cores_per_task,
                         "queue_name": self.queue_name,
-                        "file_count": self.file_count,
-                        "files_to_count_path": self.files_to_count_path,
+                        "task_count": self.task_count,
+                        "batches_path": self.batches_path,
+                        "counts_path": self.counts_path,
                         "output_path": self.output_path,
                     }
                 )
@@ -137,42 +185,30 @@ class SeqCountsJob(Job):
 
         for some_file in files:
             with open(some_file, "r") as f:
-                msgs += [
-                    line for line in f.readlines() if line.startswith("[E::stk_size]")
-                ]
+                msgs += [line for line in f.readlines() if line.startswith("[E::")]
 
         return [msg.strip() for msg in msgs]
 
     def _aggregate_counts_by_file(self):
-        # aggregates sequence & bp counts from a directory of log files.
-
-        def extract_metadata(log_output_file_path):
-            """
-            extracts sequence & bp counts from individual log files.
-            """
-            with open(log_output_file_path, "r") as f:
-                lines = f.readlines()
-                lines = [x.strip() for x in lines]
-                if len(lines) != 2:
-                    raise ValueError("error processing %s" % log_output_file_path)
-                _dir, _file = split(lines[0])
-                seq_counts, base_pairs = lines[1].split("\t")
-                return _dir, _file, int(seq_counts), int(base_pairs)
-
-        results = defaultdict(dict)
-
-        for root, dirs, files in walk(self.log_path):
-            for _file in files:
-                if _file.endswith(".out"):
-                    log_output_file = join(root, _file)
-                    _dir, _file, seq_counts, base_pairs = extract_metadata(
-                        log_output_file
-                    )
-
-                    results[_file] = {
-                        "seq_counts": seq_counts,
-                        "base_pairs": base_pairs,
-                    }
+        # aggregates sequence & bp counts from the catalog and the counts
+        # files written by each array task.
+        results = {}
+
+        for fp, entry in self.cached_counts.items():
+            results[basename(fp)] = {
+                "seq_counts": entry["records"],
+                "base_pairs": entry["bases"],
+            }
+
+        counted = list(iter_counts(sorted(glob(join(self.counts_path, "*.tsv")))))
+
+        for fp, seq_counts, base_pairs in counted:
+            results[basename(fp)] = {
+                "seq_counts": seq_counts,
+                "base_pairs": base_pairs,
+            }
+
+        self.catalog.put_many(counted)
 
         return results
 
@@ -186,11 +222,12 @@ class SeqCountsJob(Job):
         """
 
         def get_metadata(sample_sheet_path):
-            sheet = load_sample_sheet(sample_sheet_path)
+            parsed = SampleSheetCache.get(sample_sheet_path)
+            sheet = parsed.sheet
 
             lanes = []
 
-            if sheet.validate_and_scrub_sample_sheet():
+            if parsed.validate():
                 results = {}
 
             for sample in sheet.samples:
@@ -6,11 +6,11 @@ from os.path import join
 from shutil import copyfile
 
 from jinja2 import Environment
-from metapool import load_sample_sheet
 
 from .Job import Job, KISSLoader
 from .Pipeline import Pipeline
 from .PipelineError import JobFailedError, PipelineError
+from .SampleSheetCache import SampleSheetCache
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -127,9 +127,10 @@ class TRIntegrateJob(Job):
         logging.debug(f"TRIntegrateJob {self.job_info['job_id']} completed")
 
     def _process_sample_sheet(self):
-        sheet = load_sample_sheet(self.sample_sheet_path)
+        parsed = SampleSheetCache.get(self.sample_sheet_path)
+        sheet = parsed.sheet
 
-        if not sheet.validate_and_scrub_sample_sheet():
+        if not parsed.validate():
             s = "Sample sheet %s is not valid." % self.sample_sheet_path
             raise PipelineError(s)
 
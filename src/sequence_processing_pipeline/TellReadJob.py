@@ -1,6 +1,4 @@
 import logging
-import re
-from collections import defaultdict
 from os import walk
 from os.path import join
 
@@ -10,11 +8,26 @@ from metapool import load_sample_sheet
 from .Job import Job, KISSLoader
 from .Pipeline import Pipeline
 from .PipelineError import JobFailedError, PipelineError
+from .SampleSheetCache import SampleSheetCache
 
 logging.basicConfig(level=logging.DEBUG)
 
 
 class TellReadJob(Job):
+    # the reads TellRead writes for each barcode.
+    READS = ("I1", "R1", "R2")
+    OUTPUT_NAME = (
+        "TellReadJob_{read}_{barcode_id}.fastq.gz.corrected.err_barcode_removed.fastq"
+    )
+
+    # TellRead is considered finished once all of its expected outputs are
+    # present and none has changed for POLL_INTERVAL seconds, or once nothing
+    # has changed for QUIET_TIME seconds even if some outputs are missing.
+    # MAX_WAIT is the hard-limit on the time spent waiting.
+    POLL_INTERVAL = 60
+    QUIET_TIME = 15 * 60
+    MAX_WAIT = 8 * 60 * 60
+
     def __init__(
         self,
         run_dir,
@@ -79,6 +92,7 @@ class TellReadJob(Job):
         self.lane_number = tmp
 
         self.job_name = f"{self.qiita_job_id}-tellread"
+        self.manifest_path = join(self.output_path, "expected_outputs.txt")
 
     def run(self, callback=None):
         job_script_path = self._generate_job_script()
@@ -110,9 +124,10 @@ class TellReadJob(Job):
         logging.debug(f"TellReadJob {self.job_info['job_id']} completed")
 
     def _process_sample_sheet(self):
-        sheet = load_sample_sheet(self.sample_sheet_path)
+        parsed = SampleSheetCache.get(self.sample_sheet_path)
+        sheet = parsed.sheet
 
-        if not sheet.validate_and_scrub_sample_sheet():
+        if not parsed.validate():
             s = "Sample sheet %s is not valid." % self.sample_sheet_path
             raise PipelineError(s)
 
@@ -139,7 +154,29 @@ class TellReadJob(Job):
         # particular knowledge of the project.
         return {"chemistry": chemistry, "projects": lst, "sample_ids": sample_ids}
 
+    def expected_outputs(self):
+        """
+        Returns the files TellRead is expected to write for each barcode.
+        :return: A dict of barcode_id => list of file names.
+        """
+        return {
+            barcode_id: [
+                self.OUTPUT_NAME.format(read=read, barcode_id=barcode_id)
+                for read in self.READS
+            ]
+            for _, _, barcode_id in self.sample_ids
+        }
+
+    def _write_manifest(self):
+        # the job script waits for every file listed in the manifest.
+        with open(self.manifest_path, "w") as f:
+            for file_names in self.expected_outputs().values():
+                for file_name in file_names:
+                    print(file_name, file=f)
+
     def _generate_job_script(self):
+        self._write_manifest()
+
         job_script_path = join(self.output_path, "tellread_test.sbatch")
         template = self.jinja_env.get_template("tellread.sbatch")
 
@@ -184,6 +221,10 @@ class TellReadJob(Job):
                         "samples": samples,
                         "refs": refs,
                         "extra": extra,
+                        "manifest_path": self.manifest_path,
+                        "poll_interval": self.POLL_INTERVAL,
+                        "quiet_time": self.QUIET_TIME,
+                        "max_wait": self.MAX_WAIT,
                     }
                 )
             )
@@ -194,29 +235,16 @@ class TellReadJob(Job):
         # this overriden audit method does not need sample-ids passed as a
         # parameter because this job is already aware of what samples should
         # be present and more importantly, how they map to barcode_ids.
-        def map_barcode_id_to_sample_id(barcode_id):
-            for s_id, _, b_id in self.sample_ids:
-                if barcode_id == b_id:
-                    return s_id
-
-        corrected = defaultdict(list)
+        found = set()
         for root, dirs, files in walk(join(self.output_path, "Full")):
-            for _file in files:
-                m = re.match(
-                    r"TellReadJob_(.\d)_(C\d\d\d).fastq.gz.corrected."
-                    r"err_barcode_removed.fastq",
-                    _file,
-                )
-                if m:
-                    read, barcode_id = m.groups(1)
-                    corrected[barcode_id].append(read)
+            found.update(files)
 
-        # a sample was processed successfully if all three expected reads are
-        # present.
+        # a sample was processed successfully if all of the outputs the job
+        # script waited for are present.
+        expected = self.expected_outputs()
         failed = []
-        for barcode_id in corrected:
-            # we expect only the following read/orientations.
-            if not set(corrected[barcode_id]) == {"I1", "R1", "R2"}:
-                failed.append(map_barcode_id_to_sample_id(barcode_id))
+        for sample_id, _, barcode_id in self.sample_ids:
+            if not found.issuperset(expected[barcode_id]):
+                failed.append(sample_id)
 
         return sorted(failed)
@@ -0,0 +1,237 @@
+import logging
+from contextlib import contextmanager
+from json import dumps, loads
+from os import getpid, makedirs, replace
+from os.path import exists, join
+from threading import Lock, get_ident, local
+from time import time
+
+
+class Tracer:
+    """
+    Records timed spans of a run as JSON lines.
+
+    A span is a named interval (e.g. a Workflow step, a Job's run() or a
+    Slurm job) w/a category and a dict of attributes such as a job's id,
+    its array size, the bytes it read and wrote and the CPU time and memory
+    Slurm reports for it. Spans are appended to a file in the run's output
+    directory as they end, so spans from restarted runs accumulate in the
+    same file. write_chrome_trace() converts them to the Chrome trace event
+    format, which can be opened in Perfetto (https://ui.perfetto.dev) or
+    chrome://tracing to inspect where a run's time went.
+
+    A single Tracer is active per process. Code that emits spans uses the
+    module-level span() and annotate(), which do nothing while no Tracer is
+    active.
+    """
+
+    SPANS_NAME = "spans.jsonl"
+    TRACE_NAME = "trace.json"
+
+    _active = None
+    _active_lock = Lock()
+
+    def __init__(self, output_path):
+        """
+        :param output_path: The run's output directory.
+        """
+        self.output_path = output_path
+        self.spans_path = join(output_path, Tracer.SPANS_NAME)
+        self.trace_path = join(output_path, Tracer.TRACE_NAME)
+        self._lock = Lock()
+        # the attributes of the spans open on each thread, innermost last.
+        self._open = local()
+
+    @classmethod
+    def activate(cls, output_path):
+        """
+        Makes a new Tracer for output_path the active Tracer.
+        :param output_path: The run's output directory.
+        :return: The active Tracer.
+        """
+        with cls._active_lock:
+            cls._active = cls(output_path)
+            return cls._active
+
+    @classmethod
+    def deactivate(cls):
+        """
+        Stops recording spans.
+        :return: None
+        """
+        with cls._active_lock:
+            cls._active = None
+
+    @classmethod
+    def active(cls):
+        """
+        Returns the active Tracer.
+        :return: A Tracer or None.
+        """
+        return cls._active
+
+    def record(self, name, category, start, end, status="ok", **attributes):
+        """
+        Writes a span.
+        :param name: The span's name.
+        :param category: The kind of span, e.g. 'job' or 'step'.
+        :param start: The span's start, in seconds since the epoch.
+        :param end: The span's end, in seconds since the epoch.
+        :param status: 'ok' or 'error'.
+        :param attributes: Values describing the span. Must be JSON
+        serializable; None values are dropped.
+        :return: None
+        """
+        span = {
+            "name": name,
+            "category": category,
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            "status": status,
+            "pid": getpid(),
+            "thread": get_ident(),
+            "attributes": {k: v for k, v in attributes.items() if v is not None},
+        }
+
+        line = dumps(span, default=str) + "\n"
+
+        try:
+            with self._lock:
+                makedirs(self.output_path, exist_ok=True)
+                with open(self.spans_path, "a") as f:
+                    f.write(line)
+        except OSError as e:
+            # losing a span should never fail the run.
+            logging.warning(f"could not record span '{name}': {e}")
+
+    @contextmanager
+    def span(self, name, category, **attributes):
+        """
+        Records the time spent in a block of code.
+
+        The block may add attributes to the dict that is yielded, e.g. a
+        job-id that is only known once the job is submitted. A span whose
+        block raises an exception is recorded w/status 'error'.
+
+        :param name: The span's name.
+        :param category: The kind of span, e.g. 'job' or 'step'.
+        :param attributes: Initial values describing the span.
+        :return: A dict of attributes.
+        """
+        start = time()
+        status = "ok"
+
+        if not hasattr(self._open, "spans"):
+            self._open.spans = []
+        self._open.spans.append(attributes)
+
+        try:
+            yield attributes
+        except BaseException as e:
+            status = "error"
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._open.spans.pop()
+            self.record(name, category, start, time(), status, **attributes)
+
+    def annotate(self, **attributes):
+        """
+        Adds attributes to the innermost span open on the calling thread.
+        :param attributes: Values describing the span.
+        :return: None
+        """
+        spans = getattr(self._open, "spans", None)
+
+        if spans:
+            spans[-1].update(attributes)
+
+    def read_spans(self):
+        """
+        Returns the spans recorded for the run.
+        :return: A list of dicts, in the order they were recorded.
+        """
+        if not exists(self.spans_path):
+            return []
+
+        with open(self.spans_path, "r") as f:
+            return [loads(line) for line in f if line.strip()]
+
+    def write_chrome_trace(self, trace_path=None):
+        """
+        Converts the recorded spans to a Chrome trace event file.
+        :param trace_path: (Optional) The file to write. Defaults to
+        trace.json in the run's output directory.
+        :return: The path to the trace file.
+        """
+        trace_path = self.trace_path if trace_path is None else trace_path
+
+        events = []
+        # the process and thread ids of spans from a restarted run may have
+        # been reused, but their times don't overlap.
+        threads = {}
+
+        for span in self.read_spans():
+            tid = threads.setdefault((span["pid"], span["thread"]), len(threads))
+            args = dict(span["attributes"])
+            args["status"] = span["status"]
+
+            # 'X' events are complete events; times are in microseconds.
+            events.append(
+                {
+                    "name": span["name"],
+                    "cat": span["category"],
+                    "ph": "X",
+                    "ts": round(span["start"] * 10**6),
+                    "dur": round(span["duration"] * 10**6),
+                    "pid": span["pid"],
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+
+        tmp_path = trace_path + ".partial"
+
+        with open(tmp_path, "w") as f:
+            f.write(dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+        replace(tmp_path, trace_path)
+
+        return trace_path
+
+
+@contextmanager
+def span(name, category, **attributes):
+    """
+    Records a span w/the active Tracer, if there is one.
+    :param name: The span's name.
+    :param category: The kind of span, e.g. 'job' or 'step'.
+    :param attributes: Initial values describing the span.
+    :return: A dict of attributes the block may add to.
+    """
+    tracer = Tracer.active()
+
+    if tracer is None:
+        yield attributes
+        return
+
+    with tracer.span(name, category, **attributes) as attrs:
+        yield attrs
+
+
+def annotate(**attributes):
+    """
+    Adds attributes to the innermost open span of the active Tracer.
+
+    Lets code record values it only learns partway through a span, e.g.
+    the id of a Slurm job it submitted. Does nothing while no Tracer is
+    active or no span is open on the calling thread.
+
+    :param attributes: Values describing the span.
+    :return: None
+    """
+    tracer = Tracer.active()
+
+    if tracer is not None:
+        tracer.annotate(**attributes)
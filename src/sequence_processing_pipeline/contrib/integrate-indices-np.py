@@ -49,6 +49,10 @@
 import gzip
 import io
 import re
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 import numpy as np
@@ -57,14 +61,23 @@ import pgzip
 RECORD = re.compile(rb"@\S+\n[ATGCN]+\n\+\n\S+\n")
 BARCODE = re.compile(rb"@\S+\n([ATGCN]+)\n\+\n\S+\n")
 
+# the uncompressed size of a BGZF block, as used by bgzip and samtools. This
+# keeps the offset within a block below 2**16.
+BGZF_BLOCK_SIZE = 0xFF00
+# the empty block that marks the end of a BGZF file.
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
 
-def gather_order(i1_in_fp):
+
+def gather_order(i1_in_fp, i1_out_fp=None):
     """Determine record order
 
     This is a fancy way of saying: get all the barcodes, and sort them.
 
     We return the order of the sorted records, the unique barcodes,
     and the bounds for what barcode associated with what record
+
+    If i1_out_fp is given, the index data are also written to it as-is,
+    saving a separate read of the index file just to compress it.
     """
     # determine barcode length
     _ = i1_in_fp.readline()
@@ -74,6 +87,8 @@ def gather_order(i1_in_fp):
 
     # we need larger data in memory later anyway...
     i1 = i1_in_fp.read()
+    if i1_out_fp is not None:
+        i1_out_fp.write(i1)
     start = 0
     end = len(i1)
 
@@ -151,6 +166,11 @@ def test_gather_order():
     assert (unique == exp_unique).all()
     assert (bounds == exp_bounds).all()
 
+    i1.seek(0)
+    i1out = io.BytesIO()
+    gather_order(i1, i1out)
+    assert i1out.getvalue() == i1.getvalue()
+
 
 def troll_and_write(order, unique, bounds, in_, out_):
     """Walk over the raw data, spit out barcode amended records in order
@@ -160,6 +180,9 @@ def troll_and_write(order, unique, bounds, in_, out_):
     - pull out each record in order according to the barcode data
     - associate the barcode
     - write
+
+    Returns the uncompressed byte offset at which each barcode's group of
+    records begins in the output, followed by the size of the output.
     """
 
     data = in_.read()
@@ -175,6 +198,9 @@ def troll_and_write(order, unique, bounds, in_, out_):
     current_barcode = unique[current_barcode_idx]
     current_barcode_bound_end = bounds[current_barcode_idx + 1]
 
+    group_offsets = np.zeros(unique.size + 1, dtype=np.uint64)
+    written = 0
+
     for order_idx, record_idx in enumerate(order):
         if order_idx >= current_barcode_bound_end:
             current_barcode_idx += 1
@@ -182,6 +208,7 @@ def troll_and_write(order, unique, bounds, in_, out_):
             if current_barcode_idx >= bounds.size:
                 raise ValueError("should not happen?")
             current_barcode = unique[current_barcode_idx]
+            group_offsets[current_barcode_idx] = written
 
             if current_barcode_idx + 1 >= bounds.size:
                 # run to the end
@@ -202,6 +229,176 @@ def troll_and_write(order, unique, bounds, in_, out_):
 
         with_barcode = insert_barcode(record, current_barcode)
         out_.write(with_barcode)
+        written += len(with_barcode)
+
+    group_offsets[-1] = written
+
+    return group_offsets
+
+
+def bgzf_block(data, level):
+    """Compress data into a single BGZF block"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+
+    # a gzip header w/the 'BC' extra field holding the block's size - 1.
+    header = struct.pack(
+        "<4BI2BH2sHH", 0x1F, 0x8B, 8, 4, 0, 0, 0xFF, 6, b"BC", 2, len(cdata) + 25
+    )
+    footer = struct.pack("<II", zlib.crc32(data), len(data))
+
+    return header + cdata + footer
+
+
+class BgzfWriter:
+    """Write block-gzipped (BGZF) data, as written by bgzip
+
+    The output is a series of gzip members of at most BGZF_BLOCK_SIZE bytes
+    of input each, and can be read by any gzip reader. Blocks are compressed
+    in parallel and written in order. close() returns the compressed and
+    uncompressed offset of every block, from which the virtual offset of any
+    position in the uncompressed data can be computed.
+    """
+
+    def __init__(self, fp, threads=1, level=6):
+        self.fp = fp
+        self.level = level
+        self.buffer = bytearray()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads))
+        self.pending = deque()
+        self.max_pending = 4 * max(1, threads)
+        self.blocks = []
+        self.compressed = 0
+        self.uncompressed = 0
+
+    def write(self, data):
+        self.buffer += data
+
+        while len(self.buffer) >= BGZF_BLOCK_SIZE:
+            self._submit(bytes(self.buffer[:BGZF_BLOCK_SIZE]))
+            del self.buffer[:BGZF_BLOCK_SIZE]
+
+    def _submit(self, data):
+        future = self.executor.submit(bgzf_block, data, self.level)
+        self.pending.append((len(data), future))
+
+        while len(self.pending) > self.max_pending:
+            self._write_next()
+
+    def _write_next(self):
+        size, future = self.pending.popleft()
+        block = future.result()
+
+        self.blocks.append((self.compressed, self.uncompressed))
+        self.fp.write(block)
+        self.compressed += len(block)
+        self.uncompressed += size
+
+    def close(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+
+        while self.pending:
+            self._write_next()
+
+        self.fp.write(BGZF_EOF)
+        self.fp.close()
+        self.executor.shutdown()
+
+        return np.array(self.blocks, dtype=np.uint64).reshape(-1, 2)
+
+
+def write_gzi(path, blocks):
+    """Write a bgzip-compatible .gzi index of the blocks of a BGZF file"""
+    # the first block always begins at (0, 0) and isn't recorded.
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", max(0, len(blocks) - 1)))
+        f.write(blocks[1:].astype("<u8").tobytes())
+
+
+def virtual_offsets(offsets, blocks):
+    """Convert uncompressed offsets into BGZF virtual offsets
+
+    A virtual offset is the compressed offset of the block holding a
+    position, shifted left 16 bits, plus the position's offset within the
+    uncompressed block.
+    """
+    offsets = np.asarray(offsets, dtype=np.uint64)
+
+    if len(blocks) == 0:
+        return np.zeros_like(offsets)
+
+    idx = np.searchsorted(blocks[:, 1], offsets, side="right") - 1
+    return (blocks[idx, 0] << np.uint64(16)) | (offsets - blocks[idx, 1])
+
+
+def test_bgzf():
+    data = b"".join(b"@r%d\nACGT\n+\n!!!!\n" % i for i in range(20000))
+    out = io.BytesIO()
+    out.close = lambda: None
+    writer = BgzfWriter(out, threads=2)
+    for i in range(0, len(data), 1000):
+        writer.write(data[i : i + 1000])
+    blocks = writer.close()
+
+    raw = out.getvalue()
+    assert raw.endswith(BGZF_EOF)
+    assert gzip.decompress(raw) == data
+    assert len(blocks) == -(-len(data) // BGZF_BLOCK_SIZE)
+
+    # a virtual offset locates a position w/out decompressing prior blocks.
+    position = 3 * BGZF_BLOCK_SIZE + 10
+    voffset = int(virtual_offsets([position], blocks)[0])
+    member = io.BytesIO(raw[voffset >> 16 :])
+    with gzip.GzipFile(fileobj=member) as f:
+        f.read(voffset & 0xFFFF)
+        assert f.read(100) == data[position : position + 100]
+
+
+def write_barcode_groups(
+    path,
+    unique,
+    bounds,
+    record_count,
+    r1_offsets,
+    r2_offsets,
+    r1_blocks=None,
+    r2_blocks=None,
+):
+    """Write the barcode groups of the sorted output to a .npz file
+
+    The file holds the following arrays, one entry per unique barcode and in
+    output order:
+
+    - barcodes: the barcode.
+    - counts: the number of records w/the barcode.
+    - starts: the index of the barcode's first record in the output.
+    - r1_offsets, r2_offsets: the uncompressed byte offset of the barcode's
+      first record in the R1 and R2 output. These have an additional,
+      final entry holding the size of the output.
+    - r1_voffsets, r2_voffsets: the same offsets as BGZF virtual offsets.
+      Only present if the blocks of BGZF output are given.
+
+    See sequence_processing_pipeline.BarcodeGroups for a reader.
+    """
+    counts = np.diff(np.append(bounds, record_count))
+
+    arrays = {
+        "barcodes": unique,
+        "counts": counts.astype(np.uint64),
+        "starts": bounds.astype(np.uint64),
+        "r1_offsets": r1_offsets,
+        "r2_offsets": r2_offsets,
+    }
+
+    if r1_blocks is not None and r2_blocks is not None:
+        arrays["r1_voffsets"] = virtual_offsets(r1_offsets, r1_blocks)
+        arrays["r2_voffsets"] = virtual_offsets(r2_offsets, r2_blocks)
+
+    # np.savez() appends '.npz' to paths that don't already end w/it.
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
 
 
 def test_troll_and_write():
@@ -275,7 +472,7 @@ def test_troll_and_write():
     ]
     r1 = io.BytesIO(b"\n".join(r1data))
     r1out = io.BytesIO()
-    troll_and_write(order, unique, bounds, r1, r1out)
+    offsets = troll_and_write(order, unique, bounds, r1, r1out)
     r1out.seek(0)
 
     r1exp = [
@@ -312,15 +509,16 @@ def test_troll_and_write():
     r1exp = b"\n".join(r1exp)
     assert r1exp == r1out.read()
 
+    # each barcode group begins w/the first record tagged w/it.
+    assert (offsets == np.array([0, 62, 124, 217])).all()
+    for offset, barcode in zip(offsets, unique):
+        assert r1exp[offset:].split(b"\n", 1)[0].endswith(b"BX:Z:%s-1" % barcode)
+
 
 def create_tag(t):
     return b"BX:Z:%s-1" % t
 
 
-def create_tag_no_suffix(t):
-    return b"BX:Z:%s" % t
-
-
 def insert_barcode(record, barcode):
     """Get the current ID, smash the needed tag in"""
     # @foo\nATGC\n+\n!!!!\n
@@ -329,24 +527,142 @@ def insert_barcode(record, barcode):
     return b"%s %s\n%s" % (id_, tag, remainder)
 
 
-def readfq(fp):
-    if fp.mode == "rb":
-        strip = bytes.strip
+class LineBlocks:
+    """Read lines from a binary file in large chunks
+
+    Lines are split from each chunk w/bytes.split() rather than being read
+    one at a time, and are returned w/out their newlines.
+    """
+
+    def __init__(self, fp, chunk_size=2**24):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.lines = []
+        self.pos = 0
+        self.partial = b""
+        self.eof = False
+
+    def take(self, n):
+        """Return the next n lines, or fewer at the end of the file"""
+        while len(self.lines) - self.pos < n and not self.eof:
+            chunk = self.fp.read(self.chunk_size)
+
+            if chunk:
+                lines = (self.partial + chunk).split(b"\n")
+                # the last line may be incomplete.
+                self.partial = lines.pop()
+            else:
+                self.eof = True
+                lines = [self.partial] if self.partial else []
+                self.partial = b""
+
+            self.lines = self.lines[self.pos :] + lines
+            self.pos = 0
+
+        lines = self.lines[self.pos : self.pos + n]
+        self.pos += len(lines)
+        return lines
+
+
+def strip_orientation(ids):
+    """Remove a /1, /2 or /3 suffix from any record IDs that have one"""
+    return [x[:-2] if x[-2:] in (b"/1", b"/2", b"/3") else x for x in ids]
+
+
+def integrate_unsorted(
+    r1_in,
+    r2_in,
+    i1_in,
+    r1_out,
+    r2_out,
+    i1_out,
+    orient_r1,
+    orient_r2,
+    block_records=2**16,
+):
+    """Tag R1 and R2 records w/their barcodes, preserving record order
+
+    R1, R2 and I1 are read in lockstep, a block of records at a time. The
+    record IDs of each block are compared in bulk and each output block is
+    written w/a single join.
+    """
+    readers = [LineBlocks(x) for x in (r1_in, r2_in, i1_in)]
+    # ignore any orientation suffix already present when comparing IDs.
+    strip = not orient_r1
+
+    while True:
+        r1, r2, i1 = [x.take(4 * block_records) for x in readers]
+
+        if not r1 and not r2 and not i1:
+            break
+
+        if not len(r1) == len(r2) == len(i1) or len(r1) % 4:
+            raise ValueError("R1, R2 and I1 contain different numbers of records")
+
+        ids = r1[0::4]
+        r2_ids = r2[0::4]
+        i1_ids = i1[0::4]
+        if strip:
+            ids = strip_orientation(ids)
+            r2_ids = strip_orientation(r2_ids)
+            i1_ids = strip_orientation(i1_ids)
+
+        if ids != r2_ids:
+            raise ValueError("R1 and R2 records are not in the same order")
+
+        if ids != i1_ids:
+            raise ValueError("R1 and I1 records are not in the same order")
+
+        tags = [b" BX:Z:" + x for x in i1[1::4]]
+        r1[0::4] = [x + orient_r1 + t for x, t in zip(r1[0::4], tags)]
+        r2[0::4] = [x + orient_r2 + t for x, t in zip(r2[0::4], tags)]
+
+        r1_out.write(b"\n".join(r1) + b"\n")
+        r2_out.write(b"\n".join(r2) + b"\n")
+        if i1_out is not None:
+            i1_out.write(b"\n".join(i1) + b"\n")
+
+
+def test_integrate_unsorted():
+    r1 = io.BytesIO(b"@foo\nAATGC\n+\n!!!!!\n@bar\nATTGG\n+\n!!!!!\n")
+    r2 = io.BytesIO(b"@foo\nCATGC\n+\n!!!!!\n@bar\nCTTGG\n+\n!!!!!\n")
+    i1data = b"@foo\nATGC\n+\n!!!!\n@bar\nTTGG\n+\n!!!!"
+    i1 = io.BytesIO(i1data)
+    r1out, r2out, i1out = io.BytesIO(), io.BytesIO(), io.BytesIO()
+
+    # a block size smaller than the input exercises reading in blocks.
+    integrate_unsorted(r1, r2, i1, r1out, r2out, i1out, b"/1", b"/2", 1)
+
+    r1exp = b"@foo/1 BX:Z:ATGC\nAATGC\n+\n!!!!!\n@bar/1 BX:Z:TTGG\nATTGG\n+\n!!!!!\n"
+    r2exp = b"@foo/2 BX:Z:ATGC\nCATGC\n+\n!!!!!\n@bar/2 BX:Z:TTGG\nCTTGG\n+\n!!!!!\n"
+    assert r1out.getvalue() == r1exp
+    assert r2out.getvalue() == r2exp
+    assert i1out.getvalue() == i1data + b"\n"
+
+    for x in (r1, r2, i1):
+        x.seek(0)
+    r2 = io.BytesIO(r2.getvalue().replace(b"@bar", b"@baz"))
+    try:
+        integrate_unsorted(r1, r2, i1, io.BytesIO(), io.BytesIO(), None, b"", b"")
+    except ValueError:
+        pass
     else:
-        strip = str.strip
+        raise AssertionError("records out of order were not detected")
 
-    id_ = iter(fp)
-    seq = iter(fp)
-    dumb = iter(fp)
-    qual = iter(fp)
-    for rec in zip(id_, seq, dumb, qual):
-        yield list(map(strip, rec))
+    # input that already carries orientation suffixes keeps them, w/or
+    # w/out a suffix on I1.
+    r1 = io.BytesIO(b"@foo/1\nAATGC\n+\n!!!!!\n@bar/1\nATTGG\n+\n!!!!!\n")
+    r2 = io.BytesIO(b"@foo/2\nCATGC\n+\n!!!!!\n@bar/2\nCTTGG\n+\n!!!!!\n")
+    for i1data in (i1data, i1data.replace(b"@foo", b"@foo/3")):
+        for x in (r1, r2):
+            x.seek(0)
+        r1out, r2out = io.BytesIO(), io.BytesIO()
+        i1 = io.BytesIO(i1data)
 
+        integrate_unsorted(r1, r2, i1, r1out, r2out, None, b"", b"")
 
-def writefq(rec, out):
-    for item in rec:
-        out.write(item)
-        out.write(b"\n")
+        assert r1out.getvalue() == r1exp
+        assert r2out.getvalue() == r2exp
 
 
 @click.group()
@@ -358,6 +674,8 @@ def cli():
 def tests():
     test_gather_order()
     test_troll_and_write()
+    test_integrate_unsorted()
+    test_bgzf()
 
 
 @cli.command()
@@ -366,16 +684,53 @@ def tests():
 @click.option("--i1-in", type=click.Path(exists=True), required=True)
 @click.option("--r1-out", type=click.Path(exists=False), required=True)
 @click.option("--r2-out", type=click.Path(exists=False), required=True)
+@click.option("--i1-out", type=click.Path(exists=False), required=False)
 @click.option("--threads", type=int, required=False, default=1)
 @click.option("--no-sort", is_flag=True, default=False)
-def integrate(r1_in, r2_in, i1_in, r1_out, r2_out, threads, no_sort):
+@click.option(
+    "--barcode-groups",
+    type=click.Path(exists=False),
+    required=False,
+    help="Write the position of each barcode's records to this .npz file.",
+)
+@click.option(
+    "--bgzf",
+    is_flag=True,
+    default=False,
+    help="Write R1 and R2 as BGZF w/a .gzi index, for random access.",
+)
+def integrate(
+    r1_in,
+    r2_in,
+    i1_in,
+    r1_out,
+    r2_out,
+    i1_out,
+    threads,
+    no_sort,
+    barcode_groups,
+    bgzf,
+):
+    # records are only grouped by barcode when they're sorted.
+    if no_sort and barcode_groups is not None:
+        raise click.UsageError("--barcode-groups can't be used w/--no-sort")
+
+    if no_sort and bgzf:
+        raise click.UsageError("--bgzf can't be used w/--no-sort")
+
     r1_in_fp = open(r1_in, "rb")
     r2_in_fp = open(r2_in, "rb")
     i1_in_fp = open(i1_in, "rb")
 
+    # the index reads are optionally compressed as they're read. pgzip
+    # compresses on its own threads, in parallel w/the R1 and R2 output.
+    i1_out_fp = None
+    if i1_out is not None:
+        i1_out_fp = pgzip.open(i1_out, mode="wb", thread=threads, blocksize=2 * 10**8)
+
     if no_sort:
-        r1_out_fp = gzip.open(r1_out, mode="wb")
-        r2_out_fp = gzip.open(r2_out, mode="wb")
+        r1_out_fp = pgzip.open(r1_out, mode="wb", thread=threads, blocksize=2 * 10**8)
+        r2_out_fp = pgzip.open(r2_out, mode="wb", thread=threads, blocksize=2 * 10**8)
 
         r1_sniff = r1_in_fp.readline().strip()
         r2_sniff = r2_in_fp.readline().strip()
@@ -391,36 +746,61 @@ def integrate(r1_in, r2_in, i1_in, r1_out, r2_out, threads, no_sort):
                     f"{r1_sniff.decode('utf-8')} "
                     f"{r2_sniff.decode('utf-8')}"
                 )
-            orient_r1 = ""
-            orient_r2 = ""
+            orient_r1 = b""
+            orient_r2 = b""
         else:
             assert b"/1" not in r1_sniff
 
             orient_r1 = b"/1"
             orient_r2 = b"/2"
 
-        for r1, r2, i1 in zip(*map(readfq, [r1_in_fp, r2_in_fp, i1_in_fp])):
-            assert r1[0] == r2[0]
-            assert r1[0] == i1[0]
-
-            tag = create_tag_no_suffix(i1[1])
-            r1[0] = b"%s%s %s" % (r1[0], orient_r1, tag)
-            r2[0] = b"%s%s %s" % (r2[0], orient_r2, tag)
-            writefq(r1, r1_out_fp)
-            writefq(r2, r2_out_fp)
+        integrate_unsorted(
+            r1_in_fp,
+            r2_in_fp,
+            i1_in_fp,
+            r1_out_fp,
+            r2_out_fp,
+            i1_out_fp,
+            orient_r1,
+            orient_r2,
+        )
         r1_out_fp.close()
         r2_out_fp.close()
     else:
-        # 200MB is what they use in their readme...
-        r1_out_fp = pgzip.open(r1_out, mode="wb", thread=threads, blocksize=2 * 10**8)
-        r2_out_fp = pgzip.open(r2_out, mode="wb", thread=threads, blocksize=2 * 10**8)
+        if bgzf:
+            r1_out_fp = BgzfWriter(open(r1_out, "wb"), threads=threads)
+            r2_out_fp = BgzfWriter(open(r2_out, "wb"), threads=threads)
+        else:
+            # 200MB is what they use in their readme...
+            r1_out_fp = pgzip.open(
+                r1_out, mode="wb", thread=threads, blocksize=2 * 10**8
+            )
+            r2_out_fp = pgzip.open(
+                r2_out, mode="wb", thread=threads, blocksize=2 * 10**8
+            )
+
+        order, unique, bounds = gather_order(i1_in_fp, i1_out_fp)
+
+        offsets = []
+        blocks = []
+        for in_, out_, out_path in zip(
+            [r1_in_fp, r2_in_fp], [r1_out_fp, r2_out_fp], [r1_out, r2_out]
+        ):
+            offsets.append(troll_and_write(order, unique, bounds, in_, out_))
+            in_.close()
+            if bgzf:
+                blocks.append(out_.close())
+                write_gzi(out_path + ".gzi", blocks[-1])
+            else:
+                out_.close()
 
-        order, unique, bounds = gather_order(i1_in_fp)
+        if barcode_groups is not None:
+            write_barcode_groups(
+                barcode_groups, unique, bounds, order.size, *offsets, *blocks
+            )
 
-        for in_, out_ in zip([r1_in_fp, r2_in_fp], [r1_out_fp, r2_out_fp]):
-            troll_and_write(order, unique, bounds, in_, out_)
-            in_.close()
-            out_.close()
+    if i1_out_fp is not None:
+        i1_out_fp.close()
 
 
 if __name__ == "__main__":
@@ -13,8 +13,9 @@ def cli():
 @click.option('--output', type=click.Path(exists=True), required=True)
 @click.option('--task', type=int, required=True)
 @click.option('--maxtask', type=int, required=True)
-def demux(id_map, infile, output, task, maxtask):
-    demux_cmd(id_map, infile, output, task, maxtask)
+@click.option('--manifest', type=click.Path(), required=False)
+def demux(id_map, infile, output, task, maxtask, manifest):
+    demux_cmd(id_map, infile, output, task, maxtask, manifest)
 
 
 if __name__ == '__main__':
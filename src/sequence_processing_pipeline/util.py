@@ -1,10 +1,16 @@
+from collections import namedtuple
+from functools import lru_cache
 from os.path import basename
+from re import DOTALL
 from re import compile as REC
 
 PAIR_UNDERSCORE = (REC(r"_R1_"), "_R1_", "_R2_")
 PAIR_DOT = (REC(r"\.R1\."), ".R1.", ".R2.")
 SIMPLE_PAIR_UNDERSCORE = (REC(r"_R1"), "_R1", "_R2")
 PAIR_TESTS = (PAIR_UNDERSCORE, PAIR_DOT, SIMPLE_PAIR_UNDERSCORE)
+# pairs: sorted list of (r1, r2) tuples.
+# unpaired_r1, unpaired_r2: sorted lists of files w/out a mate.
+PairedFiles = namedtuple("PairedFiles", ["pairs", "unpaired_r1", "unpaired_r2"])
 FILES_REGEX = {
     "SPP": {
         "fastq": REC(r"^(.*)_S\d{1,4}_L\d{3}_R\d_\d{3}\.fastq\.gz$"),
@@ -35,11 +41,15 @@ FILES_REGEX = {
 }
 
 
-def determine_orientation(file_name):
-    # aka forward, reverse, and indexed reads
-    orientations = ["R1", "R2", "I1", "I2"]
+# orientation is the right-most of '_R1', '.R1.', '_R2', '.R2.', etc. The
+# greedy prefix makes the match begin at the right-most candidate position.
+# ('_R1_' needn't be matched separately as it always begins w/'_R1'.)
+ORIENTATION_REGEX = REC(r"^.*(?:_(R1|R2|I1|I2)|\.(R1|R2|I1|I2)\.)", DOTALL)
 
-    results = []
+
+@lru_cache(maxsize=65536)
+def determine_orientation(file_name):
+    # aka forward, reverse, and indexed reads: 'R1', 'R2', 'I1', 'I2'.
 
     # assume orientation is always present in the file's name.
     # assume that it is of one of the four forms above.
@@ -50,27 +60,118 @@ def determine_orientation(file_name):
     # assume users can and will include any or all of the four
     # orientation as part of their filenames as well. e.g.:
     # ABC_7_04_1776_R1_SRE_S3_L007_R2_001.trimmed.fastq.gz
-    for o in orientations:
-        variations = [f"_{o}_", f".{o}.", f"_{o}"]
-        for v in variations:
-            # rfind searches from the end of the string, rather than
-            # its beginning. It returns the position in the string
-            # where the substring begins.
-            results.append((file_name.rfind(v), o))
+    m = ORIENTATION_REGEX.match(file_name)
 
-    # the orientation will be the substring found with the maximum
-    # found value for pos. That is, it will be the substring that
-    # begins at the rightest most position in the file name.
-    results.sort(reverse=True)
+    # if no orientations were found, then return None.
+    if m is None:
+        return None
 
-    pos, orientation = results[0]
+    return m.group(1) or m.group(2)
 
-    # if no orientations were found, then return None.
-    return None if pos == -1 else orientation
+
+def classify_orientations(paths):
+    """
+    Determines the orientation of many files at once.
+    :param paths: An iterable of file names or paths.
+    :return: A dict of path => 'R1', 'R2', 'I1', 'I2' or None.
+    """
+    return {x: determine_orientation(x) for x in paths}
+
+
+def pair_files(files):
+    """
+    Matches R1 files to their R2 mates in a single pass.
+
+    Files are keyed by their path up to the right-most '_R1', '.R1.', '_R2',
+    etc. marker (see determine_orientation()), so that e.g.
+    'a_R1_001.fastq.gz' and 'a_R2_001.fastq.gz' share the key 'a_'. Files
+    w/out a mate do not prevent the remaining files from being paired; it is
+    up to the caller to decide whether they are an error. Files whose
+    orientation is neither R1 nor R2 are ignored.
+    If more than one file shares a key and orientation, the first one in
+    sorted order is paired and the others are considered unpaired.
+
+    :param files: An iterable of file names or paths.
+    :return: A PairedFiles namedtuple.
+    """
+    r1_files = {}
+    r2_files = {}
+    unpaired = {"R1": [], "R2": []}
+
+    for fp in sorted(set(files)):
+        m = ORIENTATION_REGEX.match(fp)
+
+        if m is None:
+            continue
+
+        orientation = m.group(1) or m.group(2)
+
+        if orientation not in unpaired:
+            continue
+
+        key = fp[: m.start(1) if m.group(1) else m.start(2)]
+        found = r1_files if orientation == "R1" else r2_files
+
+        if key in found:
+            unpaired[orientation].append(fp)
+        else:
+            found[key] = fp
+
+    pairs = []
+
+    for key, r1_fp in r1_files.items():
+        if key in r2_files:
+            pairs.append((r1_fp, r2_files.pop(key)))
+        else:
+            unpaired["R1"].append(r1_fp)
+
+    unpaired["R2"].extend(r2_files.values())
+
+    return PairedFiles(pairs, sorted(unpaired["R1"]), sorted(unpaired["R2"]))
+
+
+def group_mates(files):
+    """
+    Groups files that hold the mates of the same reads, e.g. R1, R2 and I1.
+
+    Files are keyed by their path w/the right-most orientation marker removed
+    (see determine_orientation()), so that e.g. 'a_R1_001.fastq.gz' and
+    'a_I1_001.fastq.gz' share the key 'a__001.fastq.gz'. Files w/out an
+    orientation are each placed in a group of their own.
+
+    :param files: An iterable of file names or paths.
+    :return: A sorted list of lists of files, ordered R1, R2, I1, I2.
+    """
+    order = {"R1": 0, "R2": 1, "I1": 2, "I2": 3}
+    groups = {}
+    results = []
+
+    for fp in sorted(set(files)):
+        m = ORIENTATION_REGEX.match(fp)
+
+        if m is None:
+            results.append([fp])
+            continue
+
+        orientation = m.group(1) or m.group(2)
+        group = 1 if m.group(1) else 2
+        key = fp[: m.start(group)] + fp[m.end(group) :]
+        groups.setdefault(key, []).append((order[orientation], fp))
+
+    for group in groups.values():
+        results.append([fp for _, fp in sorted(group)])
+
+    return sorted(results)
 
 
 def iter_paired_files(files):
-    """Yield matched r1/r2 paired files"""
+    """
+    Yield matched r1/r2 paired files.
+
+    Raises ValueError if any file lacks a mate. Nothing in this package uses
+    it since pair_files() replaced it; it remains part of the public API of
+    sequence_processing_pipeline.util.
+    """
     files = sorted(files)
 
     if len(files) % 2 != 0:
@@ -111,3 +212,63 @@ def iter_paired_files(files):
             raise ValueError(f"Unable to match:\n{r1_fp}\n{r2_fp}")
 
         yield (r1_fp, r2_fp)
+
+
+def parse_slurm_duration(value):
+    """
+    Converts a Slurm duration (e.g. sacct's Elapsed or TotalCPU) to seconds.
+
+    Slurm writes durations as '[DD-[HH:]]MM:SS[.mmm]', or as 'HH:MM:SS' once
+    they exceed an hour.
+
+    :param value: A duration string.
+    :return: The duration in seconds, or None if value is empty or invalid.
+    """
+    value = value.strip()
+
+    if value in ("", "INVALID", "UNLIMITED", "Partition_Limit"):
+        return None
+
+    days = "0"
+    if "-" in value:
+        days, value = value.split("-", 1)
+
+    parts = value.split(":")
+    if not 1 <= len(parts) <= 3:
+        return None
+
+    try:
+        days = int(days)
+        seconds = float(parts[-1])
+        minutes = int(parts[-2]) if len(parts) > 1 else 0
+        hours = int(parts[-3]) if len(parts) > 2 else 0
+    except ValueError:
+        return None
+
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_slurm_memory(value):
+    """
+    Converts a Slurm memory size (e.g. sacct's MaxRSS) to bytes.
+    :param value: A size string, e.g. '1234K' or '2.5G'. Values w/out a unit
+    are bytes.
+    :return: The size in bytes, or None if value is empty or invalid.
+    """
+    value = value.strip()
+
+    # ReqMem may end in 'n' or 'c' (per node or per cpu).
+    if value[-1:] in ("n", "c"):
+        value = value[:-1]
+
+    units = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40, "P": 2**50}
+    scale = 1
+
+    if value[-1:].upper() in units:
+        scale = units[value[-1].upper()]
+        value = value[:-1]
+
+    try:
+        return int(float(value) * scale)
+    except ValueError:
+        return None
@@ -0,0 +1,1125 @@
+#!/usr/bin/env python
+"""
+A local emulator of the Slurm commands used by the pipeline.
+
+Submitted scripts are actually run, on an emulated cluster of nodes that
+each have a fixed number of CPUs. A scheduler daemon (started by the first
+submission and stopped once the queue has been idle for a while) starts
+tasks in submission order as CPUs become free, honoring:
+    --array, including '%' limits on the number of tasks running at once
+    --dependency (after, afterany, afterok and afternotok)
+    --cpus-per-task, --ntasks, --time, --output, --error and --export
+    --parsable and #SBATCH directives in the script
+
+squeue, sacct, scancel and 'scontrol shutdown' report on and control the
+emulated jobs w/output in Slurm's formats. Job's polling, batching and
+submission of dependent jobs can then be exercised and timed under
+contention on a single machine:
+
+    python tests/bin/slurm_emulator.py install --bin-dir /tmp/slurm/bin \\
+        --state-dir /tmp/slurm/state --nodes 2 --cpus-per-node 8
+    export PATH=/tmp/slurm/bin:$PATH
+    sbatch --parsable --array 1-10%4 my_script.sh
+
+Differences from Slurm: memory is accounted for but not enforced; a job
+whose dependencies can never be satisfied is cancelled (as w/Slurm's
+kill_invalid_depend) rather than left pending; and the variables passed
+to --export are added to the submitting environment.
+"""
+
+import argparse
+import fcntl
+import os
+import re
+import shlex
+import signal
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from json import dump, load
+from os.path import abspath, basename, exists, join
+from subprocess import DEVNULL, Popen
+from time import sleep, time
+
+STATE_DIR_VARIABLE = "SLURM_EMULATOR_DIR"
+
+DEFAULT_CONFIG = {
+    "nodes": 2,
+    "cpus_per_node": 4,
+    # memory is accounted for, not enforced.
+    "default_mem_per_cpu": 2**30,
+    # seconds between scheduling passes.
+    "scheduler_interval": 0.5,
+    # the daemon exits once nothing has been pending or running this long.
+    "idle_timeout": 30,
+    "partition": "qiita",
+}
+
+COMMANDS = ["sbatch", "squeue", "sacct", "scancel", "scontrol"]
+
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+ACTIVE_STATES = [PENDING, RUNNING]
+
+COMPACT_STATES = {
+    "PENDING": "PD",
+    "RUNNING": "R",
+    "COMPLETING": "CG",
+    "COMPLETED": "CD",
+    "FAILED": "F",
+    "TIMEOUT": "TO",
+    "CANCELLED": "CA",
+    "NODE_FAIL": "NF",
+    "OUT_OF_MEMORY": "OOM",
+}
+
+SQUEUE_FIELDS = {
+    "i": "JOBID",
+    "A": "JOBID",
+    "F": "ARRAY_JOB_ID",
+    "K": "ARRAY_TASK_ID",
+    "j": "NAME",
+    "T": "STATE",
+    "t": "ST",
+    "M": "TIME",
+    "l": "TIME_LIMIT",
+    "N": "NODELIST",
+    "R": "NODELIST(REASON)",
+    "r": "REASON",
+    "C": "CPUS",
+    "D": "NODES",
+    "P": "PARTITION",
+    "u": "USER",
+}
+
+SQUEUE_DEFAULT_FORMAT = "%.18i %.9P %.8j %.8u %.2t %.10M %.6D %R"
+
+SACCT_DEFAULT_FORMAT = "JobID,JobName,Partition,AllocCPUS,State,ExitCode"
+
+
+class EmulatorError(Exception):
+    pass
+
+
+def install(bin_dir, state_dir, **config):
+    """
+    Writes sbatch, squeue, sacct, scancel and scontrol to bin_dir.
+    :param bin_dir: The directory to write the commands to. Put it first in
+    PATH to use the emulator.
+    :param state_dir: The directory the emulator keeps its jobs in.
+    :param config: Overrides of DEFAULT_CONFIG, e.g. nodes=4.
+    :return: bin_dir
+    """
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"unknown settings: {', '.join(sorted(unknown))}")
+
+    state_dir = abspath(state_dir)
+    os.makedirs(bin_dir, exist_ok=True)
+    os.makedirs(join(state_dir, "scripts"), exist_ok=True)
+
+    with open(join(state_dir, "config.json"), "w") as f:
+        dump(dict(DEFAULT_CONFIG, **config), f, indent=2)
+
+    for command in COMMANDS:
+        path = join(bin_dir, command)
+        with open(path, "w") as f:
+            f.write(
+                "#!/bin/sh\n"
+                f"{STATE_DIR_VARIABLE}={shlex.quote(state_dir)} exec "
+                f"{shlex.quote(sys.executable)} "
+                f'{shlex.quote(abspath(__file__))} {command} "$@"\n'
+            )
+        os.chmod(path, 0o755)
+
+    return bin_dir
+
+
+def _state_dir():
+    state_dir = os.environ.get(STATE_DIR_VARIABLE)
+    if not state_dir:
+        raise EmulatorError(f"{STATE_DIR_VARIABLE} is not set")
+    return state_dir
+
+
+def _load_config(state_dir):
+    path = join(state_dir, "config.json")
+    config = dict(DEFAULT_CONFIG)
+    if exists(path):
+        with open(path) as f:
+            config.update(load(f))
+    return config
+
+
+@contextmanager
+def _locked(state_dir):
+    # every command reads and writes the state w/this lock held.
+    with open(join(state_dir, "lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _load_state(state_dir):
+    path = join(state_dir, "state.json")
+    if not exists(path):
+        return {"next_id": 1000, "jobs": {}}
+    with open(path) as f:
+        return load(f)
+
+
+def _save_state(state_dir, state):
+    path = join(state_dir, "state.json")
+    with open(path + ".partial", "w") as f:
+        dump(state, f)
+    os.replace(path + ".partial", path)
+
+
+def _tasks(state):
+    for job in state["jobs"].values():
+        for task in job["tasks"]:
+            yield job, task
+
+
+def _task_name(job, task):
+    if task["index"] is None:
+        return job["job_id"]
+    return f"{job['job_id']}_{task['index']}"
+
+
+def parse_array(value):
+    """
+    Parses an --array value, e.g. '1-10%4' or '0,2,4-8:2'.
+    :param value: The value of --array.
+    :return: A list of task indices and the limit on running tasks or None.
+    """
+    value, _, limit = value.partition("%")
+    indices = []
+
+    for part in value.split(","):
+        bounds, _, step = part.partition(":")
+        first, _, last = bounds.partition("-")
+        indices += range(int(first), int(last or first) + 1, int(step or 1))
+
+    return sorted(set(indices)), int(limit) if limit else None
+
+
+def parse_time(value):
+    """
+    Parses a --time value, e.g. '60', '10:00', '1:00:00' or '1-12'.
+    :param value: The value of --time.
+    :return: The limit in seconds, or None if it's unlimited.
+    """
+    if value in ("UNLIMITED", "infinite", "-1"):
+        return None
+
+    days = 0
+    if "-" in value:
+        days, value = value.split("-", 1)
+        parts = [int(x) for x in value.split(":")] + [0, 0]
+        hours, minutes, seconds = parts[:3]
+    else:
+        parts = [int(x) for x in value.split(":")]
+        if len(parts) == 1:
+            hours, minutes, seconds = 0, parts[0], 0
+        elif len(parts) == 2:
+            hours, minutes, seconds = 0, parts[0], parts[1]
+        else:
+            hours, minutes, seconds = parts
+
+    return ((int(days) * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_memory(value):
+    """
+    Parses a --mem value, e.g. '100G'. Values w/out a unit are megabytes.
+    :param value: The value of --mem.
+    :return: The size in bytes.
+    """
+    m = re.match(r"^(\d+(?:\.\d+)?)([KMGT]?)B?$", value.upper())
+    if m is None:
+        raise EmulatorError(f"invalid memory specification '{value}'")
+    exponent = "KMGT".index(m[2] or "M") + 1
+    return int(float(m[1]) * 1024**exponent)
+
+
+def parse_dependency(value):
+    """
+    Parses a --dependency value, e.g. 'afterok:123:124,afterany:125'.
+    :param value: The value of --dependency.
+    :return: A list of [type, job-id] pairs.
+    """
+    dependencies = []
+
+    for part in filter(None, value.split(",")):
+        kind, _, ids = part.partition(":")
+        if kind not in ("after", "afterany", "afterok", "afternotok"):
+            raise EmulatorError(f"unsupported dependency '{part}'")
+        dependencies += [[kind, x] for x in ids.split(":") if x]
+
+    return dependencies
+
+
+def _sbatch_parser():
+    parser = argparse.ArgumentParser(prog="sbatch", add_help=False)
+    parser.add_argument("-J", "--job-name")
+    parser.add_argument("-a", "--array")
+    parser.add_argument("-d", "--dependency")
+    parser.add_argument("-c", "--cpus-per-task", type=int)
+    parser.add_argument("-n", "--ntasks", type=int)
+    parser.add_argument("-t", "--time")
+    parser.add_argument("--mem")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("-e", "--error")
+    parser.add_argument("-D", "--chdir")
+    parser.add_argument("--export")
+    parser.add_argument("--parsable", action="store_true", default=None)
+    parser.add_argument("-p", "--partition")
+    # accepted and ignored.
+    for option in (
+        ("-N", "--nodes"),
+        ("-A", "--account"),
+        ("-q", "--qos"),
+        ("-C", "--constraint"),
+        ("-w", "--nodelist"),
+        ("--gres",),
+        ("--mail-type",),
+        ("--mail-user",),
+        ("--mem-per-cpu",),
+        ("--ntasks-per-node",),
+        ("--tmp",),
+    ):
+        parser.add_argument(*option)
+    parser.add_argument("--exclusive", action="store_true", default=None)
+    parser.add_argument("--requeue", action="store_true", default=None)
+    parser.add_argument("script")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    return parser
+
+
+def _directives(script):
+    # #SBATCH lines are read until the first command.
+    tokens = []
+    for line in script.splitlines()[1:]:
+        if line.startswith("#SBATCH"):
+            tokens += shlex.split(line[len("#SBATCH") :], comments=True)
+        elif line.strip() and not line.startswith("#"):
+            break
+    return tokens
+
+
+def _environment(export, environment):
+    if export is None or export == "ALL":
+        return dict(environment)
+
+    names = export.split(",")
+    if names[0] == "NONE":
+        result = {k: environment[k] for k in ("PATH", "HOME") if k in environment}
+        names = names[1:]
+    else:
+        result = dict(environment)
+
+    for name in names:
+        if name == "ALL":
+            continue
+        key, sep, value = name.partition("=")
+        if sep:
+            result[key] = value
+        elif key in environment:
+            result[key] = environment[key]
+
+    return result
+
+
+def sbatch(argv, cwd, environment):
+    """
+    Queues a job.
+    :param argv: sbatch's arguments.
+    :param cwd: The directory sbatch was run from.
+    :param environment: The environment sbatch was run w/.
+    :return: The job-id and whether --parsable was given.
+    """
+    parser = _sbatch_parser()
+    cli = parser.parse_args(argv)
+
+    script_path = join(cwd, cli.script)
+    with open(script_path) as f:
+        script = f.read()
+
+    # the command-line takes precedence over the script's directives.
+    options = vars(parser.parse_args(_directives(script) + [cli.script]))
+    for key, value in vars(cli).items():
+        if value is not None:
+            options[key] = value
+
+    state_dir = _state_dir()
+    config = _load_config(state_dir)
+
+    cpus = (options["cpus_per_task"] or 1) * (options["ntasks"] or 1)
+    if cpus > config["cpus_per_node"]:
+        raise EmulatorError(
+            "Batch job submission failed: Requested node configuration is not available"
+        )
+
+    if options["array"]:
+        indices, array_limit = parse_array(options["array"])
+    else:
+        indices, array_limit = [None], None
+
+    dependencies = parse_dependency(options["dependency"] or "")
+
+    if options["mem"]:
+        memory = parse_memory(options["mem"])
+    else:
+        memory = config["default_mem_per_cpu"] * cpus
+
+    is_array = options["array"] is not None
+    default_output = "slurm-%A_%a.out" if is_array else "slurm-%j.out"
+
+    with _locked(state_dir):
+        state = _load_state(state_dir)
+        job_id = str(state["next_id"])
+
+        for _, dependency in dependencies:
+            if _find(state, dependency) is None:
+                raise EmulatorError(
+                    "Batch job submission failed: Job dependency problem"
+                )
+
+        # like Slurm, the script is copied when it's submitted.
+        copy_path = join(state_dir, "scripts", f"{job_id}.sh")
+        with open(copy_path, "w") as f:
+            f.write(script)
+
+        state["jobs"][job_id] = {
+            "job_id": job_id,
+            "name": options["job_name"] or basename(cli.script),
+            "script": copy_path,
+            "args": cli.script_args,
+            "cwd": join(cwd, options["chdir"]) if options["chdir"] else cwd,
+            "env": _environment(options["export"], environment),
+            "partition": options["partition"] or config["partition"],
+            "submit": time(),
+            "cpus": cpus,
+            "memory": memory,
+            "time_limit": parse_time(options["time"]) if options["time"] else None,
+            "output": options["output"] or default_output,
+            "error": options["error"] or options["output"] or default_output,
+            "dependencies": dependencies,
+            "array_limit": array_limit,
+            "array_size": len(indices) if is_array else None,
+            "tasks": [
+                {
+                    "id": str(int(job_id) + i),
+                    "index": index,
+                    "state": PENDING,
+                    "reason": "Priority",
+                    "node": None,
+                    "pid": None,
+                    "start": None,
+                    "end": None,
+                    "exit_code": None,
+                    "signal": 0,
+                    "cpu_seconds": None,
+                    "max_rss": None,
+                    "cancel": False,
+                    "timed_out": False,
+                }
+                for i, index in enumerate(indices)
+            ],
+        }
+
+        # array tasks each have a job-id of their own.
+        state["next_id"] += len(indices)
+        _save_state(state_dir, state)
+        _ensure_daemon(state_dir)
+
+    return job_id, bool(options["parsable"])
+
+
+def _find(state, job_id):
+    """
+    Finds the tasks of a job.
+    :param state: The emulator's state.
+    :param job_id: A job-id, an array task's job-id or '<job-id>_<index>'.
+    :return: A list of (job, task) or None if there's no such job.
+    """
+    if job_id in state["jobs"]:
+        job = state["jobs"][job_id]
+        return [(job, x) for x in job["tasks"]]
+
+    for job, task in _tasks(state):
+        if job_id in (task["id"], _task_name(job, task)):
+            return [(job, task)]
+
+    return None
+
+
+def _ensure_daemon(state_dir):
+    # called w/the lock held, so the daemon can't exit concurrently.
+    pid_path = join(state_dir, "slurmctld.pid")
+
+    if exists(pid_path):
+        with open(pid_path) as f:
+            pid = int(f.read())
+        try:
+            os.kill(pid, 0)
+            return
+        except OSError:
+            pass
+
+    with open(join(state_dir, "slurmctld.log"), "a") as log:
+        daemon = Popen(
+            [sys.executable, abspath(__file__), "slurmctld"],
+            env=dict(os.environ, **{STATE_DIR_VARIABLE: state_dir}),
+            stdin=DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+    with open(pid_path, "w") as f:
+        f.write(str(daemon.pid))
+
+
+class Scheduler:
+    """
+    Starts queued tasks as CPUs become free and records how they ended.
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.config = _load_config(state_dir)
+        self.nodes = [f"node-{i + 1:02d}" for i in range(self.config["nodes"])]
+        self.processes = {}
+        self.stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        idle_since = time()
+
+        with _locked(self.state_dir):
+            state = _load_state(self.state_dir)
+            # tasks this process didn't start can't be monitored.
+            for _, task in _tasks(state):
+                if task["state"] == RUNNING:
+                    self._finish(task, "NODE_FAIL", time())
+            _save_state(self.state_dir, state)
+
+        while True:
+            with _locked(self.state_dir):
+                state = _load_state(self.state_dir)
+                now = time()
+
+                if self.stopping:
+                    self._kill_all(state)
+                    _save_state(self.state_dir, state)
+                    os.remove(join(self.state_dir, "slurmctld.pid"))
+                    return
+
+                self.schedule(state, now)
+                _save_state(self.state_dir, state)
+
+                if any(t["state"] in ACTIVE_STATES for _, t in _tasks(state)):
+                    idle_since = now
+                elif now - idle_since > self.config["idle_timeout"]:
+                    os.remove(join(self.state_dir, "slurmctld.pid"))
+                    return
+
+            sleep(self.config["scheduler_interval"])
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def schedule(self, state, now):
+        """
+        Performs one scheduling pass.
+        :param state: The emulator's state.
+        :param now: The time of the pass.
+        :return: None
+        """
+        self._reap(state, now)
+
+        used = dict.fromkeys(self.nodes, 0)
+        running = {}
+
+        for job, task in _tasks(state):
+            if task["state"] != RUNNING:
+                continue
+
+            used[task["node"]] += job["cpus"]
+            running[job["job_id"]] = running.get(job["job_id"], 0) + 1
+
+            if task["cancel"]:
+                self._signal(task, signal.SIGTERM)
+            elif job["time_limit"] is not None and (
+                now - task["start"] > job["time_limit"]
+            ):
+                task["timed_out"] = True
+                self._signal(task, signal.SIGTERM)
+
+        # jobs are considered in the order they were submitted. a task that
+        # doesn't fit doesn't hold back smaller tasks submitted after it.
+        for job_id in sorted(state["jobs"], key=int):
+            job = state["jobs"][job_id]
+            pending = [x for x in job["tasks"] if x["state"] == PENDING]
+
+            if not pending:
+                continue
+
+            dependencies = self._dependencies(state, job)
+
+            if dependencies == "never":
+                for task in pending:
+                    task["reason"] = "DependencyNeverSatisfied"
+                    self._finish(task, "CANCELLED", now)
+                continue
+
+            if dependencies == "waiting":
+                for task in pending:
+                    task["reason"] = "Dependency"
+                continue
+
+            for task in pending:
+                limit = job["array_limit"]
+                if limit is not None and running.get(job_id, 0) >= limit:
+                    task["reason"] = "JobArrayTaskLimit"
+                    continue
+
+                node = next(
+                    (
+                        x
+                        for x in self.nodes
+                        if self.config["cpus_per_node"] - used[x] >= job["cpus"]
+                    ),
+                    None,
+                )
+
+                if node is None:
+                    task["reason"] = "Resources"
+                    continue
+
+                self._start(job, task, node, now)
+                used[node] += job["cpus"]
+                running[job_id] = running.get(job_id, 0) + 1
+
+    def _dependencies(self, state, job):
+        # returns 'ok', 'waiting' or 'never'.
+        result = "ok"
+
+        for kind, job_id in job["dependencies"]:
+            states = [x["state"] for _, x in _find(state, job_id) or []]
+            ended = all(x not in ACTIVE_STATES for x in states)
+
+            if kind == "after":
+                satisfied = all(x != PENDING for x in states)
+                never = False
+            elif kind == "afterany":
+                satisfied, never = ended, False
+            elif kind == "afterok":
+                failed = any(x not in ACTIVE_STATES + ["COMPLETED"] for x in states)
+                satisfied, never = ended and not failed, failed
+            else:
+                # afternotok
+                failed = any(x not in ACTIVE_STATES + ["COMPLETED"] for x in states)
+                satisfied, never = ended and failed, ended and not failed
+
+            if never:
+                return "never"
+            if not satisfied:
+                result = "waiting"
+
+        return result
+
+    def _start(self, job, task, node, now):
+        def _path(pattern):
+            path = (
+                pattern.replace("%%", "\0")
+                .replace("%A", job["job_id"])
+                .replace("%a", str(task["index"]))
+                .replace("%j", task["id"])
+                .replace("%x", job["name"])
+                .replace("%N", node)
+                .replace("%u", job["env"].get("USER", "user"))
+                .replace("\0", "%")
+            )
+            return join(job["cwd"], path)
+
+        env = dict(job["env"])
+        env.update(
+            {
+                "SLURM_JOB_ID": task["id"],
+                "SLURM_JOBID": task["id"],
+                "SLURM_JOB_NAME": job["name"],
+                "SLURM_JOB_PARTITION": job["partition"],
+                "SLURM_CPUS_PER_TASK": str(job["cpus"]),
+                "SLURM_CPUS_ON_NODE": str(job["cpus"]),
+                "SLURM_SUBMIT_DIR": job["cwd"],
+                "SLURMD_NODENAME": node,
+                "SLURM_JOB_NODELIST": node,
+            }
+        )
+
+        if task["index"] is not None:
+            indices = [x["index"] for x in job["tasks"]]
+            env.update(
+                {
+                    "SLURM_ARRAY_JOB_ID": job["job_id"],
+                    "SLURM_ARRAY_TASK_ID": str(task["index"]),
+                    "SLURM_ARRAY_TASK_COUNT": str(len(indices)),
+                    "SLURM_ARRAY_TASK_MIN": str(min(indices)),
+                    "SLURM_ARRAY_TASK_MAX": str(max(indices)),
+                }
+            )
+
+        output_path = _path(job["output"])
+        error_path = _path(job["error"])
+
+        stdout = open(output_path, "w")
+        stderr = stdout if error_path == output_path else open(error_path, "w")
+
+        try:
+            process = Popen(
+                ["bash", job["script"]] + job["args"],
+                cwd=job["cwd"],
+                env=env,
+                stdin=DEVNULL,
+                stdout=stdout,
+                stderr=stderr,
+                start_new_session=True,
+            )
+        except OSError:
+            self._finish(task, "FAILED", now)
+            return
+        finally:
+            stdout.close()
+            stderr.close()
+
+        self.processes[process.pid] = process
+        task.update(
+            {
+                "state": RUNNING,
+                "reason": "None",
+                "node": node,
+                "pid": process.pid,
+                "start": now,
+            }
+        )
+
+    def _reap(self, state, now):
+        for _, task in _tasks(state):
+            if task["state"] != RUNNING or task["pid"] not in self.processes:
+                continue
+
+            try:
+                pid, status, usage = os.wait4(task["pid"], os.WNOHANG)
+            except ChildProcessError:
+                self.processes.pop(task["pid"])
+                self._finish(task, "NODE_FAIL", now)
+                continue
+
+            if pid == 0:
+                continue
+
+            process = self.processes.pop(task["pid"])
+            code = os.waitstatus_to_exitcode(status)
+            process.returncode = code
+
+            task["cpu_seconds"] = usage.ru_utime + usage.ru_stime
+            # ru_maxrss is in kilobytes on Linux.
+            task["max_rss"] = usage.ru_maxrss * 1024
+            task["exit_code"] = max(code, 0)
+            task["signal"] = max(-code, 0)
+
+            if task["cancel"]:
+                self._finish(task, "CANCELLED", now)
+            elif task["timed_out"]:
+                self._finish(task, "TIMEOUT", now)
+            elif code == 0:
+                self._finish(task, "COMPLETED", now)
+            else:
+                self._finish(task, "FAILED", now)
+
+    @staticmethod
+    def _signal(task, signum):
+        try:
+            os.killpg(task["pid"], signum)
+        except OSError:
+            pass
+
+    def _kill_all(self, state):
+        for _, task in _tasks(state):
+            if task["state"] == RUNNING:
+                task["cancel"] = True
+                self._signal(task, signal.SIGKILL)
+
+        while self.processes:
+            self._reap(state, time())
+            sleep(0.01)
+
+        for _, task in _tasks(state):
+            if task["state"] == PENDING:
+                self._finish(task, "CANCELLED", time())
+
+    @staticmethod
+    def _finish(task, end_state, now):
+        task["state"] = end_state
+        task["end"] = now
+        if task["start"] is None:
+            task["start"] = now
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}-{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def _squeue_time(seconds):
+    # squeue drops leading zero fields, e.g. '0:05' or '1:02:03'.
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}-{hours:02d}:{minutes:02d}:{seconds:02d}"
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def _cpu_time(seconds):
+    # sacct writes CPU times under an hour w/milliseconds.
+    if seconds >= 3600:
+        return _duration(seconds)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:06.3f}"
+
+
+def _requested_memory(size):
+    if size % 2**30 == 0:
+        return f"{size // 2**30}G"
+    return f"{-(-size // 2**20)}M"
+
+
+def _timestamp(seconds):
+    if seconds is None:
+        return "Unknown"
+    return datetime.fromtimestamp(seconds).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _select(state, job_ids):
+    if not job_ids:
+        return list(_tasks(state))
+
+    selected = []
+    seen = set()
+    for job_id in job_ids:
+        for job, task in _find(state, job_id) or []:
+            if task["id"] not in seen:
+                seen.add(task["id"])
+                selected.append((job, task))
+
+    return selected
+
+
+def squeue(argv):
+    """
+    Reports the state of queued jobs.
+    :param argv: squeue's arguments.
+    :return: squeue's output.
+    """
+    parser = argparse.ArgumentParser(prog="squeue", add_help=False)
+    parser.add_argument("-j", "--jobs")
+    parser.add_argument("-t", "--states")
+    parser.add_argument("-o", "--format", default=SQUEUE_DEFAULT_FORMAT)
+    parser.add_argument("-h", "--noheader", action="store_true")
+    parser.add_argument("-n", "--name")
+    parser.add_argument("-u", "--user")
+    parser.add_argument("-r", "--array", action="store_true")
+    args = parser.parse_args(argv)
+
+    state_dir = _state_dir()
+    with _locked(state_dir):
+        state = _load_state(state_dir)
+
+    job_ids = args.jobs.split(",") if args.jobs else []
+    selected = _select(state, job_ids)
+
+    if job_ids and not selected:
+        raise EmulatorError("slurm_load_jobs error: Invalid job id specified")
+
+    if args.states is None:
+        states = ACTIVE_STATES
+    elif args.states.lower() == "all":
+        states = list(COMPACT_STATES)
+    else:
+        full_names = {v: k for k, v in COMPACT_STATES.items()}
+        states = [full_names.get(x, x) for x in args.states.upper().split(",")]
+
+    fields = re.findall(r"%(\.?)(\d*)([a-zA-Z])|([^%]+)", args.format)
+
+    def _render(values):
+        line = []
+        for right, width, letter, literal in fields:
+            if literal:
+                line.append(literal)
+                continue
+            value = values[letter]
+            if width:
+                value = value[: int(width)]
+                value = value.rjust(int(width)) if right else value.ljust(int(width))
+            line.append(value)
+        return "".join(line).rstrip()
+
+    lines = []
+    if not args.noheader:
+        lines.append(_render(SQUEUE_FIELDS))
+
+    now = time()
+    for job, task in selected:
+        if task["state"] not in states:
+            continue
+        if args.name and job["name"] != args.name:
+            continue
+
+        if task["state"] == PENDING:
+            elapsed = 0
+        else:
+            elapsed = (task["end"] or now) - task["start"]
+
+        reason = task["reason"] if task["state"] == PENDING else "None"
+        node = task["node"] or ""
+        time_limit = job["time_limit"]
+
+        lines.append(
+            _render(
+                {
+                    "i": _task_name(job, task),
+                    "A": task["id"],
+                    "F": job["job_id"],
+                    "K": "N/A" if task["index"] is None else str(task["index"]),
+                    "j": job["name"],
+                    "T": task["state"],
+                    "t": COMPACT_STATES.get(task["state"], task["state"]),
+                    "M": _squeue_time(elapsed),
+                    "l": "UNLIMITED"
+                    if time_limit is None
+                    else _squeue_time(time_limit),
+                    "N": node,
+                    "R": f"({reason})" if task["state"] == PENDING else node,
+                    "r": reason,
+                    "C": str(job["cpus"]),
+                    "D": "1",
+                    "P": job["partition"],
+                    "u": job["env"].get("USER", "user"),
+                }
+            )
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def sacct(argv):
+    """
+    Reports the resources accounted to jobs and their batch steps.
+    :param argv: sacct's arguments.
+    :return: sacct's output.
+    """
+    parser = argparse.ArgumentParser(prog="sacct", add_help=False)
+    parser.add_argument("-j", "--jobs")
+    parser.add_argument("-o", "--format", default=SACCT_DEFAULT_FORMAT)
+    parser.add_argument("-P", "--parsable2", action="store_true")
+    parser.add_argument("-p", "--parsable", action="store_true")
+    parser.add_argument("-n", "--noheader", action="store_true")
+    parser.add_argument("-X", "--allocations", action="store_true")
+    args = parser.parse_args(argv)
+
+    state_dir = _state_dir()
+    with _locked(state_dir):
+        state = _load_state(state_dir)
+
+    fields = [x.split("%")[0] for x in args.format.split(",")]
+    job_ids = args.jobs.split(",") if args.jobs else []
+    now = time()
+
+    rows = []
+    for job, task in _select(state, job_ids):
+        name = _task_name(job, task)
+        started = task["state"] != PENDING
+        elapsed = (task["end"] or now) - task["start"] if started else 0
+        cpu = task["cpu_seconds"] or 0
+
+        values = {
+            "JobID": name,
+            "JobIDRaw": task["id"],
+            "JobName": job["name"],
+            "Partition": job["partition"],
+            "State": task["state"],
+            "Elapsed": _duration(elapsed),
+            "TotalCPU": _cpu_time(cpu),
+            "AllocCPUS": str(job["cpus"]) if started else "0",
+            "MaxRSS": "",
+            "ReqMem": _requested_memory(job["memory"]),
+            "NodeList": task["node"] or "None assigned",
+            "ExitCode": f"{task['exit_code'] or 0}:{task['signal']}",
+            "Submit": _timestamp(job["submit"]),
+            "Start": _timestamp(task["start"]),
+            "End": _timestamp(task["end"]),
+            "Timelimit": (
+                "UNLIMITED"
+                if job["time_limit"] is None
+                else _duration(job["time_limit"])
+            ),
+        }
+
+        rows.append(values)
+
+        # the batch step reports the memory the script used.
+        if started and not args.allocations:
+            step_state = task["state"]
+            if step_state in ("TIMEOUT", "CANCELLED"):
+                step_state = "CANCELLED"
+
+            rows.append(
+                dict(
+                    values,
+                    JobID=f"{name}.batch",
+                    JobIDRaw=f"{task['id']}.batch",
+                    JobName="batch",
+                    Partition="",
+                    State=step_state,
+                    MaxRSS=""
+                    if task["max_rss"] is None
+                    else f"{task['max_rss'] // 1024}K",
+                    ReqMem="",
+                    Timelimit="",
+                )
+            )
+
+    for field in fields:
+        if rows and field not in rows[0]:
+            raise EmulatorError(f"unsupported field '{field}'")
+
+    lines = []
+
+    if args.parsable2 or args.parsable:
+        end = "|" if args.parsable else ""
+        if not args.noheader:
+            lines.append("|".join(fields) + end)
+        for row in rows:
+            lines.append("|".join(row[x] for x in fields) + end)
+    else:
+        if not args.noheader:
+            lines.append(" ".join(f"{x[:10]:>10}" for x in fields))
+            lines.append(" ".join("-" * 10 for _ in fields))
+        for row in rows:
+            lines.append(" ".join(f"{row[x][:10]:>10}" for x in fields))
+
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def scancel(argv):
+    """
+    Cancels jobs or array tasks.
+    :param argv: The job-ids to cancel.
+    :return: None
+    """
+    state_dir = _state_dir()
+
+    with _locked(state_dir):
+        state = _load_state(state_dir)
+
+        for job_id in argv:
+            tasks = _find(state, job_id)
+            if tasks is None:
+                raise EmulatorError(f"Invalid job id {job_id}")
+
+            for _, task in tasks:
+                if task["state"] == PENDING:
+                    Scheduler._finish(task, "CANCELLED", time())
+                elif task["state"] == RUNNING:
+                    # the daemon signals the task on its next pass.
+                    task["cancel"] = True
+
+        _save_state(state_dir, state)
+
+
+def scontrol(argv):
+    """
+    Supports 'scontrol shutdown', which stops the daemon and every task.
+    :param argv: scontrol's arguments.
+    :return: None
+    """
+    if argv != ["shutdown"]:
+        raise EmulatorError("only 'scontrol shutdown' is supported")
+
+    state_dir = _state_dir()
+    pid_path = join(state_dir, "slurmctld.pid")
+
+    if not exists(pid_path):
+        return
+
+    with open(pid_path) as f:
+        pid = int(f.read())
+
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        os.remove(pid_path)
+        return
+
+    for _ in range(1000):
+        if not exists(pid_path):
+            return
+        sleep(0.01)
+
+    raise EmulatorError("the emulator's daemon did not stop")
+
+
+def main(argv):
+    command, argv = argv[0], argv[1:]
+
+    if command == "install":
+        parser = argparse.ArgumentParser(prog="slurm_emulator.py install")
+        parser.add_argument("--bin-dir", required=True)
+        parser.add_argument("--state-dir", required=True)
+        for key, value in DEFAULT_CONFIG.items():
+            parser.add_argument(f"--{key.replace('_', '-')}", type=type(value))
+        args = vars(parser.parse_args(argv))
+        bin_dir, state_dir = args.pop("bin_dir"), args.pop("state_dir")
+        install(bin_dir, state_dir, **{k: v for k, v in args.items() if v})
+        print(f"export PATH={abspath(bin_dir)}:$PATH")
+        return 0
+
+    try:
+        if command == "sbatch":
+            job_id, parsable = sbatch(argv, os.getcwd(), os.environ)
+            print(job_id if parsable else f"Submitted batch job {job_id}")
+        elif command == "squeue":
+            sys.stdout.write(squeue(argv))
+        elif command == "sacct":
+            sys.stdout.write(sacct(argv))
+        elif command == "scancel":
+            scancel(argv)
+        elif command == "scontrol":
+            scontrol(argv)
+        elif command == "slurmctld":
+            Scheduler(_state_dir()).run()
+        else:
+            raise EmulatorError(f"unknown command '{command}'")
+    except (EmulatorError, OSError) as e:
+        print(f"{command}: error: {e}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -165,7 +165,8 @@ function demux-runner () {
             --infile <(cat ${seqs_r1} ${seqs_r2}) \
             --output ${OUTPUT} \
             --task ${idx} \
-            --maxtask ${n_demux_jobs} &
+            --maxtask ${n_demux_jobs} \
+            --manifest ${OUTPUT}/logs/demux_manifests/${SLURM_ARRAY_TASK_ID}.${idx}.tsv &
     done
     wait
 }
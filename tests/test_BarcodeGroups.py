@@ -0,0 +1,185 @@
+import gzip
+import io
+import unittest
+from importlib.util import module_from_spec, spec_from_file_location
+from os.path import join
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from sequence_processing_pipeline.BarcodeGroups import BarcodeGroups
+
+
+def load_integrate():
+    # integrate-indices-np.py is a script rather than a module.
+    spec = spec_from_file_location(
+        "integrate_indices_np",
+        join(
+            "src", "sequence_processing_pipeline", "contrib", "integrate-indices-np.py"
+        ),
+    )
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestBarcodeGroups(unittest.TestCase):
+    def setUp(self):
+        self.integrate = load_integrate()
+
+        read_ids = ["foo", "bar", "baz", "oof", "rab"]
+        barcodes = ["ATGC", "TTGG", "ATGC", "TTTT", "TTGG"]
+
+        self.i1 = "".join(f"@{x}\n{b}\n+\n!!!!\n" for x, b in zip(read_ids, barcodes))
+        self.r1 = "".join(f"@{x}\nAAAAA\n+\n!!!!!\n" for x in read_ids)
+        self.r2 = "".join(f"@{x}\nCC\n+\n!!\n" for x in read_ids)
+
+    def write_groups(self, tmp, bgzf=False, i1=None, r1=None, r2=None):
+        i1 = self.i1 if i1 is None else i1
+        r1 = self.r1 if r1 is None else r1
+        r2 = self.r2 if r2 is None else r2
+
+        order, unique, bounds = self.integrate.gather_order(io.BytesIO(i1.encode()))
+
+        offsets = []
+        blocks = []
+        for name, data in (("r1", r1), ("r2", r2)):
+            out_path = join(tmp, f"{name}.fastq.gz")
+            if bgzf:
+                out_ = self.integrate.BgzfWriter(open(out_path, "wb"), threads=2)
+            else:
+                out_ = gzip.open(out_path, "wb")
+
+            offsets.append(
+                self.integrate.troll_and_write(
+                    order, unique, bounds, io.BytesIO(data.encode()), out_
+                )
+            )
+
+            if bgzf:
+                blocks.append(out_.close())
+            else:
+                out_.close()
+
+        groups_path = join(tmp, "groups.npz")
+        self.integrate.write_barcode_groups(
+            groups_path, unique, bounds, order.size, *offsets, *blocks
+        )
+
+        return groups_path
+
+    def test_barcode_groups(self):
+        with TemporaryDirectory() as tmp:
+            groups = BarcodeGroups(self.write_groups(tmp))
+
+            self.assertEqual(len(groups), 3)
+            obs = [(x.barcode, x.count, x.start, x.stop) for x in groups]
+            exp = [(b"ATGC", 2, 0, 2), (b"TTGG", 2, 2, 4), (b"TTTT", 1, 4, 5)]
+            self.assertListEqual(obs, exp)
+
+            self.assertIsNone(groups.get("GGGG"))
+            self.assertEqual(groups.get("TTGG"), groups.get(b"TTGG"))
+
+            obs = groups.read_group(join(tmp, "r1.fastq.gz"), "TTGG")
+            exp = (
+                b"@bar BX:Z:TTGG-1\nAAAAA\n+\n!!!!!\n"
+                b"@rab BX:Z:TTGG-1\nAAAAA\n+\n!!!!!\n"
+            )
+            self.assertEqual(obs, exp)
+
+            obs = groups.read_group(join(tmp, "r2.fastq.gz"), "TTTT", "R2")
+            self.assertEqual(obs, b"@oof BX:Z:TTTT-1\nCC\n+\n!!\n")
+
+            self.assertEqual(groups.read_group(join(tmp, "r1.fastq.gz"), "GGGG"), b"")
+
+            with self.assertRaisesRegex(ValueError, "not a valid orientation"):
+                groups.read_group(join(tmp, "r1.fastq.gz"), "TTTT", "I1")
+
+    def test_barcode_groups_bgzf(self):
+        # enough records that groups span several BGZF blocks.
+        rng = np.random.default_rng(7)
+        barcodes = ["".join(rng.choice(list("ACGT"), 6)) for _ in range(400)]
+        barcodes = [barcodes[x] for x in rng.integers(0, 400, 20000)]
+        read_ids = [f"r{i}" for i in range(len(barcodes))]
+
+        i1 = "".join(f"@{x}\n{b}\n+\n!!!!!!\n" for x, b in zip(read_ids, barcodes))
+        r1 = "".join(f"@{x}\n{'A' * 50}\n+\n{'!' * 50}\n" for x in read_ids)
+        r2 = "".join(f"@{x}\n{'C' * 50}\n+\n{'!' * 50}\n" for x in read_ids)
+
+        with TemporaryDirectory() as tmp:
+            groups = BarcodeGroups(self.write_groups(tmp, True, i1, r1, r2))
+            self.assertTrue(groups.is_bgzf)
+
+            r1_path = join(tmp, "r1.fastq.gz")
+            with gzip.open(r1_path, "rb") as f:
+                exp_r1 = f.read()
+            self.assertGreater(len(exp_r1), 4 * self.integrate.BGZF_BLOCK_SIZE)
+
+            for group in groups:
+                obs = groups.read_group(r1_path, group.barcode)
+                start, stop = group.r1_range
+                self.assertEqual(obs, exp_r1[start:stop])
+                self.assertEqual(obs.count(b"\n"), 4 * group.count)
+
+            shards = groups.shards(4)
+            self.assertEqual(shards[0][0], 0)
+            self.assertEqual(shards[-1][1], len(groups))
+            for (_, a), (b, _) in zip(shards[:-1], shards[1:]):
+                self.assertEqual(a, b)
+
+            obs = b"".join(groups.read_range(r1_path, a, b) for a, b in shards)
+            self.assertEqual(obs, exp_r1)
+
+            obs = b"".join(
+                groups.read_range(join(tmp, "r2.fastq.gz"), a, b, "R2")
+                for a, b in shards
+            )
+            with gzip.open(join(tmp, "r2.fastq.gz"), "rb") as f:
+                self.assertEqual(obs, f.read())
+
+            # shards hold similar numbers of records.
+            sizes = [int(groups.counts[a:b].sum()) for a, b in shards]
+            self.assertLess(max(sizes) - min(sizes), 2 * int(groups.counts.max()))
+
+    def test_shards(self):
+        with TemporaryDirectory() as tmp:
+            groups = BarcodeGroups(self.write_groups(tmp))
+            self.assertFalse(groups.is_bgzf)
+
+            self.assertListEqual(groups.shards(1), [(0, 3)])
+            self.assertListEqual(groups.shards(10), [(0, 1), (1, 2), (2, 3)])
+
+            obs = groups.read_range(join(tmp, "r2.fastq.gz"), 1, 3, "R2")
+            exp = (
+                b"@bar BX:Z:TTGG-1\nCC\n+\n!!\n@rab BX:Z:TTGG-1\nCC\n+\n!!\n"
+                b"@oof BX:Z:TTTT-1\nCC\n+\n!!\n"
+            )
+            self.assertEqual(obs, exp)
+
+            self.assertEqual(groups.read_range(join(tmp, "r1.fastq.gz"), 2, 2), b"")
+
+            with self.assertRaisesRegex(ValueError, "at least 1"):
+                groups.shards(0)
+
+            with self.assertRaisesRegex(ValueError, "not a valid range"):
+                groups.read_range(join(tmp, "r1.fastq.gz"), 2, 4)
+
+    def test_invalid_file(self):
+        with TemporaryDirectory() as tmp:
+            groups_path = join(tmp, "groups.npz")
+            with open(groups_path, "wb") as f:
+                np.savez(
+                    f,
+                    barcodes=np.array([b"ATGC"]),
+                    counts=np.array([1]),
+                    starts=np.array([0]),
+                    r1_offsets=np.array([0]),
+                    r2_offsets=np.array([0]),
+                )
+
+            with self.assertRaisesRegex(ValueError, "not a valid barcode groups"):
+                BarcodeGroups(groups_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from os import makedirs, remove, utime
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from sequence_processing_pipeline.CountCatalog import CountCatalog
+
+
+class TestCountCatalog(TestCase):
+    def setUp(self):
+        self.root = mkdtemp()
+        makedirs(join(self.root, "Project_1"))
+        self.fastq_path = join(self.root, "Project_1", "sample1_R1.fastq")
+        self.write_fastq(self.fastq_path, ["ACGT", "ACGTAC"])
+        self.catalog = CountCatalog(join(self.root, CountCatalog.FILE_NAME))
+
+    def tearDown(self):
+        rmtree(self.root)
+
+    def write_fastq(self, fastq_path, seqs):
+        with open(fastq_path, "w") as f:
+            for i, seq in enumerate(seqs):
+                f.write(f"@read{i}\n{seq}\n+\n{'I' * len(seq)}\n")
+
+    def test_get_put(self):
+        self.assertIsNone(self.catalog.get(self.fastq_path))
+
+        self.catalog.put(self.fastq_path, 2, 10, histogram={"4": 1, "6": 1})
+        exp = {"records": 2, "bases": 10, "histogram": {"4": 1, "6": 1}}
+        self.assertDictEqual(self.catalog.get(self.fastq_path), exp)
+
+        # entries persist across instances.
+        catalog = CountCatalog(self.catalog.db_path)
+        self.assertDictEqual(catalog.get(self.fastq_path), exp)
+
+        # bases and histogram are optional.
+        catalog.put(self.fastq_path, 3)
+        exp = {"records": 3, "bases": None, "histogram": None}
+        self.assertDictEqual(catalog.get(self.fastq_path), exp)
+
+    def test_invalidation(self):
+        self.catalog.put(self.fastq_path, 2, 10)
+
+        # a file modified after it was catalogued isn't returned.
+        utime(self.fastq_path, ns=(0, 0))
+        self.assertIsNone(self.catalog.get(self.fastq_path))
+
+        self.catalog.put(self.fastq_path, 2, 10)
+        self.assertIsNotNone(self.catalog.get(self.fastq_path))
+
+        self.write_fastq(self.fastq_path, ["ACGT"])
+        self.assertIsNone(self.catalog.get(self.fastq_path))
+
+    def test_missing_files(self):
+        missing_path = join(self.root, "does_not_exist.fastq")
+
+        self.catalog.put_many([(self.fastq_path, 2, 10), (missing_path, 1, 1)])
+
+        obs = self.catalog.get_many([self.fastq_path, missing_path])
+        self.assertListEqual(list(obs), [self.fastq_path])
+
+        remove(self.fastq_path)
+        self.assertDictEqual(self.catalog.get_many([self.fastq_path]), {})
+
+    def test_count(self):
+        exp = {"records": 2, "bases": 10, "histogram": None}
+        self.assertDictEqual(self.catalog.count(self.fastq_path), exp)
+        self.assertDictEqual(self.catalog.get(self.fastq_path), exp)
+
+        # catalogued counts are returned w/out reading the file again.
+        self.catalog.put(self.fastq_path, 5, 20)
+        obs = self.catalog.count(self.fastq_path)
+        self.assertEqual(obs["records"], 5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import pandas as pd
+
+from sequence_processing_pipeline.EfficiencyReport import EfficiencyReport
+from sequence_processing_pipeline.Job import Job
+from sequence_processing_pipeline.PipelineError import ExecFailedError
+
+
+class TestEfficiencyReport(TestCase):
+    def setUp(self):
+        # recorded from 'sacct -j 1234567 --parsable2 --noheader --format
+        # JobID,State,Elapsed,TotalCPU,AllocCPUS,MaxRSS,ReqMem,NodeList'.
+        with open(join("tests", "data", "sacct_array_job.txt")) as f:
+            self.sacct_output = f.read()
+
+        self.output_path = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.output_path)
+
+    def test_from_sacct(self):
+        report = EfficiencyReport.from_sacct("1234567", self.sacct_output)
+        tasks = report.tasks
+
+        self.assertListEqual(list(tasks.columns), EfficiencyReport.COLUMNS)
+        self.assertListEqual(
+            list(tasks["task_id"]), [f"1234567_{i}" for i in range(1, 7)]
+        )
+        self.assertListEqual(list(tasks["array_index"]), list(range(1, 7)))
+
+        first = tasks.iloc[0]
+        self.assertEqual(first["state"], "COMPLETED")
+        self.assertEqual(first["node_list"], "node-01")
+        self.assertEqual(first["elapsed_seconds"], 2472)
+        self.assertEqual(first["cpu_seconds"], 29679)
+        self.assertEqual(first["alloc_cpus"], 16)
+        self.assertEqual(first["max_rss_bytes"], 41234567 * 1024)
+        self.assertEqual(first["req_mem_bytes"], 60 * 2**30)
+        self.assertAlmostEqual(first["cpu_efficiency"], 29679 / (2472 * 16))
+        self.assertAlmostEqual(
+            first["memory_headroom"], 1 - 41234567 * 1024 / (60 * 2**30)
+        )
+
+        oom = tasks.iloc[5]
+        self.assertEqual(oom["state"], "OUT_OF_MEMORY")
+        self.assertAlmostEqual(oom["memory_used"], 1.0)
+
+        self.assertListEqual(list(report.stragglers["task_id"]), ["1234567_4"])
+
+        self.assertDictEqual(
+            report.usage(),
+            {
+                "cpu_seconds": 160359.0,
+                "max_rss_bytes": float(60 * 2**30),
+                "max_task_seconds": 7544.0,
+            },
+        )
+
+    def test_summary(self):
+        report = EfficiencyReport.from_sacct("1234567", self.sacct_output)
+
+        exp = (
+            "job 1234567: 6 task(s) (COMPLETED: 5, OUT_OF_MEMORY: 1)\n"
+            "elapsed: median 0:40:51, max 2:05:44\n"
+            "CPU efficiency: mean 68%, min 27%\n"
+            "memory used: max 100% of requested, median 67%\n"
+            "1 straggler(s):\n"
+            "  1234567_4 on node-07: 2:05:44"
+        )
+        self.assertEqual(report.summary(), exp)
+
+        empty = EfficiencyReport.from_sacct("1", "")
+        self.assertTrue(empty.tasks.empty)
+        self.assertEqual(empty.summary(), "job 1: sacct reported no tasks")
+        self.assertDictEqual(
+            empty.usage(),
+            {"cpu_seconds": None, "max_rss_bytes": None, "max_task_seconds": None},
+        )
+
+    def test_per_cpu_memory(self):
+        # older versions of Slurm report ReqMem per CPU w/a 'c' suffix.
+        output = (
+            "42|COMPLETED|00:10:00|00:20:00|4||4000Mc|node-01\n"
+            "42.batch|COMPLETED|00:10:00|00:20:00|4|8000M|4000Mc|node-01\n"
+        )
+        report = EfficiencyReport.from_sacct("42", output)
+
+        task = report.tasks.iloc[0]
+        self.assertTrue(pd.isna(task["array_index"]))
+        self.assertEqual(task["req_mem_bytes"], 16000 * 2**20)
+        self.assertAlmostEqual(task["memory_used"], 0.5)
+        self.assertAlmostEqual(task["cpu_efficiency"], 0.5)
+        self.assertFalse(task["straggler"])
+
+    def test_job_report_efficiency(self):
+        job = Job(self.output_path, self.output_path, "MyJob", [], 1)
+        job.collect_efficiency_report = True
+
+        with patch.object(Job, "_system_call") as system_call:
+            system_call.return_value = {"stdout": self.sacct_output}
+            report = job._report_efficiency("1234567")
+
+        system_call.assert_called_once_with(EfficiencyReport.sacct_command("1234567"))
+        self.assertEqual(len(report.tasks), 6)
+
+        report_path = join(job.output_path, "MyJob_1234567_efficiency.csv")
+        obs = pd.read_csv(report_path)
+        self.assertListEqual(list(obs.columns), EfficiencyReport.COLUMNS)
+        self.assertListEqual(list(obs["straggler"]), [False] * 3 + [True] + [False] * 2)
+
+        # a missing sacct isn't fatal.
+        with patch.object(Job, "_system_call") as system_call:
+            system_call.side_effect = ExecFailedError("sacct: command not found")
+            self.assertIsNone(job._report_efficiency("7654321"))
+
+        self.assertFalse(exists(join(job.output_path, "MyJob_7654321_efficiency.csv")))
+
+        # nor is a report that can't be written.
+        write_csv = patch.object(
+            EfficiencyReport, "write_csv", side_effect=OSError("disk full")
+        )
+
+        with patch.object(Job, "_system_call") as system_call, write_csv:
+            system_call.return_value = {"stdout": self.sacct_output}
+            report = job._report_efficiency("1234567")
+
+        self.assertEqual(len(report.tasks), 6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import gzip
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from click.testing import CliRunner
+
+from sequence_processing_pipeline.FastqCounter import (
+    count_fastq,
+    count_seqs,
+    pack_by_size,
+    read_counts,
+    write_counts,
+)
+
+
+class TestFastqCounter(unittest.TestCase):
+    def setUp(self):
+        self.records = [
+            "@r1 BX:Z:TATGACACATGCGGCCCT",
+            "ATGCATGC",
+            "+",
+            "!!!!!!!!",
+            "@r2",
+            "",
+            "+",
+            "",
+            "@r3",
+            "ATG",
+            "+",
+            "!!!",
+        ]
+
+    def test_count_fastq(self):
+        with TemporaryDirectory() as tmp:
+            plain_fp = join(tmp, "a_R1_001.fastq")
+            with open(plain_fp, "w") as f:
+                f.write("\n".join(self.records) + "\n")
+
+            gz_fp = join(tmp, "a_R2_001.fastq.gz")
+            with gzip.open(gz_fp, "wt") as f:
+                # no newline after the last record.
+                f.write("\n".join(self.records))
+
+            empty_fp = join(tmp, "empty.fastq.gz")
+            with gzip.open(empty_fp, "wt") as f:
+                pass
+
+            # small chunks test records that span chunks.
+            for chunk_size in [1, 3, 7, 2**24]:
+                self.assertEqual(count_fastq(plain_fp, chunk_size=chunk_size), (3, 11))
+                self.assertEqual(count_fastq(gz_fp, chunk_size=chunk_size), (3, 11))
+
+            self.assertEqual(count_fastq(empty_fp), (0, 0))
+
+            truncated_fp = join(tmp, "truncated.fastq")
+            with open(truncated_fp, "w") as f:
+                f.write("\n".join(self.records[:6]) + "\n")
+
+            with self.assertRaisesRegex(ValueError, "truncated record"):
+                count_fastq(truncated_fp)
+
+    def test_pack_by_size(self):
+        with TemporaryDirectory() as tmp:
+            sizes = {"a": 100, "b": 60, "c": 50, "d": 30, "e": 20}
+            for name, size in sizes.items():
+                with open(join(tmp, name), "w") as f:
+                    f.write("x" * size)
+
+            obs = pack_by_size([join(tmp, x) for x in sizes], 2)
+            exp = [
+                [join(tmp, "a"), join(tmp, "d")],
+                [join(tmp, "b"), join(tmp, "c"), join(tmp, "e")],
+            ]
+            self.assertEqual(obs, exp)
+
+            # missing files are spread across bins and empty bins dropped.
+            obs = pack_by_size(["/does/not/exist/a", "/does/not/exist/b"], 4)
+            self.assertEqual(obs, [["/does/not/exist/a"], ["/does/not/exist/b"]])
+
+    def test_write_counts(self):
+        with TemporaryDirectory() as tmp:
+            fastq_fp = join(tmp, "a_R1_001.fastq.gz")
+            with gzip.open(fastq_fp, "wt") as f:
+                f.write("\n".join(self.records) + "\n")
+
+            file_list = join(tmp, "batch-1")
+            with open(file_list, "w") as f:
+                f.write(f"{fastq_fp}\n\n")
+
+            counts_fp = join(tmp, "counts", "counts-1.tsv")
+            result = CliRunner().invoke(
+                count_seqs,
+                ["--file-list", file_list, "--output", counts_fp, "--threads", "2"],
+            )
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+
+            obs = read_counts([counts_fp])
+            exp = {"a_R1_001.fastq.gz": {"seq_counts": 3, "base_pairs": 11}}
+            self.assertEqual(obs, exp)
+
+            with self.assertRaises(FileNotFoundError):
+                write_counts([join(tmp, "missing.fastq.gz")], counts_fp)
+
+            # the previous results are left intact.
+            self.assertEqual(read_counts([counts_fp]), exp)
+
+            with self.assertRaisesRegex(ValueError, "is not a counts file"):
+                read_counts([file_list])
+
+
+if __name__ == "__main__":
+    unittest.main()
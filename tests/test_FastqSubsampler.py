@@ -0,0 +1,157 @@
+import gzip
+import unittest
+from os import listdir
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from sequence_processing_pipeline.FastqSubsampler import (
+    select_records,
+    subsample_files,
+    subsample_in_place,
+)
+
+
+class TestFastqSubsampler(unittest.TestCase):
+    def write_fastq(self, fastq_path, read_ids, suffix=""):
+        with gzip.open(fastq_path, "wt") as f:
+            for read_id in read_ids:
+                f.write(f"@{read_id}{suffix} BX:Z:TATG\nACGT\n+\nIIII\n")
+
+    def read_ids(self, fastq_path):
+        with gzip.open(fastq_path, "rt") as f:
+            return [x.split()[0] for x in f.readlines()[::4]]
+
+    def test_select_records(self):
+        for total, target, block_size in [(10, 3, 4), (1000, 999, 7), (5, 10, 2)]:
+            obs = list(select_records(total, target, 42, block_size=block_size))
+
+            self.assertEqual(sum(n for n, _ in obs), total)
+            self.assertEqual(sum(len(x) for _, x in obs), min(total, target))
+            for n, selected in obs:
+                self.assertTrue(all(0 <= x < n for x in selected))
+                self.assertListEqual(list(selected), sorted(set(selected)))
+
+        # the same seed always selects the same records.
+        obs = [list(x) for _, x in select_records(1000, 10, 42, block_size=64)]
+        exp = [list(x) for _, x in select_records(1000, 10, 42, block_size=64)]
+        self.assertListEqual(obs, exp)
+
+        self.assertListEqual(list(select_records(0, 10, 42)), [])
+
+    def test_subsample_files(self):
+        with TemporaryDirectory() as tmp:
+            read_ids = [f"read{i}" for i in range(500)]
+            inputs = [join(tmp, f"s1_{x}.full.gz") for x in ("R1", "R2", "I1")]
+            self.write_fastq(inputs[0], read_ids, "/1")
+            self.write_fastq(inputs[1], read_ids, "/2")
+            self.write_fastq(inputs[2], read_ids)
+
+            outputs = [join(tmp, f"s1_{x}.fastq.gz") for x in ("R1", "R2", "I1")]
+            self.assertEqual(subsample_files(inputs, outputs, 100), 100)
+
+            # mates are selected together.
+            r1_ids = self.read_ids(outputs[0])
+            self.assertEqual(len(r1_ids), 100)
+            self.assertListEqual(
+                self.read_ids(outputs[1]), [x[:-1] + "2" for x in r1_ids]
+            )
+            self.assertListEqual(self.read_ids(outputs[2]), [x[:-2] for x in r1_ids])
+
+            # output is identical for a given seed, regardless of threads.
+            with open(outputs[0], "rb") as f:
+                exp = f.read()
+            subsample_files(inputs, outputs, 100, total=500, threads=4)
+            with open(outputs[0], "rb") as f:
+                self.assertEqual(f.read(), exp)
+
+            subsample_files(inputs, outputs, 100, seed=7)
+            with open(outputs[0], "rb") as f:
+                self.assertNotEqual(f.read(), exp)
+
+    def test_subsample_files_early_stop(self):
+        with TemporaryDirectory() as tmp:
+            r1 = join(tmp, "s1_R1.full.gz")
+            output = join(tmp, "s1_R1.fastq.gz")
+            self.write_fastq(r1, [f"read{i}" for i in range(100)])
+
+            # the same records are selected w/or w/out stopping early.
+            subsample_files([r1], [output], 10, total=100)
+            exp = self.read_ids(output)
+            subsample_files([r1], [output], 10, total=100, early_stop=True)
+            self.assertListEqual(self.read_ids(output), exp)
+
+            # records past the last selected one are not read, so a total
+            # that is too small isn't detected.
+            with self.assertRaisesRegex(ValueError, "more than 90 records"):
+                subsample_files([r1], [output], 90, total=90)
+            self.assertEqual(
+                subsample_files([r1], [output], 10, total=90, early_stop=True), 10
+            )
+
+    def test_subsample_files_errors(self):
+        with TemporaryDirectory() as tmp:
+            r1 = join(tmp, "s1_R1.full.gz")
+            r2 = join(tmp, "s1_R2.full.gz")
+            self.write_fastq(r1, [f"read{i}" for i in range(10)])
+            self.write_fastq(r2, [f"read{i}" for i in range(9)])
+            outputs = [join(tmp, "s1_R1.fastq.gz"), join(tmp, "s1_R2.fastq.gz")]
+
+            with self.assertRaisesRegex(ValueError, "fewer than 10 records"):
+                subsample_files([r1, r2], outputs, 5)
+
+            with self.assertRaisesRegex(ValueError, "more than 9 records"):
+                subsample_files([r2, r1], outputs, 5)
+
+            self.write_fastq(r2, [f"read{i}" for i in reversed(range(10))])
+            with self.assertRaisesRegex(ValueError, "Mates are out of order"):
+                subsample_files([r1, r2], outputs, 5)
+
+            # partial results are removed.
+            self.assertListEqual(
+                sorted(listdir(tmp)), ["s1_R1.full.gz", "s1_R2.full.gz"]
+            )
+
+            with self.assertRaisesRegex(ValueError, "an output path for each"):
+                subsample_files([r1, r2], outputs[:1], 5)
+
+    def test_subsample_in_place(self):
+        with TemporaryDirectory() as tmp:
+            r1 = join(tmp, "s1_R1.fastq.gz")
+            r2 = join(tmp, "s1_R2.fastq.gz")
+            self.write_fastq(r1, [f"read{i}" for i in range(10)], "/1")
+            self.write_fastq(r2, [f"read{i}" for i in range(10)], "/2")
+
+            self.assertEqual(subsample_in_place([r1, r2], 5, total=10), 5)
+            self.assertListEqual(
+                sorted(listdir(tmp)),
+                ["s1_R1.fastq.gz", "s1_R1.full.gz", "s1_R2.fastq.gz", "s1_R2.full.gz"],
+            )
+            self.assertEqual(len(self.read_ids(r1)), 5)
+            self.assertEqual(len(self.read_ids(join(tmp, "s1_R1.full.gz"))), 10)
+
+    def test_subsample_in_place_errors(self):
+        with TemporaryDirectory() as tmp:
+            r1 = join(tmp, "s1_R1.fastq.gz")
+            r2 = join(tmp, "s1_R2.fastq.gz")
+            self.write_fastq(r1, [f"read{i}" for i in range(10)])
+            self.write_fastq(r2, [f"read{i}" for i in range(10)])
+
+            with self.assertRaisesRegex(ValueError, "more than 8 records"):
+                subsample_in_place([r1, r2], 5, total=8)
+
+            # the original files are restored.
+            self.assertListEqual(
+                sorted(listdir(tmp)), ["s1_R1.fastq.gz", "s1_R2.fastq.gz"]
+            )
+            self.assertEqual(len(self.read_ids(r1)), 10)
+
+            # as are any renamed before a file was found to be missing.
+            with self.assertRaises(FileNotFoundError):
+                subsample_in_place([r1, join(tmp, "s2_R1.fastq.gz")], 5)
+            self.assertListEqual(
+                sorted(listdir(tmp)), ["s1_R1.fastq.gz", "s1_R2.fastq.gz"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
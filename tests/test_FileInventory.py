@@ -0,0 +1,157 @@
+from os import makedirs, remove, symlink, utime
+from os.path import dirname, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from sequence_processing_pipeline.FileInventory import FileInventory
+
+
+class TestFileInventory(TestCase):
+    def setUp(self):
+        self.root = mkdtemp()
+
+        self.files = [
+            "Project_1/filtered_sequences/sample1_S1_L001_R1_001.fastq.gz",
+            "Project_1/filtered_sequences/sample1_S1_L001_R2_001.fastq.gz",
+            "Project_1/zero_files/sample2_S2_L001_R1_001.fastq.gz",
+            "Project_1/fastp_reports_dir/html/sample1_S1_L001_R1_001.html",
+            "Project_2/sample3_S3_L001_I1_001.fastq.gz",
+            "Project_2/notes.txt",
+        ]
+
+        for some_file in self.files:
+            self.write_file(some_file)
+
+    def tearDown(self):
+        FileInventory.clear()
+        rmtree(self.root)
+
+    def write_file(self, some_file):
+        full_path = join(self.root, some_file)
+        makedirs(dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write("This is a dummy file.")
+
+    def test_files(self):
+        inventory = FileInventory.get(self.root)
+
+        obs = [x.path for x in inventory.files()]
+        exp = sorted([join(self.root, x) for x in self.files])
+        self.assertListEqual(obs, exp)
+
+        entry = inventory.files(orientation="I1")[0]
+        self.assertEqual(entry.name, "sample3_S3_L001_I1_001.fastq.gz")
+        self.assertEqual(entry.root, join(self.root, "Project_2"))
+        self.assertEqual(entry.size, len("This is a dummy file."))
+
+        obs = [x.name for x in inventory.files(suffix=".fastq.gz")]
+        self.assertEqual(len(obs), 4)
+
+        obs = inventory.files(
+            suffix=".fastq.gz", orientation=["R1", "R2"], exclude_dirs=["zero_files"]
+        )
+        self.assertListEqual(
+            [x.path for x in obs], [join(self.root, x) for x in self.files[:2]]
+        )
+
+        obs = inventory.files(include_dirs=["zero_files"])
+        self.assertListEqual([x.path for x in obs], [join(self.root, self.files[2])])
+
+        obs = inventory.files(under=join(self.root, "Project_2"))
+        self.assertListEqual(
+            [x.name for x in obs], ["notes.txt", "sample3_S3_L001_I1_001.fastq.gz"]
+        )
+
+        # 'under' matches whole directory names only.
+        self.assertListEqual(inventory.files(under=join(self.root, "Project")), [])
+
+    def test_directories(self):
+        # symlinked directories are not traversed, as w/os.walk().
+        symlink(join(self.root, "Project_1"), join(self.root, "Project_3"))
+
+        inventory = FileInventory.get(self.root)
+
+        self.assertListEqual(
+            inventory.directories(name="fastp_reports_dir"),
+            [join(self.root, "Project_1", "fastp_reports_dir")],
+        )
+
+        self.assertListEqual(
+            inventory.subdirectories(self.root),
+            [join(self.root, "Project_1"), join(self.root, "Project_2")],
+        )
+
+        self.assertEqual(len(inventory.files()), len(self.files))
+
+    def test_refresh(self):
+        inventory = FileInventory.get(self.root)
+        self.assertIs(FileInventory.get(self.root), inventory)
+
+        # backdate every directory so cached listings are considered settled.
+        for dir_path in inventory.directories():
+            utime(dir_path, ns=(0, 0))
+        inventory.refresh()
+        listings = dict(inventory._listings)
+
+        self.write_file("Project_2/sample4_S4_L001_R1_001.fastq.gz")
+        remove(join(self.root, self.files[0]))
+        rmtree(join(self.root, "Project_1", "zero_files"))
+
+        inventory.refresh()
+
+        obs = [x.name for x in inventory.files(suffix=".fastq.gz")]
+        self.assertListEqual(
+            obs,
+            [
+                "sample1_S1_L001_R2_001.fastq.gz",
+                "sample3_S3_L001_I1_001.fastq.gz",
+                "sample4_S4_L001_R1_001.fastq.gz",
+            ],
+        )
+
+        # unmodified directories are not listed again.
+        html_dir = join(self.root, "Project_1", "fastp_reports_dir", "html")
+        self.assertIs(inventory._listings[html_dir], listings[html_dir])
+        self.assertNotIn(
+            join(self.root, "Project_1", "zero_files"), inventory._listings
+        )
+
+    def test_lazy_stat(self):
+        inventory = FileInventory.get(self.root)
+
+        # files are not stat()ed until their size or mtime is requested.
+        entry = inventory.files(orientation="I1")[0]
+        self.assertIsNone(entry._stat)
+
+        with open(entry.path, "a") as f:
+            f.write("more")
+
+        self.assertEqual(entry.size, len("This is a dummy file.more"))
+        self.assertIsNotNone(entry._stat)
+
+    def test_max_inventories(self):
+        roots = [join(self.root, f"Project_{i}") for i in (1, 2)]
+
+        with patch.object(FileInventory, "MAX_INVENTORIES", 2):
+            first = FileInventory.get(self.root)
+            FileInventory.get(roots[0])
+
+            # requesting the first root again makes it the most recent.
+            self.assertIs(FileInventory.get(self.root), first)
+
+            FileInventory.get(roots[1])
+
+            self.assertListEqual(
+                list(FileInventory._inventories), [self.root, roots[1]]
+            )
+
+    def test_missing_root(self):
+        inventory = FileInventory.get(join(self.root, "does_not_exist"))
+        self.assertListEqual(inventory.files(), [])
+        self.assertListEqual(inventory.directories(), [])
+
+
+if __name__ == "__main__":
+    main()
@@ -60,7 +60,10 @@ class TestJob(unittest.TestCase):
             "ls " + join(package_root, "tests", "bin"), callback=my_callback
         )
 
-        exp = ["bcl-convert\nbcl2fastq\nfake_squeue.py\nfastqc\nsbatch\nsqueue\n"]
+        exp = [
+            "bcl-convert\nbcl2fastq\nfake_squeue.py\nfastqc\nsbatch\n"
+            "slurm_emulator.py\nsqueue\n"
+        ]
 
         self.assertIn(obs["stdout"], exp)
         self.assertEqual(obs["stderr"], "")
@@ -155,6 +158,69 @@ class TestJob(unittest.TestCase):
         obs = job.extract_project_names_from_fastq_dir(tmp)
         self.assertEqual(obs, ["NPH_15288"])
 
+    def test_audit(self):
+        package_root = abspath("./")
+        base_path = partial(join, package_root, "tests", "data")
+        output_dir = base_path("2c4fa5d5-7a5e-4bcb-9ab2-c16ba0a4f46a")
+        self.remove_these.append(output_dir)
+
+        job = Job(
+            base_path("211021_A00000_0000_SAMPLE"),
+            output_dir,
+            "NuQCJob",
+            ["ls"],
+            2,
+            None,
+        )
+
+        with self.assertRaisesRegex(PipelineError, "called on base Job object"):
+            job.audit(["sample1"])
+
+        job.suffix = "fastq.gz"
+
+        dummy_fastqs = [
+            "NPH_15288/filtered_sequences/sample1_S1_L001_R1_001.fastq.gz",
+            "NPH_15288/filtered_sequences/sample1_S1_L001_R2_001.fastq.gz",
+            # sample-ids may contain underscores and may prefix one another.
+            "NPH_15288/filtered_sequences/sample_2_S2_L001_R1_001.fastq.gz",
+            "NPH_15288/filtered_sequences/sample_2_3_S3_L001_R1_001.fastq.gz",
+            # files w/the wrong suffix are not results.
+            "NPH_15288/filtered_sequences/sample4_S4_L001_R1_001.html",
+            # files in zero_files are not results.
+            "NPH_15288/zero_files/sample5_S5_L001_R1_001.fastq.gz",
+            # files outside of audit_folders are not results, when set.
+            "NPH_15288/trimmed_sequences/sample6_S6_L001_R1_001.fastq.gz",
+            # the sample-id must be followed by an underscore.
+            "NPH_15288/filtered_sequences/sample77.fastq.gz",
+        ]
+
+        for fastq in dummy_fastqs:
+            full_path = join(job.output_path, fastq)
+            makedirs(dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write("This is a dummy file.")
+
+        sample_ids = [
+            "sample7",
+            "sample6",
+            "sample5",
+            "sample4",
+            "sample_2_3",
+            "sample_2",
+            "sample1",
+        ]
+
+        obs = job.audit(sample_ids)
+        self.assertEqual(obs, ["sample4", "sample5", "sample7"])
+
+        job.audit_folders = ["filtered_sequences"]
+        obs = job.audit(sample_ids)
+        self.assertEqual(obs, ["sample4", "sample5", "sample6", "sample7"])
+
+        job.audit_folders = ["filtered_sequences", "trimmed_sequences"]
+        obs = job.audit(sample_ids)
+        self.assertEqual(obs, ["sample4", "sample5", "sample7"])
+
     def test_query_slurm(self):
         package_root = abspath("./")
         base_path = partial(join, package_root, "tests", "data")
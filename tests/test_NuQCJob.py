@@ -858,10 +858,6 @@ class TestNuQCJob(unittest.TestCase):
         if exists(self.tmp_file_path):
             remove(self.tmp_file_path)
 
-        # for test_move_trimmed_files()
-        if exists(self.path("NuQCJob")):
-            shutil.rmtree(self.path("NuQCJob"))
-
     def test_nuqcjob_creation(self):
         # use good-sample-sheet as the basis for a sample Metatranscriptomic
         with self.assertRaises(PipelineError) as e:
@@ -2210,49 +2206,42 @@ class TestNuQCJob(unittest.TestCase):
         )
 
         sample_dir = [
-            "NuQCJob/only-adapter-filtered/EP890158A02_S58_L001_R1_001."
-            "interleave.fastq.gz",
-            "NuQCJob/only-adapter-filtered/EP890158A02_S58_L001_R2_001."
-            "interleave.fastq.gz",
-            "NuQCJob/only-adapter-filtered/EP023801B04_S27_L001_R1_001."
-            "interleave.fastq.gz",
-            "NuQCJob/only-adapter-filtered/EP023801B04_S27_L001_R2_001."
-            "interleave.fastq.gz",
-            "NuQCJob/NPH_15288/fastp_reports_dir/html/EP890158A02_S58_L001_R1_001.html",
-            "NuQCJob/NPH_15288/fastp_reports_dir/json/EP023801B04_S27_L001_R1_001.json",
-            "NuQCJob/process_all_fastq_files.sh",
-            "NuQCJob/hds-a439513a-5fcc-4f29-a1e5-902ee5c1309d.1897981.completed",
-            "NuQCJob/logs/slurm-1897981_1.out",
-            "NuQCJob/tmp/hds-a439513a-5fcc-4f29-a1e5-902ee5c1309d-1",
-            "NuQCJob/only-adapter-filtered/CDPH-SAL_"
+            "only-adapter-filtered/EP890158A02_S58_L001_R1_001.interleave.fastq.gz",
+            "only-adapter-filtered/EP890158A02_S58_L001_R2_001.interleave.fastq.gz",
+            "only-adapter-filtered/EP023801B04_S27_L001_R1_001.interleave.fastq.gz",
+            "only-adapter-filtered/EP023801B04_S27_L001_R2_001.interleave.fastq.gz",
+            "NPH_15288/fastp_reports_dir/html/EP890158A02_S58_L001_R1_001.html",
+            "NPH_15288/fastp_reports_dir/json/EP023801B04_S27_L001_R1_001.json",
+            "process_all_fastq_files.sh",
+            "hds-a439513a-5fcc-4f29-a1e5-902ee5c1309d.1897981.completed",
+            "logs/slurm-1897981_1.out",
+            "tmp/hds-a439513a-5fcc-4f29-a1e5-902ee5c1309d-1",
+            "only-adapter-filtered/CDPH-SAL_"
             "Salmonella_Typhi_MDL-150__S36_L001_R1_001.interleave.fastq.gz",
-            "NuQCJob/only-adapter-filtered/CDPH-SAL_"
+            "only-adapter-filtered/CDPH-SAL_"
             "Salmonella_Typhi_MDL-150__S36_L001_R2_001.interleave.fastq.gz",
         ]
 
         for dummy_fp in sample_dir:
-            dummy_fp = self.path(dummy_fp)
-            dummy_path = dirname(dummy_fp)
-            makedirs(dummy_path, exist_ok=True)
+            dummy_fp = join(job.output_path, dummy_fp)
+            makedirs(dirname(dummy_fp), exist_ok=True)
             with open(dummy_fp, "w") as f:
                 f.write("This is a dummy file.\n")
 
-        trimmed_only_path = self.path("NuQCJob", "only-adapter-filtered")
-
-        # test _move_trimmed_files() by verifying that only the interleave
-        # fastq files from the nyu project are moved.
-        job._move_trimmed_files("StudyA_13059", trimmed_only_path)
+        # verify that only the interleave fastq files from StudyA_13059 are
+        # moved into its directory under only-adapter-filtered.
+        job._route_completed_files()
 
-        new_path = join(trimmed_only_path, "StudyA_13059")
+        new_path = join(job.output_path, "only-adapter-filtered", "StudyA_13059")
 
         exp = {
-            "NuQCJob/only-adapter-filtered/StudyA_13059/EP890158A02"
+            "only-adapter-filtered/StudyA_13059/EP890158A02"
             "_S58_L001_R1_001.interleave.fastq.gz",
-            "NuQCJob/only-adapter-filtered/StudyA_13059/EP023801B04"
+            "only-adapter-filtered/StudyA_13059/EP023801B04"
             "_S27_L001_R1_001.interleave.fastq.gz",
-            "NuQCJob/only-adapter-filtered/StudyA_13059/EP890158A02"
+            "only-adapter-filtered/StudyA_13059/EP890158A02"
             "_S58_L001_R2_001.interleave.fastq.gz",
-            "NuQCJob/only-adapter-filtered/StudyA_13059/EP023801B04"
+            "only-adapter-filtered/StudyA_13059/EP023801B04"
             "_S27_L001_R2_001.interleave.fastq.gz",
         }
 
@@ -2260,13 +2249,116 @@ class TestNuQCJob(unittest.TestCase):
         for root, dirs, files in walk(new_path):
             for some_file in files:
                 some_path = join(root, some_file)
-                some_path = some_path.replace(self.path(""), "")
-                obs.append(some_path)
+                obs.append(some_path.replace(job.output_path + "/", ""))
 
         # confirm that only the samples in StudyA_13059 were
         # moved.
         self.assertEqual(set(obs), exp)
 
+    def test_route_completed_files(self):
+        # create a NuQCJob() object, but do not call run().
+        # instead we will manually create some files to test with.
+        job = NuQCJob(
+            self.fastq_root_path,
+            self.output_path,
+            self.good_sample_sheet_path,
+            self.mmi_db_paths,
+            "queue_name",
+            1,
+            1440,
+            "8",
+            "fastp",
+            "minimap2",
+            "samtools",
+            [],
+            self.qiita_job_id,
+            1000,
+            "",
+            self.movi_path,
+            self.gres_value,
+            self.pmls_path,
+            ["BX"],
+        )
+
+        sample_dir = [
+            "StudyA_13059/EP890158A02_S58_L001_R1_001.fastq.gz",
+            "StudyA_13059/EP890158A02_S58_L001_R2_001.fastq.gz",
+            # a sample that doesn't belong to StudyA_13059 is not moved.
+            "StudyA_13059/3A_S1_L001_R1_001.fastq.gz",
+            "StudyC_6123/3A_S1_L001_R1_001.fastq.gz",
+            "fastp_reports_dir/html/EP890158A02_S58_L001_R1_001.html",
+            "fastp_reports_dir/html/3A_S1_L001_R1_001.html",
+            "fastp_reports_dir/json/3A_S1_L001_R1_001.json",
+            # a sample that doesn't belong to any project is not moved.
+            "fastp_reports_dir/json/NOT_A_SAMPLE_S1_L001_R1_001.json",
+            "only-adapter-filtered/EP890158A02_S58_L001_R1_001.interleave.fastq.gz",
+            "only-adapter-filtered/3A_S1_L001_R1_001.interleave.fastq.gz",
+        ]
+
+        for dummy_fp in sample_dir:
+            dummy_fp = join(job.output_path, dummy_fp)
+            makedirs(dirname(dummy_fp), exist_ok=True)
+            with open(dummy_fp, "w") as f:
+                f.write("This is a dummy file.\n")
+
+        job._route_completed_files()
+
+        exp = {
+            "StudyA_13059/trimmed_sequences/EP890158A02_S58_L001_R1_001."
+            "trimmed.fastq.gz",
+            "StudyA_13059/trimmed_sequences/EP890158A02_S58_L001_R2_001."
+            "trimmed.fastq.gz",
+            "StudyA_13059/3A_S1_L001_R1_001.fastq.gz",
+            "StudyC_6123/filtered_sequences/3A_S1_L001_R1_001.trimmed.fastq.gz",
+            "StudyA_13059/fastp_reports_dir/html/EP890158A02_S58_L001_R1_001.html",
+            "StudyC_6123/fastp_reports_dir/html/3A_S1_L001_R1_001.html",
+            "StudyC_6123/fastp_reports_dir/json/3A_S1_L001_R1_001.json",
+            "fastp_reports_dir/json/NOT_A_SAMPLE_S1_L001_R1_001.json",
+            "only-adapter-filtered/StudyA_13059/EP890158A02_S58_L001_R1_001."
+            "interleave.fastq.gz",
+            "only-adapter-filtered/StudyC_6123/3A_S1_L001_R1_001.interleave.fastq.gz",
+        }
+
+        obs = []
+        for root, dirs, files in walk(job.output_path):
+            for some_file in files:
+                some_path = join(root, some_file)
+                obs.append(some_path.replace(job.output_path + "/", ""))
+
+        self.assertEqual(set(obs) & (exp | set(sample_dir)), exp)
+
+        # files that don't follow the naming pattern raise an Error before
+        # anything is moved.
+        shutil.rmtree(join(job.output_path, "only-adapter-filtered"))
+        bad_fp = join(job.output_path, "fastp_reports_dir", "html", "bad.html")
+        with open(bad_fp, "w") as f:
+            f.write("This is a dummy file.\n")
+
+        with self.assertRaisesRegex(ValueError, "does not follow naming pattern"):
+            job._route_completed_files()
+
+    def test_is_empty(self):
+        fastq_path = self.path("output_dir", "a_S1_L001_R1_001.trimmed.fastq.gz")
+        makedirs(dirname(fastq_path), exist_ok=True)
+        with open(fastq_path, "w") as f:
+            f.write("x" * 4000)
+
+        # w/out demux counts, the file's size is compared to minimum_bytes.
+        self.assertFalse(NuQCJob._is_empty(fastq_path, 3100))
+        self.assertTrue(NuQCJob._is_empty(fastq_path, 4000))
+
+        # demux counts are keyed on the file's name before it was renamed.
+        counts = {
+            "a_S1_L001_R1_001.fastq.gz": {"records": 0, "bases": 0, "bytes": 4000}
+        }
+        self.assertTrue(NuQCJob._is_empty(fastq_path, 3100, counts))
+
+        counts["a_S1_L001_R1_001.fastq.gz"]["records"] = 10
+        self.assertFalse(NuQCJob._is_empty(fastq_path, 3100, counts))
+
+        counts["a_S1_L001_R1_001.fastq.gz"]["bytes"] = 3000
+        self.assertTrue(NuQCJob._is_empty(fastq_path, 3100, counts))
+
     def _helper(self, regex, good_names, bad_names):
         for good_name in good_names:
             substr = regex.search(good_name)
@@ -2288,6 +2288,19 @@ class TestPipeline(unittest.TestCase):
         obs = set(pipeline.get_sample_names("StudyC"))
         self.assertEqual(obs, exp)
 
+        # full and short project names return the same samples.
+        self.assertEqual(
+            pipeline.get_sample_names("StudyC_6123"),
+            pipeline.get_sample_names("StudyC"),
+        )
+        self.assertEqual(pipeline.get_sample_names("StudyD"), [])
+
+        # sample-ids are indexed by project as well.
+        obs = pipeline.get_sample_ids("StudyC_6123")
+        self.assertEqual(obs, pipeline.get_sample_ids("StudyC"))
+        self.assertEqual(len(obs), len(exp))
+        self.assertTrue(set(obs).issubset(set(pipeline.get_sample_ids())))
+
     def test_get_project_info(self):
         exp_proj_info = [
             {
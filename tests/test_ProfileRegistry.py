@@ -0,0 +1,99 @@
+from json import dumps
+from os import makedirs, utime
+from os.path import join
+from shutil import copytree, rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from sequence_processing_pipeline.ProfileRegistry import ProfileRegistry
+
+
+class TestProfileRegistry(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.profiles_path = join(self.tmp_dir, "profiles")
+        copytree(join("tests", "data", "configuration_profiles"), self.profiles_path)
+
+    def tearDown(self):
+        ProfileRegistry.clear()
+        rmtree(self.tmp_dir)
+
+    def write_profile(self, path, instrument_type, assay_type, nprocs=16):
+        profile = {
+            "profile": {
+                "instrument_type": instrument_type,
+                "assay_type": assay_type,
+                "configuration": {"bcl-convert": {"nprocs": nprocs}},
+            }
+        }
+
+        with open(path, "w") as f:
+            f.write(dumps(profile))
+
+    def test_find(self):
+        registry = ProfileRegistry.get(self.profiles_path)
+
+        obs = registry.find("MiSeq", "Metagenomic")
+        self.assertEqual(obs["profile"]["instrument_type"], "MiSeq")
+        self.assertEqual(obs["profile"]["assay_type"], "Metagenomic")
+        self.assertIsNone(registry.find("MiSeq", "Not an assay"))
+        self.assertEqual(len(registry.profiles), 8)
+
+        # registries are shared and unmodified profiles are not reloaded.
+        self.assertIs(ProfileRegistry.get(self.profiles_path), registry)
+        self.assertIs(registry.find("MiSeq", "Metagenomic"), obs)
+
+    def test_refresh(self):
+        # profiles may be nested in subdirectories.
+        makedirs(join(self.profiles_path, "custom"))
+        profile_path = join(self.profiles_path, "custom", "hiseq.json")
+        self.write_profile(profile_path, "HiSeq", "Metagenomic")
+
+        registry = ProfileRegistry.get(self.profiles_path)
+        obs = registry.find("HiSeq", "Metagenomic")
+        self.assertEqual(obs["profile"]["configuration"]["bcl-convert"]["nprocs"], 16)
+
+        self.write_profile(profile_path, "HiSeq", "Metagenomic", nprocs=32)
+        utime(profile_path, ns=(0, 0))
+
+        registry = ProfileRegistry.get(self.profiles_path)
+        obs = registry.find("HiSeq", "Metagenomic")
+        self.assertEqual(obs["profile"]["configuration"]["bcl-convert"]["nprocs"], 32)
+
+        # invalid profiles raise an Error every time, until they are fixed.
+        with open(profile_path, "w") as f:
+            f.write(dumps({"profile": {"instrument_type": "HiSeq"}}))
+
+        for _ in range(2):
+            with self.assertRaisesRegex(
+                ValueError, "'assay_type' is not an attribute      in '.*hiseq.json'"
+            ):
+                ProfileRegistry.get(self.profiles_path)
+
+        rmtree(join(self.profiles_path, "custom"))
+        registry = ProfileRegistry.get(self.profiles_path)
+        self.assertIsNone(registry.find("HiSeq", "Metagenomic"))
+
+    def test_duplicate_profiles(self):
+        self.write_profile(
+            join(self.profiles_path, "duplicate.json"), "MiSeq", "Metagenomic"
+        )
+
+        with self.assertRaisesRegex(
+            ValueError, r"both define a profile for \('MiSeq', 'Metagenomic'\)"
+        ):
+            ProfileRegistry.get(self.profiles_path)
+
+    def test_bad_profiles_path(self):
+        with self.assertRaisesRegex(ValueError, "doesn't exist"):
+            ProfileRegistry.get(join(self.tmp_dir, "does_not_exist"))
+
+        empty_dir = join(self.tmp_dir, "empty")
+        makedirs(empty_dir)
+
+        with self.assertRaisesRegex(ValueError, "doesn't contain profile files"):
+            ProfileRegistry.get(empty_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import tarfile
+from os import listdir, makedirs, utime
+from os.path import exists, join
+from shutil import rmtree
+from subprocess import Popen
+from tempfile import mkdtemp
+from types import SimpleNamespace
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from qp_klp.ResultsArchiver import ResultsArchiver
+from qp_klp.Workflows import Workflow
+from sequence_processing_pipeline.PipelineError import PipelineError
+
+
+class TestResultsArchiver(TestCase):
+    def setUp(self):
+        self.output_path = mkdtemp()
+
+        for some_dir in ["ConvertJob/logs", "ConvertJob/Reports", "final_results"]:
+            makedirs(join(self.output_path, some_dir))
+
+        self.files = [
+            "ConvertJob/logs/ConvertJob_1.out",
+            "ConvertJob/logs/ConvertJob_1.err",
+            "ConvertJob/Reports/Demultiplex_Stats.csv",
+            "sample_sif.tsv",
+        ]
+
+        for some_file in self.files:
+            with open(join(self.output_path, some_file), "w") as f:
+                f.write(f"contents of {some_file}\n")
+
+    def tearDown(self):
+        rmtree(self.output_path)
+
+    def test_bad_output_path(self):
+        with self.assertRaisesRegex(ValueError, "is not a directory"):
+            ResultsArchiver(join(self.output_path, "does_not_exist"))
+
+    def test_build_all(self):
+        archiver = ResultsArchiver(self.output_path)
+
+        archives = {
+            "logs-ConvertJob.tgz": ["ConvertJob/logs"],
+            "reports-ConvertJob.tgz": ["ConvertJob/Reports", "ConvertJob/logs"],
+            "sample-files.tgz": ["sample_sif.tsv"],
+        }
+
+        obs = archiver.build_all(archives)
+        self.assertDictEqual(obs, {k: True for k in archives})
+
+        # member names must match those created by 'tar zcvf' when run from
+        # output_path.
+        with tarfile.open(join(self.output_path, "reports-ConvertJob.tgz")) as f:
+            obs = sorted([x.name for x in f.getmembers() if x.isfile()])
+
+        exp = sorted(self.files[:3])
+        self.assertListEqual(obs, exp)
+
+        with tarfile.open(join(self.output_path, "sample-files.tgz")) as f:
+            member = f.extractfile("sample_sif.tsv")
+            self.assertEqual(member.read(), b"contents of sample_sif.tsv\n")
+
+        # archives w/unchanged inputs are skipped, even if they have already
+        # been moved into final_results.
+        for name, inputs in archives.items():
+            self.assertTrue(archiver.is_up_to_date(name, inputs))
+
+        src = join(self.output_path, "logs-ConvertJob.tgz")
+        dst = join(self.output_path, "final_results", "logs-ConvertJob.tgz")
+        with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+            f_out.write(f_in.read())
+
+        utime(join(self.output_path, "sample_sif.tsv"), ns=(0, 0))
+
+        obs = archiver.build_all(archives)
+        self.assertDictEqual(
+            obs,
+            {
+                "logs-ConvertJob.tgz": False,
+                "reports-ConvertJob.tgz": False,
+                "sample-files.tgz": True,
+            },
+        )
+
+        # a modified input causes the archive to be rebuilt and the stale
+        # copy in final_results to be removed.
+        with open(join(self.output_path, self.files[0]), "a") as f:
+            f.write("more output\n")
+
+        self.assertFalse(
+            archiver.is_up_to_date("logs-ConvertJob.tgz", ["ConvertJob/logs"])
+        )
+        self.assertTrue(archiver.build("logs-ConvertJob.tgz", ["ConvertJob/logs"]))
+        self.assertFalse(exists(dst))
+        self.assertFalse(exists(f"{src}.partial"))
+
+
+class TestWorkflowArchives(TestCase):
+    def setUp(self):
+        self.output_path = mkdtemp()
+
+        for some_dir in ["ConvertJob/logs", "FastQCJob/multiqc", "final_results"]:
+            makedirs(join(self.output_path, some_dir))
+
+        for some_file in ["ConvertJob/logs/ConvertJob_1.out", "sample_sif.tsv"]:
+            with open(join(self.output_path, some_file), "w") as f:
+                f.write(f"contents of {some_file}\n")
+
+    def tearDown(self):
+        rmtree(self.output_path)
+
+    def get_software_configuration(self, software):
+        raise PipelineError(f"'{software}' is not defined in configuration")
+
+    def test_execute_commands(self):
+        wf = Workflow()
+        wf.pipeline = SimpleNamespace(
+            output_path=self.output_path,
+            is_sif_fp=lambda x: x.endswith("_sif.tsv"),
+            get_software_configuration=self.get_software_configuration,
+        )
+
+        wf.generate_commands()
+        self.assertSetEqual(
+            set(wf.archives),
+            {"logs-ConvertJob.tgz", "reports-ConvertJob.tgz", "sample-files.tgz"},
+        )
+
+        executed = []
+
+        def _popen(cmd, **kwargs):
+            executed.append(cmd)
+            return Popen(cmd, **kwargs)
+
+        with patch("qp_klp.Workflows.Popen", side_effect=_popen):
+            wf.execute_commands()
+
+        # only the tar commands are performed in-process.
+        self.assertListEqual(executed, [x for x in wf.cmds if "tar zcvf" not in x])
+        self.assertEqual(len(executed), len(wf.cmds) - len(wf.archives))
+
+        results = sorted(listdir(join(self.output_path, "final_results")))
+        self.assertListEqual(
+            results,
+            [
+                "logs-ConvertJob.tgz",
+                "multiqc",
+                "reports-ConvertJob.tgz",
+                "sample-files.tgz",
+            ],
+        )
+
+        with tarfile.open(
+            join(self.output_path, "final_results", "sample-files.tgz")
+        ) as f:
+            self.assertListEqual(f.getnames(), ["sample_sif.tsv"])
+
+    def test_archive_cores(self):
+        wf = Workflow()
+        wf.pipeline = SimpleNamespace(
+            get_software_configuration=self.get_software_configuration
+        )
+
+        # w/out an 'archive' configuration, every available core is used.
+        self.assertGreaterEqual(wf._archive_cores(), 1)
+
+        wf.pipeline.get_software_configuration = lambda x: {"nprocs": "6"}
+        self.assertEqual(wf._archive_cores(), 6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+from json import load
+from os import makedirs, rmdir, utime
+from os.path import isdir, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from sequence_processing_pipeline.RunDirectoryIndex import RunDirectoryIndex
+
+
+class TestRunDirectoryIndex(TestCase):
+    def setUp(self):
+        self.root = mkdtemp()
+        self.search_paths = [join(self.root, "seqs"), join(self.root, "products")]
+        self.run_id = "211021_A00000_0000_SAMPLE"
+
+        makedirs(join(self.search_paths[0], self.run_id))
+        makedirs(join(self.search_paths[0], "211022_A00000_0001_OTHER"))
+        makedirs(join(self.search_paths[1], f"prefix_{self.run_id}"))
+
+        # files are not run-directories, even if their names match.
+        with open(join(self.search_paths[1], self.run_id), "w") as f:
+            f.write("not a directory\n")
+
+        self.index_path = join(self.root, "run_dirs.json")
+
+    def tearDown(self):
+        rmtree(self.root)
+
+    def test_find(self):
+        index = RunDirectoryIndex(self.index_path)
+        obs = index.find(self.run_id, self.search_paths)
+
+        exp = [
+            join(self.search_paths[0], self.run_id),
+            join(self.search_paths[1], f"prefix_{self.run_id}"),
+        ]
+        self.assertListEqual(obs, exp)
+
+        with open(self.index_path) as f:
+            entries = load(f)
+
+        self.assertEqual(
+            sorted(entries[self.search_paths[0]]["directories"]),
+            [self.run_id, "211022_A00000_0001_OTHER"],
+        )
+
+        # a new index instance reuses the stored listing.
+        index = RunDirectoryIndex(self.index_path)
+        self.assertListEqual(index.find(self.run_id, self.search_paths), exp)
+        self.assertFalse(index.modified)
+
+    def test_refresh_on_change(self):
+        index = RunDirectoryIndex(self.index_path)
+        self.assertListEqual(index.find("NEW_RUN", self.search_paths), [])
+
+        new_dir = join(self.search_paths[1], "NEW_RUN")
+        makedirs(new_dir)
+        # guarantee the parent's mtime differs from the indexed value.
+        utime(self.search_paths[1], ns=(0, 0))
+
+        index = RunDirectoryIndex(self.index_path)
+        self.assertListEqual(index.find("NEW_RUN", self.search_paths), [new_dir])
+
+        # only names that weren't already indexed are checked w/isdir().
+        makedirs(join(self.search_paths[1], "NEWER_RUN"))
+        utime(self.search_paths[1], ns=(1, 1))
+        with patch(
+            "sequence_processing_pipeline.RunDirectoryIndex.isdir", wraps=isdir
+        ) as mock_isdir:
+            index.find("NO_SUCH_RUN", self.search_paths)
+        mock_isdir.assert_called_once_with(join(self.search_paths[1], "NEWER_RUN"))
+
+        # a removed directory is not returned, even if the listing is stale.
+        rmdir(new_dir)
+        utime(self.search_paths[1], ns=(0, 0))
+        self.assertListEqual(index.find("NEW_RUN", self.search_paths), [])
+
+        # and is dropped from the index once the search path changes.
+        self.assertNotIn("NEW_RUN", index.entries[self.search_paths[1]]["directories"])
+
+    def test_bad_index(self):
+        with open(self.index_path, "w") as f:
+            f.write("{ this is not json")
+
+        index = RunDirectoryIndex(self.index_path)
+        self.assertDictEqual(index.entries, {})
+        obs = index.find(self.run_id, self.search_paths)
+        self.assertEqual(obs[0], join(self.search_paths[0], self.run_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from os.path import abspath, join
+from shutil import copyfile, rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from metapool import load_sample_sheet
+
+from sequence_processing_pipeline.SampleSheetCache import SampleSheetCache
+
+
+class TestSampleSheetCache(TestCase):
+    def setUp(self):
+        self.tmp_dir = mkdtemp()
+        self.sheet_path = join(self.tmp_dir, "sample_sheet.csv")
+        copyfile(
+            join("tests", "data", "tellseq_metag_dummy_sample_sheet.csv"),
+            self.sheet_path,
+        )
+
+    def tearDown(self):
+        SampleSheetCache.invalidate()
+        rmtree(self.tmp_dir)
+
+    def test_get(self):
+        parsed = SampleSheetCache.get(self.sheet_path)
+
+        self.assertEqual(parsed.path, abspath(self.sheet_path))
+        self.assertTrue(parsed.is_valid)
+        self.assertTrue(parsed.validate(echo_msgs=False))
+
+        # repeated lookups of an unchanged file return the same entry.
+        self.assertIs(SampleSheetCache.get(self.sheet_path), parsed)
+
+        exp = [x.Sample_ID for x in load_sample_sheet(self.sheet_path).samples]
+        self.assertListEqual([x["Sample_ID"] for x in parsed.samples], exp)
+        self.assertListEqual(list(parsed.samples_by_id), exp)
+
+        sample = parsed.samples_by_id["Test_8_10_2013_example"]
+        self.assertEqual(sample["barcode_id"], "C501")
+        self.assertEqual(sample["Sample_Name"], "Test.8.10.2013.example")
+        self.assertIs(parsed.samples_by_barcode_id["C501"], sample)
+
+        project = "Tellseq_Shortread_Metagenomic_Analysis_6124"
+        self.assertIn(sample, parsed.samples_by_project[project])
+
+        # views are read-only.
+        with self.assertRaises(TypeError):
+            sample["Sample_Name"] = "foo"
+
+        with self.assertRaises(TypeError):
+            parsed.samples_by_id["foo"] = sample
+
+    def test_invalidate_on_change(self):
+        parsed = SampleSheetCache.get(self.sheet_path)
+        self.assertEqual(parsed.sheet.samples[0].Lane, "4")
+
+        sheet = load_sample_sheet(self.sheet_path)
+        with open(self.sheet_path, "w") as f:
+            sheet.write(f, lane=2)
+
+        obs = SampleSheetCache.get(self.sheet_path)
+        self.assertIsNot(obs, parsed)
+        self.assertNotEqual(obs.digest, parsed.digest)
+        self.assertEqual(obs.sheet.samples[0].Lane, "2")
+
+        # explicit invalidation forces a reload of an unchanged file.
+        SampleSheetCache.invalidate(self.sheet_path)
+        self.assertIsNot(SampleSheetCache.get(self.sheet_path), obs)
+
+
+if __name__ == "__main__":
+    main()
@@ -74,9 +74,16 @@ class TestSeqCountsJob(unittest.TestCase):
 
         compare_files(obs, self.exp_sbatch_output)
 
-        # hack log path so that it points to test data directory rather than
-        # the output directory for a run we didn't run().
-        job.log_path = self.path("data", "seq_counts_logs")
+        # the files to count don't exist and so are spread evenly by count.
+        with open(join(job.batches_path, "batch-1")) as f:
+            obs = [x.strip() for x in f]
+        with open(self.files_to_count_path) as f:
+            exp = [x.strip() for x in f]
+        self.assertEqual(sorted(obs), sorted(exp))
+
+        # hack counts path so that it points to test data directory rather
+        # than the output directory for a run we didn't run().
+        job.counts_path = self.path("data", "seq_counts_results")
 
         obs = pd.read_csv(
             job._aggregate_counts(self.dummy_sample_sheet), sep=",", dtype="str"
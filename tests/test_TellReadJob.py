@@ -1,7 +1,14 @@
 import unittest
 from functools import partial
+from os import makedirs
 from os.path import join
+from shutil import rmtree
+from subprocess import run
+from tempfile import mkdtemp
 
+from jinja2 import Environment
+
+from sequence_processing_pipeline.Job import KISSLoader
 from sequence_processing_pipeline.TellReadJob import TellReadJob
 
 
@@ -75,6 +82,92 @@ class TestTellReadJob(unittest.TestCase):
         for obs_line, exp_line in zip(obs_lines, exp_lines):
             self.assertEqual(obs_line, exp_line)
 
+    def _create_job(self):
+        return TellReadJob(
+            self.run_dir,
+            self.output_path,
+            self.sample_sheet_path,
+            self.queue_name,
+            self.node_count,
+            self.wall_time_limit,
+            self.jmem,
+            self.modules_to_load,
+            self.qiita_job_id,
+            self.reference_base,
+            self.reference_map,
+            self.sing_script_path,
+            self.cores_per_task,
+        )
+
+    def test_audit(self):
+        job = self._create_job()
+
+        full_path = join(job.output_path, "Full")
+        makedirs(full_path, exist_ok=True)
+        self.addCleanup(rmtree, full_path)
+
+        # TellRead wrote nothing for the first barcode.
+        expected = job.expected_outputs()
+        for barcode_id, file_names in expected.items():
+            if barcode_id == job.sample_ids[0][2]:
+                continue
+            for file_name in file_names:
+                with open(join(full_path, file_name), "w") as f:
+                    f.write("@seq\nACGT\n+\nFFFF\n")
+
+        self.assertListEqual(job.audit(), [job.sample_ids[0][0]])
+
+    def _wait_for_outputs(self, file_names, written):
+        # run the job script's wait loop against a stand-in for TellRead.
+        output = mkdtemp()
+        self.addCleanup(rmtree, output)
+        makedirs(join(output, "Full"))
+
+        manifest_path = join(output, "expected_outputs.txt")
+        with open(manifest_path, "w") as f:
+            f.write("".join(f"{x}\n" for x in file_names))
+
+        for file_name in written:
+            with open(join(output, "Full", file_name), "w") as f:
+                f.write("@seq\nACGT\n+\nFFFF\n")
+
+        template = Environment(loader=KISSLoader("templates")).get_template(
+            "tellread.sbatch"
+        )
+        script = template.render(
+            {
+                "modules_to_load": "",
+                "sing_script_path": "true",
+                "output": output,
+                "manifest_path": manifest_path,
+                "poll_interval": 1,
+                "quiet_time": 2,
+                "max_wait": 30,
+            }
+        )
+
+        return run(["bash", "-c", script], capture_output=True, text=True)
+
+    def test_wait_for_outputs(self):
+        file_names = [
+            TellReadJob.OUTPUT_NAME.format(read=read, barcode_id=barcode_id)
+            for barcode_id in ("C501", "C502")
+            for read in TellReadJob.READS
+        ]
+
+        # every expected output is present.
+        result = self._wait_for_outputs(file_names, file_names)
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("DONE", result.stdout)
+        self.assertNotIn("expected outputs present", result.stdout)
+
+        # TellRead wrote nothing for C502. The script still succeeds once
+        # nothing has changed for the quiet time, leaving the missing
+        # sample to audit().
+        result = self._wait_for_outputs(file_names, file_names[:3])
+        self.assertEqual(result.returncode, 0)
+        self.assertIn("DONE (3/6 expected outputs present)", result.stdout)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,188 @@
+from json import load
+from os import makedirs
+from os.path import exists, join
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from sequence_processing_pipeline.FileInventory import FileInventory
+from sequence_processing_pipeline.Job import Job
+from sequence_processing_pipeline.Tracer import Tracer, annotate, span
+
+
+class TracedJob(Job):
+    def __init__(self, root_dir, output_path):
+        super().__init__(root_dir, output_path, "TracedJob", [], 1)
+
+    def run(self, fail=False, size=100):
+        with open(join(self.output_path, "result.txt"), "w") as f:
+            f.write("x" * size)
+
+        if fail:
+            raise ValueError("this job failed")
+
+        self.mark_job_completed()
+        self.mark_post_processing_completed()
+
+        return "done"
+
+
+class TestTracer(TestCase):
+    def setUp(self):
+        self.output_path = mkdtemp()
+
+    def tearDown(self):
+        Tracer.deactivate()
+        FileInventory.clear()
+        rmtree(self.output_path)
+
+    def test_inactive(self):
+        self.assertIsNone(Tracer.active())
+
+        with span("step", "step", a=1) as attributes:
+            annotate(b=2)
+            attributes["c"] = 3
+
+        self.assertFalse(exists(join(self.output_path, Tracer.SPANS_NAME)))
+
+    def test_span(self):
+        tracer = Tracer.activate(self.output_path)
+        self.assertIs(Tracer.active(), tracer)
+
+        with span("outer", "workflow", run="my_run"):
+            with span("inner", "step") as attributes:
+                attributes["a"] = 1
+                annotate(b=2)
+            annotate(c=3, d=None)
+
+        with self.assertRaisesRegex(ValueError, "oops"), span("failed", "step"):
+            raise ValueError("oops")
+
+        spans = tracer.read_spans()
+        self.assertListEqual([x["name"] for x in spans], ["inner", "outer", "failed"])
+
+        inner, outer, failed = spans
+        self.assertDictEqual(inner["attributes"], {"a": 1, "b": 2})
+        self.assertDictEqual(outer["attributes"], {"run": "my_run", "c": 3})
+        self.assertEqual(inner["status"], "ok")
+        self.assertLessEqual(outer["start"], inner["start"])
+        self.assertLessEqual(inner["end"], outer["end"])
+
+        self.assertEqual(failed["status"], "error")
+        self.assertEqual(failed["attributes"]["error"], "ValueError: oops")
+
+    def test_write_chrome_trace(self):
+        tracer = Tracer.activate(self.output_path)
+
+        with span("outer", "workflow"), span("inner", "step", job_id="1234"):
+            pass
+
+        trace_path = tracer.write_chrome_trace()
+        self.assertEqual(trace_path, join(self.output_path, Tracer.TRACE_NAME))
+
+        with open(trace_path) as f:
+            trace = load(f)
+
+        events = trace["traceEvents"]
+        self.assertListEqual([x["name"] for x in events], ["inner", "outer"])
+
+        for event in events:
+            self.assertEqual(event["ph"], "X")
+            self.assertEqual(event["tid"], 0)
+            self.assertIsInstance(event["ts"], int)
+            self.assertGreaterEqual(event["dur"], 0)
+
+        self.assertDictEqual(events[0]["args"], {"job_id": "1234", "status": "ok"})
+        self.assertEqual(events[0]["cat"], "step")
+
+    def test_job_spans(self):
+        root_dir = join(self.output_path, "input")
+        makedirs(root_dir)
+        with open(join(root_dir, "input.txt"), "w") as f:
+            f.write("x" * 10)
+
+        job = TracedJob(root_dir, self.output_path)
+
+        # jobs aren't traced while no Tracer is active.
+        self.assertEqual(job.run(), "done")
+        self.assertFalse(exists(join(self.output_path, Tracer.SPANS_NAME)))
+
+        tracer = Tracer.activate(self.output_path)
+
+        self.assertEqual(job.run(), "done")
+        with self.assertRaisesRegex(ValueError, "this job failed"):
+            job.run(fail=True)
+
+        spans = tracer.read_spans()
+        names = [x["name"] for x in spans]
+        self.assertListEqual(
+            names, ["TracedJob.post_processing", "TracedJob.run", "TracedJob.run"]
+        )
+
+        post_processing, run, failed = spans
+        self.assertEqual(run["attributes"]["job"], "TracedJob")
+        self.assertNotIn("bytes_in", run["attributes"])
+        self.assertGreaterEqual(run["attributes"]["bytes_out"], 100)
+        self.assertLessEqual(run["start"], post_processing["start"])
+        self.assertEqual(failed["status"], "error")
+
+    def test_job_bytes_out(self):
+        job = TracedJob(self.output_path, join(self.output_path, "TracedJob"))
+        tracer = Tracer.activate(self.output_path)
+
+        # a restarted job rewrites its outputs in place.
+        job.run(size=100)
+        job.run(size=1000)
+
+        runs = [x for x in tracer.read_spans() if x["name"] == "TracedJob.run"]
+        first, second = [x["attributes"]["bytes_out"] for x in runs]
+        self.assertGreaterEqual(first, 100)
+        self.assertEqual(second - first, 900)
+
+    def test_sacct_usage(self):
+        tracer = Tracer.activate(self.output_path)
+        job = TracedJob(self.output_path, self.output_path)
+
+        stdout = (
+            "1234_1|COMPLETED|00:10:00|00:30:00|4||8G|node-01\n"
+            "1234_1.batch|COMPLETED|00:10:00|00:30:00|4|2048K||node-01\n"
+            "1234_2|COMPLETED|01:00:00|1-00:00:00|4||8G|node-02\n"
+            "1234_2.batch|COMPLETED|01:00:00|1-00:00:00|4|1G||node-02\n"
+        )
+
+        with patch.object(Job, "_system_call") as system_call, span("submit", "slurm"):
+            system_call.return_value = {"stdout": stdout, "return_code": 0}
+            job._report_efficiency("1234")
+
+        (obs,) = tracer.read_spans()
+        self.assertDictEqual(
+            obs["attributes"],
+            {
+                "cpu_seconds": 1800.0 + 86400.0,
+                "max_rss_bytes": float(2**30),
+                "max_task_seconds": 3600.0,
+            },
+        )
+
+        # TracedJob doesn't collect efficiency reports.
+        self.assertFalse(
+            exists(join(self.output_path, "TracedJob_1234_efficiency.csv"))
+        )
+
+    def test_array_size(self):
+        self.assertEqual(Job._array_size("--parsable --array 1-10%4", "x"), 10)
+        self.assertEqual(Job._array_size("-J foo-a --array=0,2,4-8:2", "x"), 5)
+        self.assertIsNone(Job._array_size("-J tell-align", "missing.sh"))
+
+        script_path = join(self.output_path, "job.sh")
+        with open(script_path, "w") as f:
+            f.write("#!/bin/bash -l\n#SBATCH -J foo\n#SBATCH --array 1-16%8\n")
+            f.write("echo --array 1-99\n")
+
+        self.assertEqual(Job._array_size(None, script_path), 16)
+        self.assertEqual(Job._array_size("-a 3", script_path), 1)
+
+
+if __name__ == "__main__":
+    main()
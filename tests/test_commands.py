@@ -6,7 +6,12 @@ from os.path import join
 from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
-from sequence_processing_pipeline.Commands import demux, split_similar_size_bins
+from sequence_processing_pipeline.Commands import (
+    demux,
+    demux_just_fwd_processing,
+    read_demux_manifests,
+    split_similar_size_bins,
+)
 
 
 class CommandTests(unittest.TestCase):
@@ -61,7 +66,7 @@ class CommandTests(unittest.TestCase):
             "/foo/bar/Sample2_R2_001.fastq.gz",
             "/foo/bar/Sample1_R2_001.fastq.gz",
             "/foo/baz/Sample3_R2_SRE_S2_L007_R1_001.fastq.gz",
-            "/foo/baz/Sample3_R1_SRE_S2_L007_R2_001.fastq.gz",
+            "/foo/baz/Sample3_R2_SRE_S2_L007_R2_001.fastq.gz",
             "/foo/bar/Sample2_R1_001.fastq.gz",
         ]
 
@@ -81,8 +86,8 @@ class CommandTests(unittest.TestCase):
                 "bar\n"
             )
             exp_2 = (
-                "/foo/baz/Sample3_R1_SRE_S2_L007_R2_001.fastq.gz\t"
                 "/foo/baz/Sample3_R2_SRE_S2_L007_R1_001.fastq.gz\t"
+                "/foo/baz/Sample3_R2_SRE_S2_L007_R2_001.fastq.gz\t"
                 "baz\n"
             )
 
@@ -91,6 +96,41 @@ class CommandTests(unittest.TestCase):
             obs_1 = open(tmp + "/prefix-2").read()
             self.assertEqual(obs_1, exp_2)
 
+    @patch("os.stat")
+    @patch("glob.glob")
+    def test_split_similar_size_bins_unpaired(self, glob, stat):
+        class MockStat:
+            st_size = 2**28  # 256MB
+
+        # the R1 and R2 files for Sample3 have different prefixes and so
+        # are not mates. Sample4 has no R2 file at all.
+        mockglob = [
+            "/foo/bar/Sample1_R1_001.fastq.gz",
+            "/foo/bar/Sample1_R2_001.fastq.gz",
+            "/foo/baz/Sample3_R2_SRE_S2_L007_R1_001.fastq.gz",
+            "/foo/baz/Sample3_R1_SRE_S2_L007_R2_001.fastq.gz",
+            "/foo/baz/Sample4_R1_001.fastq.gz",
+        ]
+
+        with TemporaryDirectory() as tmp:
+            stat.return_value = MockStat()
+            glob.return_value = mockglob
+
+            with self.assertRaisesRegex(ValueError, "Files are not paired"):
+                split_similar_size_bins("foo", 1, tmp + "/prefix")
+
+            obs = split_similar_size_bins("foo", 1, tmp + "/prefix", strict=False)
+            self.assertEqual(obs[0], 1)
+
+            with open(tmp + "/prefix-1") as f:
+                obs_1 = f.read()
+            self.assertEqual(
+                obs_1,
+                "/foo/bar/Sample1_R1_001.fastq.gz\t"
+                "/foo/bar/Sample1_R2_001.fastq.gz\t"
+                "bar\n",
+            )
+
     def test_demux(self):
         with TemporaryDirectory() as tmp:
             id_map = [
@@ -257,6 +297,74 @@ class CommandTests(unittest.TestCase):
             self.assertFalse(os.path.exists(join(tmp, "a_R1.fastq.gz")))
             self.assertFalse(os.path.exists(join(tmp, "a_R2.fastq.gz")))
 
+    def test_demux_manifest(self):
+        with TemporaryDirectory() as tmp:
+            id_map = [
+                ["1", "a_R1", "a_R2", "Project_12345"],
+                ["2", "b_R1", "b_R2", "Project_12345"],
+            ]
+
+            infile_data = "\n".join(
+                [
+                    "@1::MUX::foo/1",
+                    "ATGCAA",
+                    "+",
+                    "!!!!!!",
+                    "@1::MUX::foo/2",
+                    "ATGC",
+                    "+",
+                    "!!!!",
+                    "@1::MUX::bar/1 BX:Z:TATGACACATGCGGCCCT",
+                    "ATG",
+                    "+",
+                    "!!!",
+                    # the last record may not end in a newline.
+                    "@1::MUX::bar/2",
+                    "ATGCA",
+                    "+",
+                    "!!!!!",
+                ]
+            )
+
+            manifest_path = join(tmp, "logs", "demux_manifests", "1.0.tsv")
+            demux(id_map, io.StringIO(infile_data), tmp, 0, 2, manifest_path)
+
+            # b is handled by another task and isn't in this manifest.
+            obs = read_demux_manifests([manifest_path])
+            self.assertEqual(
+                set(obs), {"Project_12345/a_R1.fastq.gz", "Project_12345/a_R2.fastq.gz"}
+            )
+
+            obs_r1 = obs["Project_12345/a_R1.fastq.gz"]
+            self.assertEqual((obs_r1["records"], obs_r1["bases"]), (2, 9))
+            self.assertEqual(
+                obs_r1["bytes"],
+                os.stat(join(tmp, "Project_12345", "a_R1.fastq.gz")).st_size,
+            )
+
+            obs_r2 = obs["Project_12345/a_R2.fastq.gz"]
+            self.assertEqual((obs_r2["records"], obs_r2["bases"]), (2, 9))
+
+            # a sample w/no reads is still reported.
+            manifest_path = join(tmp, "logs", "demux_manifests", "1.1.tsv")
+            demux_just_fwd_processing(
+                [["2", "b_R1", "Project_12345"]],
+                io.StringIO(infile_data),
+                tmp,
+                0,
+                1,
+                manifest_path,
+            )
+
+            obs = read_demux_manifests([manifest_path])
+            self.assertEqual(obs["Project_12345/b_R1.fastq.gz"]["records"], 0)
+
+            with open(manifest_path, "w") as f:
+                f.write("not a manifest\n")
+
+            with self.assertRaisesRegex(ValueError, "is not a demux manifest"):
+                read_demux_manifests([manifest_path])
+
 
 if __name__ == "__main__":
     unittest.main()
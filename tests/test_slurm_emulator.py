@@ -0,0 +1,263 @@
+import os
+from importlib.util import module_from_spec, spec_from_file_location
+from os.path import abspath, exists, join
+from shutil import rmtree
+from subprocess import run
+from tempfile import mkdtemp
+from time import sleep, time
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from sequence_processing_pipeline.EfficiencyReport import EfficiencyReport
+from sequence_processing_pipeline.Job import Job
+from sequence_processing_pipeline.PipelineError import JobFailedError
+
+EMULATOR_PATH = abspath(join("tests", "bin", "slurm_emulator.py"))
+
+spec = spec_from_file_location("slurm_emulator", EMULATOR_PATH)
+slurm_emulator = module_from_spec(spec)
+spec.loader.exec_module(slurm_emulator)
+
+# each task records when it started and ended, to check how many tasks
+# ran at once.
+TASK_SCRIPT = """#!/bin/bash
+#SBATCH -J emulated
+echo "$(date +%s.%N) ${SLURM_ARRAY_TASK_ID:-0}" > started.${SLURM_JOB_ID}
+sleep ${TASK_SECONDS:-0.3}
+echo "$(date +%s.%N)" > ended.${SLURM_JOB_ID}
+[ "${SLURM_ARRAY_TASK_ID:-0}" != "${FAIL_TASK:-none}" ]
+"""
+
+
+class TestSlurmEmulator(TestCase):
+    def setUp(self):
+        self.work_dir = mkdtemp()
+        self.bin_dir = join(self.work_dir, "bin")
+        self.state_dir = join(self.work_dir, "state")
+
+        # a single node w/two CPUs.
+        slurm_emulator.install(
+            self.bin_dir,
+            self.state_dir,
+            nodes=1,
+            cpus_per_node=2,
+            scheduler_interval=0.05,
+            idle_timeout=5,
+        )
+
+        self.script_path = join(self.work_dir, "task.sh")
+        with open(self.script_path, "w") as f:
+            f.write(TASK_SCRIPT)
+
+        path = f"{self.bin_dir}:{os.environ['PATH']}"
+        self.env_patch = patch.dict(os.environ, {"PATH": path})
+        self.env_patch.start()
+
+    def tearDown(self):
+        self._run("scontrol", "shutdown")
+        self.env_patch.stop()
+        rmtree(self.work_dir)
+
+    def _run(self, *cmd, env=None):
+        return run(
+            list(cmd),
+            cwd=self.work_dir,
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+
+    def _submit(self, *args, env=None):
+        result = self._run("sbatch", "--parsable", *args, "task.sh", env=env)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip()
+
+    def _wait(self, *job_ids):
+        states = {}
+        deadline = time() + 30
+
+        while time() < deadline:
+            result = self._run(
+                "squeue", "-t", "all", "-j", ",".join(job_ids), "-o", "%i,%T"
+            )
+            lines = result.stdout.strip().split("\n")[1:]
+            states = dict(x.split(",") for x in lines)
+            if all(x not in ("PENDING", "RUNNING") for x in states.values()):
+                return states
+            sleep(0.1)
+
+        self.fail(f"jobs did not finish: {states}")
+
+    def _intervals(self):
+        # the (start, end) of each task that ran.
+        intervals = {}
+        for name in os.listdir(self.work_dir):
+            if name.startswith("started."):
+                task_id = name.split(".", 1)[1]
+                with open(join(self.work_dir, name)) as f:
+                    start = float(f.read().split()[0])
+                with open(join(self.work_dir, f"ended.{task_id}")) as f:
+                    end = float(f.read())
+                intervals[task_id] = (start, end)
+        return intervals
+
+    def _max_running(self):
+        events = []
+        for start, end in self._intervals().values():
+            events += [(start, 1), (end, -1)]
+
+        running = peak = 0
+        for _, change in sorted(events):
+            running += change
+            peak = max(peak, running)
+        return peak
+
+    def test_parse(self):
+        self.assertEqual(slurm_emulator.parse_array("1-10%4"), (list(range(1, 11)), 4))
+        self.assertEqual(
+            slurm_emulator.parse_array("0,2,4-8:2"), ([0, 2, 4, 6, 8], None)
+        )
+        self.assertEqual(slurm_emulator.parse_time("60"), 3600)
+        self.assertEqual(slurm_emulator.parse_time("1:30"), 90)
+        self.assertEqual(slurm_emulator.parse_time("1-12"), 129600)
+        self.assertEqual(slurm_emulator.parse_time("2:00:00"), 7200)
+        self.assertEqual(slurm_emulator.parse_memory("100G"), 100 * 2**30)
+        self.assertEqual(slurm_emulator.parse_memory("500"), 500 * 2**20)
+        self.assertEqual(
+            slurm_emulator.parse_dependency("afterok:12:13,afterany:14"),
+            [["afterok", "12"], ["afterok", "13"], ["afterany", "14"]],
+        )
+
+        with self.assertRaises(slurm_emulator.EmulatorError):
+            slurm_emulator.parse_dependency("singleton")
+
+    def test_array_limits(self):
+        # the cluster runs two tasks at once.
+        job_id = self._submit("--array", "1-4")
+        states = self._wait(job_id)
+
+        self.assertDictEqual(
+            states, {f"{job_id}_{i}": "COMPLETED" for i in range(1, 5)}
+        )
+        self.assertEqual(self._max_running(), 2)
+
+        for name in os.listdir(self.work_dir):
+            if name.startswith(("started.", "ended.")):
+                os.remove(join(self.work_dir, name))
+
+        # a '%' limit runs one task at a time.
+        job_id = self._submit("--array", "1-3%1")
+        self._wait(job_id)
+        self.assertEqual(self._max_running(), 1)
+        self.assertTrue(exists(join(self.work_dir, f"slurm-{job_id}_3.out")))
+
+    def test_resources(self):
+        result = self._run("sbatch", "-c", "4", "task.sh")
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Requested node configuration is not available", result.stderr)
+
+        result = self._run("sbatch", "task.sh")
+        self.assertEqual(result.returncode, 0)
+        self.assertRegex(result.stdout, r"^Submitted batch job \d+\n$")
+
+    def test_dependencies(self):
+        # the first job runs long enough for its dependents to be checked
+        # while they're still pending.
+        env = dict(os.environ, FAIL_TASK="2", TASK_SECONDS="2")
+        first = self._submit("--array", "1-2", env=env)
+        after_any = self._submit("-d", f"afterany:{first}")
+        after_ok = self._submit("-d", f"afterok:{first}")
+        after_not_ok = self._submit("--dependency", f"afternotok:{first}")
+
+        result = self._run("squeue", "-j", after_ok, "-o", "%i,%T,%r")
+        self.assertEqual(
+            result.stdout, f"JOBID,STATE,REASON\n{after_ok},PENDING,Dependency\n"
+        )
+
+        states = self._wait(first, after_any, after_ok, after_not_ok)
+
+        self.assertDictEqual(
+            states,
+            {
+                f"{first}_1": "COMPLETED",
+                f"{first}_2": "FAILED",
+                after_any: "COMPLETED",
+                after_ok: "CANCELLED",
+                after_not_ok: "COMPLETED",
+            },
+        )
+
+        # array tasks are given consecutive job-ids.
+        intervals = self._intervals()
+        first_ended = max(intervals[str(int(first) + i)][1] for i in range(2))
+        self.assertGreaterEqual(intervals[after_any][0], first_ended)
+        self.assertNotIn(after_ok, intervals)
+
+        result = self._run("sbatch", "-d", "afterok:99999", "task.sh")
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Job dependency problem", result.stderr)
+
+    def test_time_limit_and_scancel(self):
+        with open(self.script_path, "w") as f:
+            f.write("#!/bin/bash\nsleep 30\n")
+
+        timed_out = self._submit("--time", "0:1")
+        cancelled = self._submit()
+
+        sleep(0.3)
+        result = self._run("scancel", cancelled)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        states = self._wait(timed_out, cancelled)
+        self.assertDictEqual(states, {timed_out: "TIMEOUT", cancelled: "CANCELLED"})
+
+    def test_sacct(self):
+        env = dict(os.environ, FAIL_TASK="3")
+        job_id = self._submit("--array", "1-3", "--mem", "2G", env=env)
+        self._wait(job_id)
+
+        result = self._run(*EfficiencyReport.sacct_command(job_id).split())
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        report = EfficiencyReport.from_sacct(job_id, result.stdout)
+        tasks = report.tasks
+
+        self.assertListEqual(list(tasks["array_index"]), [1, 2, 3])
+        self.assertListEqual(list(tasks["state"]), ["COMPLETED", "COMPLETED", "FAILED"])
+        self.assertListEqual(list(tasks["node_list"]), ["node-01"] * 3)
+        self.assertListEqual(list(tasks["req_mem_bytes"]), [2 * 2**30] * 3)
+        self.assertTrue((tasks["max_rss_bytes"] > 0).all())
+
+    def test_job_submit_job(self):
+        job = Job(self.work_dir, self.work_dir, "EmulatedJob", [], 1000)
+        job.collect_efficiency_report = True
+        # the delay can be overridden per job.
+        job.submission_delay_in_seconds = 0
+
+        # poll the emulator far more often than a real cluster.
+        patch.object(Job, "polling_interval_in_seconds", 0.1).start()
+        self.addCleanup(patch.stopall)
+
+        result = job.submit_job(
+            self.script_path, job_parameters="--array 1-4%2", exec_from=self.work_dir
+        )
+
+        self.assertDictEqual(result["job_state"], {"COMPLETED": 4})
+        self.assertEqual(len(job.efficiency_report.tasks), 4)
+
+        report_path = join(
+            job.output_path, f"EmulatedJob_{result['job_id']}_efficiency.csv"
+        )
+        self.assertTrue(exists(report_path))
+
+        with patch.dict(os.environ, {"FAIL_TASK": "1"}):
+            with self.assertRaisesRegex(JobFailedError, "FAILED"):
+                job.submit_job(
+                    self.script_path,
+                    job_parameters="--array 1-2",
+                    exec_from=self.work_dir,
+                )
+
+
+if __name__ == "__main__":
+    main()
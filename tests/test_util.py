@@ -1,11 +1,32 @@
 import unittest
+from random import Random
 
 from sequence_processing_pipeline.util import (
+    classify_orientations,
     determine_orientation,
+    group_mates,
     iter_paired_files,
+    pair_files,
+    parse_slurm_duration,
+    parse_slurm_memory,
 )
 
 
+def legacy_determine_orientation(file_name):
+    # the original rfind()-based implementation, kept as a reference.
+    results = []
+
+    for o in ["R1", "R2", "I1", "I2"]:
+        for v in [f"_{o}_", f".{o}.", f"_{o}"]:
+            results.append((file_name.rfind(v), o))
+
+    results.sort(reverse=True)
+
+    pos, orientation = results[0]
+
+    return None if pos == -1 else orientation
+
+
 class TestUtil(unittest.TestCase):
     def test_iter_paired_files(self):
         # tuples of randomly ordered fastq files and thier expected
@@ -60,6 +81,76 @@ class TestUtil(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "Mismatch prefixes"):
             list(iter_paired_files(files))
 
+    def test_pair_files(self):
+        files = [
+            "/foo/bar/b_R2_001.fastq.gz",
+            "/foo/bar/a_R1_001.fastq.gz",
+            "/foo/bar/a_R2_001.fastq.gz",
+            "/foo/bar/b_R1_001.fastq.gz",
+            "/foo/baz/a_R1_001.fastq.gz",
+            "/foo/bar/c.R2.fastq.gz",
+            "/foo/bar/c.R1.fastq.gz",
+            # R1 in the sample name; orientation is the right-most marker.
+            "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R2_001.fastq.gz",
+            "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R1_001.fastq.gz",
+            # mates must share the same prefix.
+            "/foo/bar/d_R1_001.fastq.gz",
+            "/foo/bar/dd_R2_001.fastq.gz",
+            # index and unrecognized files are ignored.
+            "/foo/bar/a_I1_001.fastq.gz",
+            "/foo/bar/notes.txt",
+        ]
+
+        obs = pair_files(files)
+
+        self.assertEqual(
+            obs.pairs,
+            [
+                (
+                    "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R1_001.fastq.gz",
+                    "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R2_001.fastq.gz",
+                ),
+                ("/foo/bar/a_R1_001.fastq.gz", "/foo/bar/a_R2_001.fastq.gz"),
+                ("/foo/bar/b_R1_001.fastq.gz", "/foo/bar/b_R2_001.fastq.gz"),
+                ("/foo/bar/c.R1.fastq.gz", "/foo/bar/c.R2.fastq.gz"),
+            ],
+        )
+        self.assertEqual(
+            obs.unpaired_r1,
+            ["/foo/bar/d_R1_001.fastq.gz", "/foo/baz/a_R1_001.fastq.gz"],
+        )
+        self.assertEqual(obs.unpaired_r2, ["/foo/bar/dd_R2_001.fastq.gz"])
+
+        self.assertEqual(pair_files([]), ([], [], []))
+
+    def test_group_mates(self):
+        files = [
+            "/foo/bar/a_I1_001.fastq.gz",
+            "/foo/bar/a_R2_001.fastq.gz",
+            "/foo/bar/a_R1_001.fastq.gz",
+            "/foo/bar/a_R1_002.fastq.gz",
+            "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R2_001.fastq.gz",
+            "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R1_001.fastq.gz",
+            "/foo/bar/notes.txt",
+        ]
+
+        self.assertEqual(
+            group_mates(files),
+            [
+                [
+                    "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R1_001.fastq.gz",
+                    "/foo/bar/LS_8_22_2014_R1_SRE_S3_L007_R2_001.fastq.gz",
+                ],
+                [
+                    "/foo/bar/a_R1_001.fastq.gz",
+                    "/foo/bar/a_R2_001.fastq.gz",
+                    "/foo/bar/a_I1_001.fastq.gz",
+                ],
+                ["/foo/bar/a_R1_002.fastq.gz"],
+                ["/foo/bar/notes.txt"],
+            ],
+        )
+
     def test_determine_orientation(self):
         test_names = [
             # single additional occurrence: R1
@@ -97,6 +188,76 @@ class TestUtil(unittest.TestCase):
         for file_name, exp in test_names:
             self.assertEqual(determine_orientation(file_name), exp)
 
+        # partial and missing orientations.
+        self.assertEqual(determine_orientation("sample.R1"), None)
+        self.assertEqual(determine_orientation("sample.R1.fastq.gz"), "R1")
+        self.assertEqual(determine_orientation("sample_I2"), "I2")
+        self.assertEqual(determine_orientation("sample_R3_001.fastq.gz"), None)
+        self.assertEqual(determine_orientation(""), None)
+
+    def test_determine_orientation_matches_legacy(self):
+        # compare against the original implementation on randomly generated
+        # names built from the tokens that matter to it.
+        tokens = [
+            "_",
+            ".",
+            "R",
+            "I",
+            "1",
+            "2",
+            "3",
+            "R1",
+            "R2",
+            "I1",
+            "I2",
+            "_R1_",
+            ".R2.",
+            "_I1",
+            "a",
+            "/",
+            "\n",
+            "fastq.gz",
+        ]
+        rng = Random(1776)
+
+        for _ in range(20000):
+            file_name = "".join(rng.choices(tokens, k=rng.randint(0, 12)))
+            self.assertEqual(
+                determine_orientation(file_name),
+                legacy_determine_orientation(file_name),
+                msg=repr(file_name),
+            )
+
+    def test_classify_orientations(self):
+        paths = [
+            "/a_R1/sample_S1_L001_R2_001.fastq.gz",
+            "/a/sample.I1.fastq.gz",
+            "/a/sample.fastq.gz",
+        ]
+
+        obs = classify_orientations(paths)
+        self.assertDictEqual(obs, dict(zip(paths, ["R2", "I1", None])))
+        self.assertDictEqual(classify_orientations([]), {})
+
+    def test_parse_slurm_duration(self):
+        self.assertEqual(parse_slurm_duration("00:01.500"), 1.5)
+        self.assertEqual(parse_slurm_duration("12:34"), 754)
+        self.assertEqual(parse_slurm_duration("01:02:03"), 3723)
+        self.assertEqual(parse_slurm_duration("2-01:02:03"), 176523)
+        self.assertIsNone(parse_slurm_duration(""))
+        self.assertIsNone(parse_slurm_duration("UNLIMITED"))
+        self.assertIsNone(parse_slurm_duration("a:b"))
+        self.assertIsNone(parse_slurm_duration("x-01:00:00"))
+
+    def test_parse_slurm_memory(self):
+        self.assertEqual(parse_slurm_memory("1024"), 1024)
+        self.assertEqual(parse_slurm_memory("1234K"), 1234 * 1024)
+        self.assertEqual(parse_slurm_memory("2.5G"), int(2.5 * 2**30))
+        self.assertEqual(parse_slurm_memory("100Gn"), 100 * 2**30)
+        self.assertEqual(parse_slurm_memory("4000Mc"), 4000 * 2**20)
+        self.assertIsNone(parse_slurm_memory(""))
+        self.assertIsNone(parse_slurm_memory("abc"))
+
 
 if __name__ == "__main__":
     unittest.main()
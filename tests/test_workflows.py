@@ -5,17 +5,21 @@
 #
 # The full license is in the file LICENSE, distributed with this software.
 # -----------------------------------------------------------------------------
+import gzip
 import re
 from collections import defaultdict
-from os import W_OK, access, chmod, environ, getcwd, makedirs, remove, walk
+from os import W_OK, access, chmod, environ, getcwd, listdir, makedirs, remove, walk
 from os.path import abspath, exists, join, split
 from platform import system as get_operating_system_type
 from random import randint
 from shutil import rmtree
+from types import SimpleNamespace
 from unittest import TestCase, main
+from unittest.mock import patch
 
 from metapool import load_sample_sheet
 
+from qp_klp.Protocol import Protocol, TellSeq
 from qp_klp.WorkflowFactory import WorkflowFactory
 
 
@@ -1145,5 +1149,138 @@ class TestWorkflows(TestCase):
         self.assertEqual(obs, exp)
 
 
+class TestTellSeqPostProcessing(TestCase):
+    def setUp(self):
+        self.output_dir = abspath("tests/data/post_processing_output")
+        self.integrated = join(self.output_dir, "integrated")
+        makedirs(self.integrated)
+        self.manifest_path = join(self.output_dir, TellSeq.POST_PROCESSING_MANIFEST)
+
+        self.tellseq = TellSeq()
+        self.tellseq.raw_fastq_files_path = self.integrated
+
+        self.mapping = {
+            "C501": {"sample_id": "S1", "sample_index": 1, "project_name": "P_1"},
+            "C502": {"sample_id": "S2", "sample_index": 2, "project_name": "P_1"},
+        }
+
+    def tearDown(self):
+        rmtree(self.output_dir)
+
+    def touch(self, *file_names):
+        for file_name in file_names:
+            with open(join(self.integrated, file_name), "w") as f:
+                f.write("")
+
+    def moved(self):
+        return sorted(listdir(join(self.integrated, "P_1")))
+
+    def test_post_process_files(self):
+        self.touch("C501.R1.fastq.gz", "C502.I1.fastq.gz")
+
+        self.tellseq._post_process_files(self.mapping, 4)
+
+        self.assertListEqual(
+            self.moved(), ["S1_S1_L004_R1_001.fastq.gz", "S2_S2_L004_I1_001.fastq.gz"]
+        )
+        self.assertFalse(exists(self.manifest_path))
+
+    def test_post_process_files_resumed(self):
+        # a previous attempt moved one of the two files in its manifest.
+        makedirs(join(self.integrated, "P_1"))
+        self.touch("C502.I1.fastq.gz", join("P_1", "S1_S1_L004_R1_001.fastq.gz"))
+
+        with open(self.manifest_path, "w") as f:
+            f.write("source\tdestination\n")
+            for src, dst in [
+                ("C501.R1.fastq.gz", "S1_S1_L004_R1_001.fastq.gz"),
+                ("C502.I1.fastq.gz", "S2_S2_L004_I1_001.fastq.gz"),
+            ]:
+                f.write(f"{join(self.integrated, src)}\t")
+                f.write(f"{join(self.integrated, 'P_1', dst)}\n")
+
+        self.tellseq._post_process_files(self.mapping, 4)
+
+        self.assertListEqual(
+            self.moved(), ["S1_S1_L004_R1_001.fastq.gz", "S2_S2_L004_I1_001.fastq.gz"]
+        )
+        self.assertFalse(exists(self.manifest_path))
+
+    def test_post_process_files_stale_manifest(self):
+        self.touch("C501.R1.fastq.gz", "C502.R2.fastq.gz")
+
+        # the manifest lists a file that is gone and omits the others.
+        with open(self.manifest_path, "w") as f:
+            f.write("source\tdestination\n")
+            f.write(f"{join(self.integrated, 'C501.I1.fastq.gz')}\t")
+            f.write(f"{join(self.integrated, 'P_1', 'S1_S1_L004_I1_001.fastq.gz')}\n")
+
+        self.tellseq._post_process_files(self.mapping, 4)
+
+        self.assertListEqual(
+            self.moved(), ["S1_S1_L004_R1_001.fastq.gz", "S2_S2_L004_R2_001.fastq.gz"]
+        )
+        self.assertFalse(exists(self.manifest_path))
+
+
+class TestSubsampleReads(TestCase):
+    def setUp(self):
+        self.output_dir = abspath("tests/data/subsample_output")
+        self.raw_path = join(self.output_dir, "ConvertJob")
+        makedirs(join(self.raw_path, "Project_1"))
+
+        self.fastqs = [
+            join(self.raw_path, "Project_1", f"S1_S1_L001_{x}_001.fastq.gz")
+            for x in ("R1", "R2")
+        ]
+        for fastq, suffix in zip(self.fastqs, ("/1", "/2")):
+            with gzip.open(fastq, "wt") as f:
+                for i in range(20):
+                    f.write(f"@read{i}{suffix}\nACGT\n+\nIIII\n")
+
+        self.protocol = Protocol()
+        self.protocol.assay_type = "Metagenomic"
+        self.protocol.assay_warnings = []
+        self.protocol.raw_fastq_files_path = self.raw_path
+        self.protocol.reports_path = join(self.output_dir, "Demultiplex_Stats.csv")
+        self.protocol.pipeline = SimpleNamespace(output_path=self.output_dir)
+
+    def tearDown(self):
+        rmtree(self.output_dir)
+
+    def write_report(self, reads):
+        with open(self.protocol.reports_path, "w") as f:
+            f.write(f"SampleID,# Reads\nS1,{reads}\n")
+
+    def count(self, fastq):
+        with gzip.open(fastq, "rt") as f:
+            return len(f.readlines()) // 4
+
+    @patch.object(Protocol, "MAX_READS", 10)
+    def test_subsample_reads(self):
+        self.write_report(20)
+        self.protocol.subsample_reads()
+
+        for fastq in self.fastqs:
+            self.assertEqual(self.count(fastq), 10)
+            self.assertEqual(self.count(fastq.replace("fastq.gz", "full.gz")), 20)
+
+        self.assertEqual(len(self.protocol.assay_warnings), 2)
+
+    @patch.object(Protocol, "MAX_READS", 10)
+    def test_subsample_reads_undercounted(self):
+        # a total taken from the reports is checked against the files
+        # rather than trusted.
+        self.write_report(15)
+
+        with self.assertRaisesRegex(ValueError, "contains more than 15 records"):
+            self.protocol.subsample_reads()
+
+        # the original files are restored.
+        for fastq in self.fastqs:
+            self.assertEqual(self.count(fastq), 20)
+            self.assertFalse(exists(fastq.replace("fastq.gz", "full.gz")))
+
+
 if __name__ == "__main__":
     main()